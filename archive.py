@@ -0,0 +1,294 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+import data_loader
+import disk_cache
+import instrument
+import match_store
+import team_names
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# ארכיון היסטורי רב-עונתי: קבצי Arrow עמודתיים שלא משתנים אחרי הכתיבה, ממופים לזיכרון,
+# עם אינדקס לפי ליגה, עונה וקבוצה
+# ----------------------------
+# בניגוד למטמון (שאפשר למחוק), הארכיון הוא המקום היחיד של עונות שכבר ירדו מהמקורות
+ARCHIVE_DIR = os.environ.get("CHAMP_ARCHIVE_DIR", os.path.join(disk_cache.BASE_DIR, ".archive"))
+INDEX_NAME = "index.json"
+LOCK_NAME = "write.lock"
+FORMAT_VERSION = 1
+LOCK_TIMEOUT = 30       # המתנה מקסימלית לכותב אחר (שניות)
+STALE_LOCK = 600        # נעילה ישנה מזה נחשבת שרידה של תהליך שנפל
+KEY_COLUMNS = ["Date", "HomeTeam", "AwayTeam"]
+
+_lock = threading.Lock()
+_index = None
+_index_stamp = None
+_tables = {}
+
+
+def _path(name):
+    return os.path.join(ARCHIVE_DIR, name)
+
+
+def _slug(league):
+    return re.sub(r"[^0-9a-z]+", "-", league.lower()).strip("-")
+
+
+def _read_index():
+    try:
+        with open(_path(INDEX_NAME), encoding="utf-8") as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        return {"format": FORMAT_VERSION, "segments": []}
+    if index.get("format") != FORMAT_VERSION:
+        raise ValueError(f"פורמט ארכיון לא נתמך: {index.get('format')} (נתמך: {FORMAT_VERSION})")
+    return index
+
+
+def _save_index(index):
+    tmp_path = _path(INDEX_NAME) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_path, _path(INDEX_NAME))
+
+
+def segments():
+    # האינדקס נקרא מחדש רק כשהקובץ השתנה (למשל כשתהליך אחר הוסיף מקטע)
+    global _index, _index_stamp
+    try:
+        stat = os.stat(_path(INDEX_NAME))
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        stamp = None
+    with _lock:
+        if _index is None or stamp != _index_stamp:
+            _index, _index_stamp = _read_index(), stamp
+        return _index["segments"]
+
+
+def _mapped(file_name):
+    # מקטע לא משתנה אחרי הכתיבה - המיפוי נשמר לכל חיי התהליך. הדפים עצמם משותפים
+    # לכל התהליכים שממפים את אותו קובץ (מטמון הדפים של מערכת ההפעלה), בלי העתקה
+    with _lock:
+        table = _tables.get(file_name)
+    if table is None:
+        table = feather.read_table(_path(file_name), memory_map=True)
+        with _lock:
+            _tables[file_name] = table
+    return table
+
+
+@contextmanager
+def _writer():
+    # כותב אחד בכל פעם בין כל התהליכים: קובץ נעילה שנוצר באופן אטומי (O_EXCL), גם בלי fcntl
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    deadline = time.monotonic() + LOCK_TIMEOUT
+    while True:
+        try:
+            fd = os.open(_path(LOCK_NAME), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(_path(LOCK_NAME)) > STALE_LOCK:
+                    os.remove(_path(LOCK_NAME))
+                    continue
+            except OSError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError("הארכיון נעול לכתיבה על ידי תהליך אחר")
+            time.sleep(0.05)
+    try:
+        os.write(fd, str(os.getpid()).encode())
+        os.close(fd)
+        yield _read_index()
+    finally:
+        os.remove(_path(LOCK_NAME))
+
+
+def _team_rows(rows):
+    # לכל קבוצה: שורות משחקי הבית ומשחקי החוץ שלה במקטע
+    teams = {}
+    for side, column in enumerate(("HomeTeam", "AwayTeam")):
+        positions = pd.Series(np.arange(len(rows)), index=rows[column].astype(object).to_numpy())
+        for team, found in positions.groupby(level=0, sort=True):
+            teams.setdefault(team, [[], []])[side] = found.tolist()
+    return teams
+
+
+def _write_segment(league, season, rows):
+    rows = rows.sort_values(KEY_COLUMNS, kind="stable").reset_index(drop=True)
+    file_name = f"{_slug(league)}-{season}-{uuid.uuid4().hex[:12]}.arrow"
+    tmp_path = _path(file_name + ".tmp")
+    feather.write_feather(rows, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, _path(file_name))
+    return {
+        "file": file_name,
+        "league": league,
+        "season": int(season),
+        "rows": len(rows),
+        "first_date": str(rows["Date"].iat[0].date()),
+        "last_date": str(rows["Date"].iat[-1].date()),
+        "teams": _team_rows(rows),
+    }
+
+
+def _keys(df):
+    return pd.MultiIndex.from_arrays([df["Date"].to_numpy(), df["HomeTeam"].astype(object).to_numpy(),
+                                      df["AwayTeam"].astype(object).to_numpy()])
+
+
+def _archived_keys(index, league, season):
+    found = [_mapped(segment["file"]).select(KEY_COLUMNS).to_pandas()
+             for segment in index["segments"] if segment["league"] == league and segment["season"] == season]
+    if not found:
+        return None
+    return _keys(pd.concat(found, ignore_index=True))
+
+
+def append(league, df):
+    # רק משחקים ששוחקו; משחק שכבר בארכיון (אותו תאריך, בית וחוץ) לא נכתב שוב.
+    # כל קריאה מוסיפה מקטע חדש לכל עונה שיש בה משחקים חדשים - שום קובץ קיים לא נכתב מחדש
+    df = match_store.compact(df)
+    df = df[(df["FTHG"].notna() & df["Date"].notna()).to_numpy()]
+    added = 0
+    if df.empty:
+        return added
+    seasons = data_loader.season_of(df["Date"]).to_numpy()
+    with instrument.span("archive.append", league=league, rows=len(df)), _writer() as index:
+        for season in np.unique(seasons):
+            rows = df[seasons == season]
+            archived = _archived_keys(index, league, int(season))
+            if archived is not None:
+                rows = rows[~_keys(rows).isin(archived)]
+            if rows.empty:
+                continue
+            index["segments"].append(_write_segment(league, int(season), rows))
+            added += len(rows)
+        if added:
+            _save_index(index)
+    instrument.count("archive.rows_appended", added)
+    return added
+
+
+def update(league_data=None):
+    # הוספת כל מה שהמקורות מכירים כרגע (כולל התחרויות האירופיות); מחזיר {ליגה: שורות חדשות}
+    if league_data is None:
+        league_data, _ = data_loader.load_league_data()
+    return {league: append(league, df) for league, df in league_data.items() if df is not None}
+
+
+def seasons(league=None):
+    return sorted({segment["season"] for segment in segments() if league is None or segment["league"] == league})
+
+
+def matches(league=None, seasons=None, team=None, side=None, columns=None):
+    # שאילתה: רק המקטעים של הליגה/העונות, רק העמודות המבוקשות, ולקבוצה - רק השורות שלה (take),
+    # כך שנקראים מהדיסק רק הדפים שמכילים אותן
+    team = team_names.canonical(team) if team is not None else None
+    seasons = None if seasons is None else {int(season) for season in seasons}
+    pieces = []
+    with instrument.span("archive.query", league=league, team=team, side=side):
+        for segment in segments():
+            if league is not None and segment["league"] != league:
+                continue
+            if seasons is not None and segment["season"] not in seasons:
+                continue
+            table = _mapped(segment["file"])
+            if columns is not None:
+                table = table.select([column for column in match_store.MATCH_COLUMNS
+                                      if column in table.column_names and (column in columns or column in KEY_COLUMNS)])
+            if team is not None:
+                home, away = segment["teams"].get(team, [[], []])
+                rows = home if side == "home" else away if side == "away" else sorted(home + away)
+                if not rows:
+                    continue
+                table = table.take(pa.array(rows, type=pa.int64()))
+            piece = table.to_pandas()
+            piece.insert(0, "League", segment["league"])
+            piece.insert(1, "Season", segment["season"])
+            pieces.append(piece)
+    if not pieces:
+        return pd.DataFrame(columns=["League", "Season"] + (columns or match_store.MATCH_COLUMNS))
+    result = pd.concat(pieces, ignore_index=True)
+    result = result.sort_values(["Date", "League"], kind="stable").reset_index(drop=True)
+    # קטגוריות קבוצה משותפות לכל המקטעים, כמו בטבלה שהחיזוי מקבל מהטוען
+    compacted = match_store.compact(result)
+    compacted.insert(0, "League", result["League"].astype("category"))
+    compacted.insert(1, "Season", result["Season"].astype("int16"))
+    return compacted
+
+
+def summary():
+    rows = [{"league": segment["league"], "season": segment["season"], "rows": segment["rows"],
+             "teams": len(segment["teams"]), "first_date": segment["first_date"], "last_date": segment["last_date"]}
+            for segment in segments()]
+    if not rows:
+        return pd.DataFrame(columns=["league", "season", "segments", "rows", "first_date", "last_date"])
+    table = pd.DataFrame(rows)
+    return (table.groupby(["league", "season"], sort=True)
+            .agg(segments=("rows", "size"), rows=("rows", "sum"), first_date=("first_date", "min"),
+                 last_date=("last_date", "max"))
+            .reset_index())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ארכיון היסטורי רב-עונתי של כל הליגות")
+    parser.add_argument("--update", action="store_true", help="הוספת המשחקים החדשים מכל המקורות לארכיון")
+    parser.add_argument("--import", dest="imports", action="append", metavar="CSV",
+                        help="ייבוא קובץ עונה היסטורי (בפורמט football-data) לליגה שב---league")
+    parser.add_argument("--league", choices=sorted(data_loader.DATA_SOURCES), help="ליגה")
+    parser.add_argument("--team", help="קבוצה")
+    parser.add_argument("--side", choices=["home", "away"], help="רק משחקי בית או רק משחקי חוץ")
+    parser.add_argument("--seasons", type=int, help="רק N העונות האחרונות")
+    parser.add_argument("--output", "-o", help="שמירת תוצאת השאילתה ל-CSV")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.imports:
+        if not args.league:
+            parser.error("ייבוא דורש --league")
+        for path in args.imports:
+            with open(path, encoding="utf-8-sig") as f:
+                added = append(args.league, match_store.read_matches(f.read()))
+            print(f"{path}: {added} משחקים חדשים", file=sys.stderr)
+    if args.update:
+        league_data, messages = data_loader.load_league_data()
+        for level, message in messages:
+            print(f"{level}: {message}", file=sys.stderr)
+        for league, added in update(league_data).items():
+            print(f"{league}: {added} משחקים חדשים", file=sys.stderr)
+
+    if not (args.team or args.league or args.seasons):
+        print(summary().to_string(index=False))
+        return 0
+
+    start = time.perf_counter()
+    wanted = seasons(args.league)[-args.seasons:] if args.seasons else None
+    result = matches(args.league, wanted, args.team, args.side)
+    elapsed = time.perf_counter() - start
+    if args.output:
+        result.to_csv(args.output, index=False)
+    else:
+        with pd.option_context("display.width", 200, "display.max_columns", 14):
+            print(result.to_string(index=False, max_rows=40))
+    print(f"{len(result)} משחקים | {elapsed:.3f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import dixon_coles
+import form
+from predictor import EUROPEAN_LEAGUES, METHODS
+from score_matrix import matrix_outcomes, outcome_probabilities
+
+# ----------------------------
+# בדיקה לאחור (walk-forward): כל משחק נחזה רק מתוך המשחקים שלפניו
+# ----------------------------
+MIN_MATCHES = 3         # מספר משחקי בית/חוץ קודמים מינימלי לקבוצה כדי לחזות
+REFIT_DAYS = 7          # Dixon-Coles מותאם מחדש פעם בשבוע (עם warm start)
+DC_MIN_TRAINING = 50    # מתחת לזה אין מספיק משחקים להתאמת Dixon-Coles
+CALIBRATION_BINS = 10
+OUTCOMES = ["home_win", "draw", "away_win"]
+
+
+def _prepare(df):
+    # משחקים ששוחקו בלבד, לפי סדר התאריכים (מיון יציב - אותו סדר בכל הרצה)
+    df = df.dropna(subset=["HomeTeam", "AwayTeam", "FTHG", "FTAG"])
+    dates = data_loader.parse_dates(df["Date"])
+    valid = dates.notna().to_numpy()
+    df, dates = df[valid], dates[valid]
+    order = np.argsort(dates.to_numpy(), kind="stable")
+    df = df.iloc[order].reset_index(drop=True)
+    df["Date"] = dates.to_numpy()[order]
+    return df
+
+
+def _prior_mean(values, codes):
+    # ממוצע מצטבר לכל קבוצה מתוך התצפיות הקודמות בלבד (cumsum פחות הנוכחית) - O(n) לכל הליגה
+    values = pd.Series(values, dtype=float)
+    present = values.notna()
+    sums = values.fillna(0).groupby(codes).cumsum().to_numpy() - values.fillna(0).to_numpy()
+    counts = present.astype(int).groupby(codes).cumsum().to_numpy() - present.to_numpy(dtype=int)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return sums / counts, counts
+
+
+def walk_forward_means(df, min_matches=MIN_MATCHES):
+    # אותו חישוב כמו predict_match_regular: ממוצע שערי הבית של המארחת וממוצע שערי החוץ של האורחת
+    home = df["HomeTeam"].to_numpy(dtype=object)
+    away = df["AwayTeam"].to_numpy(dtype=object)
+    home_rates, home_counts = _prior_mean(df["FTHG"], home)
+    away_rates, away_counts = _prior_mean(df["FTAG"], away)
+    valid = (home_counts >= min_matches) & (away_counts >= min_matches)
+
+    corners = None
+    if "HC" in df.columns and "AC" in df.columns:
+        home_corners, _ = _prior_mean(df["HC"], home)
+        away_corners, _ = _prior_mean(df["AC"], away)
+        corners = home_corners + away_corners
+
+    probabilities = np.full((len(df), 3), np.nan)
+    if valid.any():
+        probabilities[valid] = np.column_stack(outcome_probabilities(home_rates[valid], away_rates[valid]))
+    return probabilities, home_rates, away_rates, corners, valid
+
+
+def walk_forward_dixon_coles(df, min_matches=MIN_MATCHES, refit_days=REFIT_DAYS):
+    # התאמה מחדש בכל חלון של refit_days על כל מה שלפני החלון; המודל הקודם הוא נקודת ההתחלה
+    dates = df["Date"].to_numpy()
+    windows = (dates - dates[0]) // np.timedelta64(refit_days, "D")
+    starts = np.flatnonzero(np.r_[True, windows[1:] != windows[:-1]])
+    ends = np.r_[starts[1:], len(df)]
+
+    home = df["HomeTeam"].to_numpy(dtype=object)
+    away = df["AwayTeam"].to_numpy(dtype=object)
+    _, home_counts = _prior_mean(df["FTHG"], home)
+    _, away_counts = _prior_mean(df["FTAG"], away)
+    valid = (home_counts >= min_matches) & (away_counts >= min_matches)
+    valid[:DC_MIN_TRAINING] = False
+
+    probabilities = np.full((len(df), 3), np.nan)
+    home_rates = np.full(len(df), np.nan)
+    away_rates = np.full(len(df), np.nan)
+    model = None
+    for start, end in zip(starts, ends):
+        rows = np.flatnonzero(valid[start:end]) + start
+        if start < DC_MIN_TRAINING or rows.size == 0:
+            continue
+        model = dixon_coles.fit(df.iloc[:start], as_of=dates[start - 1], init=model)
+        lam, mu = dixon_coles.rates(model, home[rows], away[rows])
+        matrix = dixon_coles.corrected_score_matrix(lam, mu, model["rho"])
+        probabilities[rows] = np.column_stack(matrix_outcomes(matrix))
+        home_rates[rows], away_rates[rows] = lam, mu
+
+    # הקרנות תמיד מהממוצעים - כמו בחיזוי עצמו
+    _, _, _, corners, _ = walk_forward_means(df, min_matches)
+    return probabilities, home_rates, away_rates, corners, valid & ~np.isnan(probabilities[:, 0])
+
+
+# ----------------------------
+# מדדים: Brier, log loss, כיול ושגיאת שערים
+# ----------------------------
+def outcome_index(home_goals, away_goals):
+    # 0 = ניצחון בית, 1 = תיקו, 2 = ניצחון חוץ
+    return np.where(home_goals > away_goals, 0, np.where(home_goals == away_goals, 1, 2))
+
+
+def calibration(probabilities, outcomes, bins=CALIBRATION_BINS):
+    # לכל תוצאה: ממוצע ההסתברות החזויה מול השכיחות בפועל בכל תא
+    edges = np.linspace(0, 1, bins + 1)
+    curves = {}
+    total_error = 0.0
+    for k, name in enumerate(OUTCOMES):
+        predicted = probabilities[:, k]
+        observed = (outcomes == k).astype(float)
+        cell = np.clip(np.digitize(predicted, edges) - 1, 0, bins - 1)
+        counts = np.bincount(cell, minlength=bins)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_predicted = np.bincount(cell, predicted, bins) / counts
+            frequency = np.bincount(cell, observed, bins) / counts
+        used = counts > 0
+        total_error += (counts[used] * np.abs(mean_predicted[used] - frequency[used])).sum() / len(outcomes)
+        curves[name] = [
+            {"bin": f"{edges[i]:.1f}-{edges[i + 1]:.1f}", "matches": int(counts[i]),
+             "predicted": round(float(mean_predicted[i]), 4), "observed": round(float(frequency[i]), 4)}
+            for i in np.flatnonzero(used)
+        ]
+    return curves, total_error / len(OUTCOMES)
+
+
+def score(probabilities, outcomes, expected_goals, goals, expected_corners=None, corners=None,
+          bins=CALIBRATION_BINS):
+    n = len(outcomes)
+    if n == 0:
+        return {"matches": 0}
+    actual = np.eye(3)[outcomes]
+    chosen = np.clip(probabilities[np.arange(n), outcomes], 1e-15, 1)
+    curves, ece = calibration(probabilities, outcomes, bins)
+    goal_error = expected_goals - goals
+    result = {
+        "matches": int(n),
+        "brier": round(float(((probabilities - actual) ** 2).sum(axis=1).mean()), 5),
+        "log_loss": round(float(-np.log(chosen).mean()), 5),
+        "accuracy": round(float((probabilities.argmax(axis=1) == outcomes).mean()), 4),
+        "ece": round(float(ece), 5),
+        "goals_mae": round(float(np.abs(goal_error).mean()), 4),
+        "goals_rmse": round(float(np.sqrt((goal_error ** 2).mean())), 4),
+        "goals_bias": round(float(goal_error.mean()), 4),
+        "calibration": curves,
+    }
+    if expected_corners is not None and corners is not None:
+        known = ~(np.isnan(expected_corners) | np.isnan(corners))
+        if known.any():
+            result["corners_mae"] = round(float(np.abs(expected_corners[known] - corners[known]).mean()), 4)
+    return result
+
+
+def backtest_league(league, df, method="means", min_matches=MIN_MATCHES, refit_days=REFIT_DAYS,
+                    bins=CALIBRATION_BINS, with_form=False):
+    start = time.perf_counter()
+    df = _prepare(df)
+    if method == "dixon_coles":
+        probabilities, home_rates, away_rates, corners, valid = walk_forward_dixon_coles(df, min_matches, refit_days)
+    else:
+        probabilities, home_rates, away_rates, corners, valid = walk_forward_means(df, min_matches)
+
+    home_goals = df["FTHG"].to_numpy(dtype=float)
+    away_goals = df["FTAG"].to_numpy(dtype=float)
+    outcomes = outcome_index(home_goals, away_goals)
+    actual_corners = None
+    if corners is not None:
+        actual_corners = df["HC"].to_numpy(dtype=float) + df["AC"].to_numpy(dtype=float)
+
+    def _score(mask):
+        return score(probabilities[mask], outcomes[mask], home_rates[mask] + away_rates[mask],
+                     (home_goals + away_goals)[mask], None if corners is None else corners[mask],
+                     None if actual_corners is None else actual_corners[mask], bins)
+
+    seasons = data_loader.season_of(df["Date"]).to_numpy()
+    predictions = pd.DataFrame({
+        "league": league,
+        "date": df["Date"].dt.date,
+        "home_team": df["HomeTeam"].to_numpy(dtype=object),
+        "away_team": df["AwayTeam"].to_numpy(dtype=object),
+        "home_goals": home_goals,
+        "away_goals": away_goals,
+        "home_win": probabilities[:, 0],
+        "draw": probabilities[:, 1],
+        "away_win": probabilities[:, 2],
+        "expected_goals": home_rates + away_rates,
+    })
+    if with_form:
+        # הכושר ערב כל משחק - מחושב פעם אחת לכל הליגה, ורק ממשחקים שלפני תאריך המשחק.
+        # נבנה ישירות מהטבלה הממוינת כאן (לא דרך המטמון), כך שהשורות מיושרות בדיוק למשחקים שלה
+        predictions = pd.concat([predictions, form.pre_match(form.build_form(df))], axis=1)
+    predictions = predictions[valid]
+    return {
+        "league": league,
+        "method": method,
+        "matches": int(len(df)),
+        "overall": _score(valid),
+        "seasons": {int(season): _score(valid & (seasons == season)) for season in np.unique(seasons)},
+        "elapsed_s": round(time.perf_counter() - start, 4),
+        "predictions": predictions,
+    }
+
+
+def _backtest_task(args):
+    return backtest_league(*args)
+
+
+def backtest_leagues(league_data, method="means", workers=None, min_matches=MIN_MATCHES,
+                     refit_days=REFIT_DAYS, bins=CALIBRATION_BINS, with_form=False):
+    # ליגה לכל תהליך; התוצאות חוזרות לפי סדר הליגות
+    tasks = [(league, df, method, min_matches, refit_days, bins, with_form) for league, df in league_data.items()]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        return [_backtest_task(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_backtest_task, tasks))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="בדיקה לאחור (walk-forward) של החיזויים על הנתונים ההיסטוריים")
+    parser.add_argument("--league", action="append",
+                        choices=sorted(league for league in data_loader.DATA_SOURCES if league not in EUROPEAN_LEAGUES),
+                        help="ליגה לבדיקה (אפשר לחזור על הדגל; ברירת מחדל: כל הליגות המקומיות)")
+    parser.add_argument("--method", choices=METHODS, default="means", help="שיטת החיזוי")
+    parser.add_argument("--workers", type=int, help="מספר תהליכים (ברירת מחדל: מספר הליבות)")
+    parser.add_argument("--min-matches", type=int, default=MIN_MATCHES,
+                        help="מספר משחקי בית/חוץ קודמים מינימלי לקבוצה")
+    parser.add_argument("--refit-days", type=int, default=REFIT_DAYS, help="תדירות ההתאמה מחדש של Dixon-Coles")
+    parser.add_argument("--bins", type=int, default=CALIBRATION_BINS, help="מספר התאים בעקומת הכיול")
+    parser.add_argument("--output", "-o", help="שמירת המדדים (כולל עקומות הכיול) ל-JSON")
+    parser.add_argument("--predictions", help="שמירת כל החיזויים ל-CSV")
+    parser.add_argument("--form", action="store_true", help="הוספת הכושר האחרון של הקבוצות ערב כל משחק לקובץ החיזויים")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    # ליגות אירופיות לא נבדקות: החיזוי שלהן לא נשען על הנתונים ההיסטוריים
+    leagues = args.league or [league for league in data_loader.DATA_SOURCES if league not in EUROPEAN_LEAGUES]
+    league_data, messages = data_loader.load_league_data({league: data_loader.DATA_SOURCES[league] for league in leagues})
+    for level, message in messages:
+        print(f"{level}: {message}", file=sys.stderr)
+
+    start = time.perf_counter()
+    results = backtest_leagues(league_data, args.method, args.workers, args.min_matches, args.refit_days, args.bins,
+                               args.form)
+    elapsed = time.perf_counter() - start
+
+    summary = pd.DataFrame([
+        {"league": r["league"], **{k: v for k, v in r["overall"].items() if k != "calibration"}} for r in results
+    ])
+    with pd.option_context("display.width", 200):
+        print(summary.to_string(index=False))
+    print(f"{sum(r['overall']['matches'] for r in results):,} משחקים נבדקו ב-{elapsed:.2f}s", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump([{k: v for k, v in r.items() if k != "predictions"} for r in results], f,
+                      ensure_ascii=False, indent=1)
+    if args.predictions:
+        pd.concat([r["predictions"] for r in results], ignore_index=True).to_csv(args.predictions, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import argparse
+import logging
+import sys
+import time
+
+import pandas as pd
+
+import data_loader
+import form
+import goal_markets
+from predictor import EUROPEAN_LEAGUES, LEAGUE_TEAMS, METHODS, league_fixtures, predict_matches
+
+# ----------------------------
+# חיזוי מרוכז ללא Streamlit: כל המשחקים של ליגה או קובץ משחקים
+# ----------------------------
+CHUNK_SIZE = 50000
+
+
+def load_fixtures(path, default_league=None):
+    fixtures = pd.read_csv(path, encoding="utf-8-sig")
+    missing = {"HomeTeam", "AwayTeam"} - set(fixtures.columns)
+    if missing:
+        raise ValueError(f"חסרות עמודות בקובץ המשחקים: {', '.join(sorted(missing))}")
+    if "League" not in fixtures.columns:
+        if default_league is None:
+            raise ValueError("לקובץ אין עמודת League - יש לציין --league")
+        fixtures["League"] = default_league
+    return fixtures[["League", "HomeTeam", "AwayTeam"]]
+
+
+def league_slates(leagues):
+    for league in leagues:
+        home, away = league_fixtures(league)
+        yield league, home, away
+
+
+def fixture_slates(fixtures):
+    for league, group in fixtures.groupby("League", sort=False):
+        yield league, group["HomeTeam"].to_numpy(dtype=object), group["AwayTeam"].to_numpy(dtype=object)
+
+
+def load_data_for(leagues):
+    # רק המקורות של הליגות המבוקשות; ליגות אירופיות לא צריכות נתונים
+    sources = {league: data_loader.DATA_SOURCES[league] for league in leagues
+               if league not in EUROPEAN_LEAGUES and league in data_loader.DATA_SOURCES}
+    if not sources:
+        return {}
+    league_data, messages = data_loader.load_league_data(sources)
+    for level, message in messages:
+        print(f"{level}: {message}", file=sys.stderr)
+    return league_data
+
+
+def predict_slates(slates, league_data, method="means", chunk_size=CHUNK_SIZE, markets=False, with_form=False):
+    # markets: כל שווקי השערים (מעל/מתחת, BTTS, הנדיקפ, תוצאה מדויקת...) במקום 1X2 בלבד
+    # with_form: הכושר העדכני של המארחת בבית ושל האורחת בחוץ (רק בליגות המקומיות)
+    predict = goal_markets.match_markets if markets else predict_matches
+    for league, home, away in slates:
+        df = league_data.get(league)
+        if league not in EUROPEAN_LEAGUES and df is None:
+            print(f"error: לא נמצאו נתונים עבור {league}", file=sys.stderr)
+            continue
+        for start in range(0, len(home), chunk_size):
+            home_chunk, away_chunk = home[start:start + chunk_size], away[start:start + chunk_size]
+            result = predict(home_chunk, away_chunk, league, df, method)
+            result.insert(0, "league", league)
+            if with_form and df is not None:
+                table = form.fixture_form(form.get_form(df), home_chunk, away_chunk)
+                result = pd.concat([result, table.set_axis(result.index)], axis=1)
+            yield result
+
+
+def write_results(chunks, out, fmt):
+    rows = 0
+    for i, chunk in enumerate(chunks):
+        if fmt == "csv":
+            chunk.to_csv(out, header=(i == 0), index=False)
+        else:
+            # JSON Lines - שורה לכל משחק, כך שאפשר לקרוא תוך כדי כתיבה
+            out.write(chunk.to_json(orient="records", lines=True, force_ascii=False))
+        out.flush()
+        rows += len(chunk)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="חיזוי מרוכז של משחקים")
+    parser.add_argument("--league", action="append", choices=sorted(LEAGUE_TEAMS),
+                        help="ליגה שכל הזוגות שלה ייחזו (אפשר לחזור על הדגל)")
+    parser.add_argument("--all", action="store_true", help="כל הליגות")
+    parser.add_argument("--fixtures", help="קובץ CSV עם HomeTeam, AwayTeam ואופציונלית League")
+    parser.add_argument("--method", choices=METHODS, default="means", help="שיטת החיזוי")
+    parser.add_argument("--output", "-o", help="קובץ פלט (ברירת מחדל: stdout)")
+    parser.add_argument("--format", choices=["csv", "json"], help="csv או json (JSON Lines)")
+    parser.add_argument("--markets", action="store_true", help="כל שווקי השערים ממטריצת התוצאות, לא רק 1X2")
+    parser.add_argument("--form", action="store_true", help="הוספת הכושר האחרון (בית/חוץ) של הקבוצות")
+    args = parser.parse_args(argv)
+    # הודעות הטעינה מודפסות בנפרד; הלוג של שכבת ההורדה רק מכפיל אותן
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.fixtures:
+        try:
+            fixtures = load_fixtures(args.fixtures, args.league[0] if args.league else None)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        leagues = list(pd.unique(fixtures["League"]))
+        slates = fixture_slates(fixtures)
+    else:
+        leagues = sorted(LEAGUE_TEAMS) if args.all else (args.league or [])
+        if not leagues:
+            parser.error("יש לציין --league, --all או --fixtures")
+        slates = league_slates(leagues)
+
+    fmt = args.format
+    if fmt is None:
+        fmt = "json" if args.output and args.output.endswith((".json", ".jsonl")) else "csv"
+
+    start = time.perf_counter()
+    league_data = load_data_for(leagues)
+    loaded = time.perf_counter()
+
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        rows = write_results(predict_slates(slates, league_data, args.method, markets=args.markets,
+                                                 with_form=args.form), out, fmt)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - loaded
+
+    print(f"{rows} משחקים | טעינה {loaded - start:.2f}s | חיזוי {elapsed:.3f}s | "
+          f"{rows / max(elapsed, 1e-9):,.0f} משחקים/שנייה", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
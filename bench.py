@@ -0,0 +1,470 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+import requests
+
+import data_loader
+import disk_cache
+import dixon_coles
+import fetch
+import match_store
+import team_index
+from predictor import (EUROPEAN_LEAGUES, LEAGUE_TEAMS, get_corners_prediction, league_fixtures,
+                       predict_match_dixon_coles, predict_match_european, predict_match_regular, predict_matches)
+
+# הקבצים שהאפליקציה מורידה מ-GitHub (לפי שם)
+SOURCE_FILES = [os.path.basename(url) for urls in data_loader.DATA_SOURCES.values() for url in urls]
+
+
+# ----------------------------
+# שרת HTTP מקומי שמחקה את raw.githubusercontent.com
+# ----------------------------
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        path = data_loader.bundled_path(self.path)
+        if path is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        with open(path, "rb") as f:
+            body = f.read()
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        last_modified = formatdate(os.path.getmtime(path), usegmt=True)
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stand_in_server(latency=0.05, port=0):
+    handler = type("Handler", (_StandInHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def server_urls(server, names=SOURCE_FILES):
+    host, port = server.server_address[:2]
+    return [f"http://{host}:{port}/{name}" for name in names]
+
+
+# ----------------------------
+# מדידות
+# ----------------------------
+SINGLE_CALLS = 2000        # מספר הקריאות למדידת זמן חיזוי בודד
+BATCH_FIXTURES = 100000    # מספר המשחקים המקסימלי לחיזוי מרוכז בבדיקת ההתרחבות
+DC_MAX_MATCHES = 200000    # מעבר לזה התאמת Dixon-Coles לא נמדדת (ארוכה מדי לריצה רגילה)
+# (קבוצות, משחקים) לליגות הסינתטיות
+SCALES = [(20, 3800), (200, 100000), (2000, 1000000), (5000, 3000000)]
+QUICK_SCALES = [(20, 3800), (200, 20000), (1000, 200000)]
+
+
+def _percentiles(samples):
+    samples = np.asarray(samples) * 1e6
+    return {
+        "p50_us": round(float(np.percentile(samples, 50)), 1),
+        "p95_us": round(float(np.percentile(samples, 95)), 1),
+        "mean_us": round(float(samples.mean()), 1),
+    }
+
+
+def _latency(fn, args_list):
+    # זמן לכל קריאה בנפרד - כדי לקבל גם את הזנב (p95) ולא רק ממוצע
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        fn(*args)
+        samples.append(time.perf_counter() - start)
+    return _percentiles(samples)
+
+
+def _best_of(fn, repeat):
+    # הזמן הטוב ביותר מכמה חזרות - פחות רגיש לרעש מאשר ריצה בודדת
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _random_pairs(teams, n, rng):
+    teams = np.asarray(teams, dtype=object)
+    home = rng.integers(len(teams), size=n)
+    away = (home + rng.integers(1, len(teams), size=n)) % len(teams)
+    return teams[home], teams[away]
+
+
+def bench_fetch(latency):
+    server = start_stand_in_server(latency)
+    urls = server_urls(server)
+    try:
+        start = time.perf_counter()
+        for url in urls:
+            requests.get(url).raise_for_status()
+        sequential = time.perf_counter() - start
+
+        fetch.reset_session()
+        start = time.perf_counter()
+        cold = fetch.fetch_all(urls)
+        concurrent_cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        warm = fetch.fetch_all(urls)
+        concurrent_warm = time.perf_counter() - start
+    finally:
+        server.shutdown()
+        fetch.reset_session()
+
+    assert all(r.error is None for r in cold.values())
+    return {
+        "sources": len(urls),
+        "latency": latency,
+        "sequential_s": round(sequential, 4),
+        "concurrent_cold_s": round(concurrent_cold, 4),
+        "concurrent_warm_s": round(concurrent_warm, 4),
+        "not_modified": sum(r.not_modified for r in warm.values()),
+        "speedup": round(sequential / concurrent_cold, 1),
+    }
+
+
+def _reset_caches(cache_dir):
+    # מצב "קר": מטמון דיסק ריק, בלי ETag-ים בזיכרון ובלי אינדקסים בנויים
+    disk_cache.CACHE_DIR = cache_dir
+    disk_cache._manifest = None
+    fetch.reset_session()
+    team_index._cache.clear()
+    data_loader._previous_versions.clear()
+    data_loader._previous_league_versions.clear()
+
+
+def bench_load(latency):
+    # טעינה קרה (הכל יורד ומפוענח), חמה (304 + מיפוי הקבצים מהדיסק) ואחרי הפעלה מחדש (ETag מהדיסק)
+    server = start_stand_in_server(latency)
+    sources = {league: server_urls(server, [os.path.basename(url) for url in urls])
+               for league, urls in data_loader.DATA_SOURCES.items()}
+    original_dir = disk_cache.CACHE_DIR
+    cache_dir = tempfile.mkdtemp(prefix="champ-bench-")
+    try:
+        _reset_caches(cache_dir)
+        start = time.perf_counter()
+        league_data, _ = data_loader.load_league_data(sources)
+        cold = time.perf_counter() - start
+
+        start = time.perf_counter()
+        data_loader.load_league_data(sources)
+        warm = time.perf_counter() - start
+
+        _reset_caches(cache_dir)
+        start = time.perf_counter()
+        data_loader.load_league_data(sources)
+        restart = time.perf_counter() - start
+
+        single = {}
+        for league in ("Premier League", "Israeli Premier League"):
+            _reset_caches(tempfile.mkdtemp(dir=cache_dir))
+            start = time.perf_counter()
+            data_loader.load_league_data({league: sources[league]})
+            single[league] = round(time.perf_counter() - start, 4)
+    finally:
+        server.shutdown()
+        _reset_caches(original_dir)
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    return {
+        "latency": latency,
+        "leagues": len(league_data),
+        "rows": sum(len(df) for df in league_data.values()),
+        "cold_s": round(cold, 4),
+        "warm_s": round(warm, 4),
+        "restart_s": round(restart, 4),
+        "single_league_cold_s": single,
+    }, league_data
+
+
+def bench_predict(league_data, league="Premier League", calls=SINGLE_CALLS, seed=0):
+    # זמן חיזוי בודד (p50/p95) לכל פונקציה, וקצב חיזוי מרוכז על כל הזוגות של הליגה
+    rng = np.random.default_rng(seed)
+    df = league_data[league]
+    european = EUROPEAN_LEAGUES[0]
+    home, away = _random_pairs(LEAGUE_TEAMS[league], calls, rng)
+    euro_home, euro_away = _random_pairs(LEAGUE_TEAMS[european], calls, rng)
+
+    # חימום: בניית האינדקס והתאמת המודל לא נכללים בזמן החיזוי
+    team_index.get_team_index(df)
+    start = time.perf_counter()
+    dixon_coles.get_model(league, df)
+    dc_ready = time.perf_counter() - start
+
+    results = {
+        "league": league,
+        "dixon_coles_get_model_s": round(dc_ready, 4),
+        "predict_match_regular": _latency(predict_match_regular, [(h, a, df) for h, a in zip(home, away)]),
+        "predict_match_european": _latency(predict_match_european,
+                                           [(h, a, european) for h, a in zip(euro_home, euro_away)]),
+        "get_corners_prediction": _latency(get_corners_prediction, [(h, a, df) for h, a in zip(home, away)]),
+        "predict_match_dixon_coles": _latency(predict_match_dixon_coles,
+                                              [(h, a, league, df) for h, a in zip(home, away)]),
+    }
+
+    batch = {}
+    for name, method, data in (("means", "means", df), ("dixon_coles", "dixon_coles", df), ("european", "means", None)):
+        target = european if name == "european" else league
+        fixtures_home, fixtures_away = league_fixtures(target)
+        elapsed = _best_of(lambda: predict_matches(fixtures_home, fixtures_away, target, data, method), 5)
+        batch[name] = {"fixtures": len(fixtures_home), "elapsed_s": round(elapsed, 5),
+                       "per_fixture_us": round(elapsed / len(fixtures_home) * 1e6, 2)}
+    results["batch"] = batch
+    return results
+
+
+def synthetic_league(n_teams, n_matches, seed=0):
+    # ליגה סינתטית בפורמט של מאגר המשחקים: חוזק התקפה/הגנה אקראי, שערים וקרנות מפואסון
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Team {i:05d}" for i in range(n_teams)], dtype=object)
+    attack = rng.normal(0, 0.25, n_teams)
+    defence = rng.normal(0, 0.25, n_teams)
+    home = rng.integers(n_teams, size=n_matches)
+    away = (home + rng.integers(1, n_teams, size=n_matches)) % n_teams
+    home_rates = np.exp(0.25 + attack[home] - defence[away])
+    away_rates = np.exp(attack[away] - defence[home])
+    dates = pd.Timestamp("2025-06-30") - pd.to_timedelta(np.sort(rng.integers(0, 3650, size=n_matches))[::-1], "D")
+
+    teams = pd.CategoricalDtype(names)
+    df = pd.DataFrame({
+        "Div": pd.Categorical(["SYN"] * n_matches),
+        "Date": dates,
+        "HomeTeam": pd.Categorical.from_codes(home, dtype=teams),
+        "AwayTeam": pd.Categorical.from_codes(away, dtype=teams),
+        "FTHG": rng.poisson(home_rates).clip(0, 255).astype("uint8"),
+        "FTAG": rng.poisson(away_rates).clip(0, 255).astype("uint8"),
+        "HC": rng.poisson(5.5, n_matches).astype("uint8"),
+        "AC": rng.poisson(4.5, n_matches).astype("uint8"),
+    })
+    df = match_store.compact(df)
+    df.attrs["version"] = f"synthetic-{n_teams}-{n_matches}-{seed}"
+    return team_index.stamp(df)
+
+
+def bench_scaling(scales=SCALES, calls=SINGLE_CALLS, seed=0):
+    results = []
+    for n_teams, n_matches in scales:
+        rng = np.random.default_rng(seed)
+        start = time.perf_counter()
+        df = synthetic_league(n_teams, n_matches, seed)
+        generated = time.perf_counter() - start
+
+        start = time.perf_counter()
+        team_index.get_team_index(df)
+        index_built = time.perf_counter() - start
+
+        teams = df["HomeTeam"].cat.categories
+        home, away = _random_pairs(teams, calls, rng)
+        single = _latency(predict_match_regular, [(h, a, df) for h, a in zip(home, away)])
+
+        n_fixtures = min(BATCH_FIXTURES, n_teams * (n_teams - 1))
+        fixtures_home, fixtures_away = _random_pairs(teams, n_fixtures, rng)
+        batch = _best_of(lambda: predict_matches(fixtures_home, fixtures_away, "synthetic", df), 3)
+
+        row = {
+            "teams": n_teams,
+            "matches": n_matches,
+            "memory_mb": round(match_store.memory_usage(df) / 2 ** 20, 2),
+            "generate_s": round(generated, 4),
+            "index_build_s": round(index_built, 4),
+            "predict_match_regular": single,
+            "batch_fixtures": n_fixtures,
+            "batch_s": round(batch, 4),
+            "batch_per_fixture_us": round(batch / n_fixtures * 1e6, 2),
+        }
+        if n_matches <= DC_MAX_MATCHES:
+            start = time.perf_counter()
+            model = dixon_coles.fit(df)
+            row["dixon_coles_fit_s"] = round(time.perf_counter() - start, 4)
+            row["dixon_coles_iterations"] = model["iterations"]
+        results.append(row)
+        print(f"  {n_teams} קבוצות / {n_matches} משחקים: אינדקס {index_built:.3f}s, "
+              f"חיזוי בודד {single['p50_us']}µs, מרוכז {row['batch_per_fixture_us']}µs למשחק", file=sys.stderr)
+        del df
+    return results
+
+
+def bench_memory():
+    # זיכרון לכל ליגה: הטבלה המלאה (כל עמודות ההימורים, בלי הסרת כפילויות) מול המאגר המצומצם
+    report = {}
+    for league, urls in data_loader.DATA_SOURCES.items():
+        texts = []
+        for url in urls:
+            path = data_loader.bundled_path(url)
+            if path is not None:
+                with open(path, encoding="utf-8-sig") as f:
+                    texts.append(f.read())
+        if not texts:
+            continue
+        raw = pd.concat([pd.read_csv(StringIO(text)) for text in texts], ignore_index=True)
+        compact, unique = data_loader.combine_frames(data_loader.parse_csv(text) for text in texts)
+        compact = compact[unique]
+        raw_bytes = match_store.memory_usage(raw)
+        compact_bytes = match_store.memory_usage(compact)
+        report[league] = {
+            "rows": len(raw),
+            "unique_rows": len(compact),
+            "columns": f"{raw.shape[1]} -> {compact.shape[1]}",
+            "raw_kb": round(raw_bytes / 1024, 1),
+            "compact_kb": round(compact_bytes / 1024, 1),
+            "reduction": round(raw_bytes / compact_bytes, 1),
+        }
+    return report
+
+
+# ----------------------------
+# הרצה, שמירה לקובץ והשוואה לריצה קודמת
+# ----------------------------
+SECTIONS = ["fetch", "load", "predict", "scaling", "memory"]
+REGRESSION_THRESHOLD = 1.2  # יחס זמנים שמעליו מסמנים נסיגה
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=data_loader.BASE_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run_suite(sections=SECTIONS, latency=0.05, scales=SCALES, seed=0):
+    results = {"meta": _metadata()}
+    league_data = None
+    if "fetch" in sections:
+        results["fetch"] = bench_fetch(latency)
+    if "load" in sections or "predict" in sections:
+        results["load"], league_data = bench_load(latency)
+    if "predict" in sections:
+        results["predict"] = bench_predict(league_data, seed=seed)
+    if "scaling" in sections:
+        results["scaling"] = bench_scaling(scales, seed=seed)
+    if "memory" in sections:
+        results["memory"] = bench_memory()
+    return results
+
+
+def _timings(results, prefix=""):
+    # כל המדידות שהן זמן (סיומת _s או _us), בשמות שטוחים כמו predict.predict_match_regular.p50_us
+    if isinstance(results, dict):
+        for key, value in results.items():
+            yield from _timings(value, f"{prefix}{key}.")
+    elif isinstance(results, list):
+        for item in results:
+            label = f"{item.get('teams')}x{item.get('matches')}." if isinstance(item, dict) else ""
+            yield from _timings(item, prefix + label)
+    elif isinstance(results, (int, float)) and prefix.rstrip(".").endswith(("_s", "_us")):
+        yield prefix.rstrip("."), results
+
+
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    old_timings = dict(_timings({k: v for k, v in old.items() if k != "meta"}))
+    rows = []
+    for name, value in _timings({k: v for k, v in new.items() if k != "meta"}):
+        before = old_timings.get(name)
+        if before:
+            ratio = value / before
+            rows.append((name, before, value, ratio, ratio > threshold))
+    return rows
+
+
+def _parse_scales(text):
+    return [tuple(int(part) for part in item.split("x")) for item in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="מדידת ביצועים: הורדה, טעינה, חיזוי והתרחבות")
+    parser.add_argument("--latency", type=float, default=0.05, help="השהיה מדומה לכל בקשה (שניות)")
+    parser.add_argument("--only", help=f"רק חלק מהמדידות, מופרד בפסיקים ({','.join(SECTIONS)})")
+    parser.add_argument("--memory", action="store_true", help="השוואת זיכרון בין הטבלה המלאה למאגר המצומצם")
+    parser.add_argument("--quick", action="store_true", help="ליגות סינתטיות קטנות יותר")
+    parser.add_argument("--scales", help="ליגות סינתטיות כ-קבוצותxמשחקים, למשל 20x3800,2000x1000000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="קובץ JSON לתוצאות")
+    parser.add_argument("--compare", help="קובץ JSON של ריצה קודמת להשוואה")
+    args = parser.parse_args()
+    # השרת המקומי מחזיר תמיד תשובה - הודעות השגיאה של שכבת ההורדה רק מפריעות לפלט
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.memory:
+        for league, row in bench_memory().items():
+            print(f"{league}: " + ", ".join(f"{key}={value}" for key, value in row.items()))
+        return 0
+
+    sections = SECTIONS if args.only is None else [s.strip() for s in args.only.split(",")]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"מדידה לא מוכרת: {', '.join(sorted(unknown))}")
+    scales = _parse_scales(args.scales) if args.scales else (QUICK_SCALES if args.quick else SCALES)
+
+    results = run_suite(sections, args.latency, scales, args.seed)
+    text = json.dumps(results, ensure_ascii=False, indent=1)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        regressions = 0
+        for name, before, after, ratio, regressed in compare(old, results):
+            regressions += regressed
+            print(f"{'!' if regressed else ' '} {name}: {before} -> {after} (x{ratio:.2f})", file=sys.stderr)
+        print(f"{regressions} נסיגות מעל x{REGRESSION_THRESHOLD}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,14 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from scipy.stats import poisson
-import requests
-from io import StringIO
+
+import data_loader
+import form
+import goal_markets
+import instrument
+import ratings
+import service
+from predictor import EUROPEAN_LEAGUES, LEAGUE_TEAMS, METHODS
 
 # הגדרות דף
 st.set_page_config(
@@ -14,391 +19,42 @@ st.set_page_config(
 st.title("⚽ Football Match Predictor Pro - עונת 2025/2026")
 
 # ----------------------------
-# קבוצות לפי ליגה (עונת 2025-2026)
-# ----------------------------
-LEAGUE_TEAMS = {
-    'Bundesliga': [
-        'Augsburg', 'Bayern Munich', 'Bochum', 'Dortmund', 'Ein Frankfurt',
-        'Freiburg', 'Heidenheim', 'Hoffenheim', 'Holstein Kiel', 'Leverkusen',
-        "M'gladbach", 'Mainz', 'RB Leipzig', 'St Pauli', 'Stuttgart',
-        'Union Berlin', 'Werder Bremen', 'Wolfsburg'
-    ],
-    'Premier League': [
-        'Arsenal', 'Aston Villa', 'Bournemouth', 'Brentford', 'Brighton',
-        'Burnley', 'Chelsea', 'Crystal Palace', 'Everton', 'Fulham',
-        'Leeds United', 'Liverpool', 'Man City', 'Man United', 'Newcastle',
-        "Nott'm Forest", 'Sunderland', 'Tottenham', 'West Ham', 'Wolves'
-    ],
-    'La Liga': [
-        'Alaves', 'Almeria', 'Ath Bilbao', 'Ath Madrid', 'Barcelona', 'Betis',
-        'Cadiz', 'Celta', 'Getafe', 'Girona', 'Las Palmas', 'Leganes',
-        'Mallorca', 'Osasuna', 'Real Madrid', 'Sevilla', 'Sociedad',
-        'Valencia', 'Valladolid', 'Villarreal'
-    ],
-    'Ligue 1': [
-        'Angers', 'Auxerre', 'Brest', 'Le Havre', 'Lens', 'Lille', 'Lyon',
-        'Marseille', 'Monaco', 'Montpellier', 'Nantes', 'Nice', 'Paris SG',
-        'Reims', 'Rennes', 'St Etienne', 'Strasbourg', 'Toulouse'
-    ],
-    'Serie A': [
-        'Atalanta', 'Bologna', 'Cagliari', 'Como', 'Empoli', 'Fiorentina',
-        'Genoa', 'Inter', 'Juventus', 'Lazio', 'Lecce', 'Milan', 'Monza',
-        'Napoli', 'Parma', 'Roma', 'Torino', 'Udinese', 'Venezia', 'Verona'
-    ],
-    # ליגת האלופות עונת 2025-2026 (מורחבת)
-    'Champions League': [
-        'Real Madrid', 'Barcelona', 'Ath Madrid', 'Athletic Bilbao',
-        'Bayern Munich', 'Dortmund', 'RB Leipzig', 'Leverkusen', 'Stuttgart',
-        'Inter', 'Milan', 'Juventus', 'Atalanta', 'Bologna', 'AC Fiorentina',
-        'Man City', 'Arsenal', 'Liverpool', 'Chelsea', 'Aston Villa', 'Newcastle',
-        'Paris SG', 'Monaco', 'Lille', 'Brest', 'Lyon',
-        'Celtic', 'Rangers', 'PSV', 'Feyenoord', 'Ajax',
-        'Benfica', 'Porto', 'Sporting', 'Braga',
-        'Shakhtar', 'Dynamo Kyiv',
-        'Young Boys', 'Red Star Belgrade', 'Sparta Prague', 'Slavia Prague',
-        'Club Brugge', 'Anderlecht', 'Salzburg', 'Sturm Graz',
-        'Galatasaray', 'Fenerbahce', 'Besiktas',
-        'Bodo/Glimt', 'Molde', 'Copenhagen',
-        'Maccabi Tel Aviv'
-    ],
-    # ליגת אירופה עונת 2025-2026 (מעודכנת)
-    'Europa League': [
-        'Man United', 'Tottenham', 'West Ham', 'Brighton', 'Fulham',
-        'Roma', 'Lazio', 'Fiorentina', 'Napoli', 'Torino',
-        'Ein Frankfurt', 'Hoffenheim', 'Union Berlin', 'Mainz',
-        'Lyon', 'Nice', 'Marseille', 'Rennes', 'Strasbourg', 'Lens',
-        'Villarreal', 'Betis', 'Sociedad', 'Sevilla', 'Valencia', 'Celta',
-        'Ajax', 'AZ Alkmaar', 'Twente', 'Utrecht', 'Vitesse',
-        'Braga', 'Vitoria Guimaraes', 'Rio Ave',
-        'Fenerbahce', 'Galatasaray', 'Besiktas', 'Trabzonspor',
-        'Olympiacos', 'PAOK', 'AEK Athens', 'Panathinaikos',
-        'Qarabag', 'Ludogorets', 'FCSB', 'CFR Cluj',
-        'Slavia Prague', 'Viktoria Plzen', 'Sparta Prague',
-        'Anderlecht', 'Union SG', 'Gent', 'Club Brugge',
-        'Midtjylland', 'Copenhagen', 'Bodo/Glimt', 'Molde',
-        'Elfsborg', 'Malmo', 'Hammarby', 'AIK', 'Hacken',
-        'Sheriff Tiraspol', 'Petrocub', 'Pyunik', 'Ararat-Armenia',
-        'Riga FC', 'RFS', 'Flora', 'Levadia',
-        'Zalgiris', 'Suduva', 'Dinamo Minsk', 'BATE',
-        'Partizan Belgrade', 'Red Star', 'Vojvodina',
-        'Dinamo Zagreb', 'Rijeka', 'Hajduk Split',
-        'Maribor', 'Olimpija', 'Mura', 'Celje',
-        'Shamrock Rovers', 'Derry City', 'St Patricks',
-        'Hapoel Beer Sheva', 'Maccabi Tel Aviv', 'Maccabi Haifa',
-        'Levski Sofia', 'CSKA Sofia', 'Arda Kardzhali',
-        'Legia Warsaw', 'Cracovia', 'Pogon Szczecin',
-        'Paksi FC', 'Ferencvaros', 'Debrecen',
-        'AEK Larnaca', 'Omonia', 'APOEL',
-        'Sabah Baku', 'Zira', 'Qarabag',
-        'Spartak Trnava', 'Zilina', 'Slovan Bratislava',
-        'Aktobe', 'Astana', 'Ordabasy',
-        'Ilves Tampere', 'HJK Helsinki', 'KuPS',
-        'Prishtina', 'Ballkani', 'Drita'
-    ],
-    # ליגת הקונפרנס עונת 2025-2026 (מעודכנת)
-    'Conference League': [
-        'Chelsea', 'Brighton', 'Fulham', 'Crystal Palace', 'Brentford',
-        'Fiorentina', 'Atalanta', 'Roma', 'Lazio', 'Genoa', 'Empoli',
-        'Nice', 'Marseille', 'Rennes', 'Lyon', 'Toulouse', 'Montpellier',
-        'Villarreal', 'Betis', 'Valencia', 'Getafe', 'Osasuna',
-        'Ein Frankfurt', 'Union Berlin', 'Hoffenheim', 'Freiburg', 'Augsburg',
-        'Ajax', 'AZ Alkmaar', 'Twente', 'Utrecht', 'Vitesse', 'Go Ahead Eagles',
-        'Celtic', 'Rangers', 'Hearts', 'Aberdeen', 'Hibernian',
-        'PAOK', 'Olympiacos', 'AEK Athens', 'Panathinaikos', 'Aris',
-        'Astana', 'Petrocub', 'Vikingur', 'TNS',
-        'Shamrock Rovers', 'Derry City', 'Celje', 'Olimpija',
-        'Cercle Brugge', 'Gent', 'Anderlecht', 'Standard Liege', 'Mechelen',
-        'Molde', 'Bodo/Glimt', 'Rosenborg', 'Viking', 'Stromsgodset',
-        'Djurgarden', 'Hammarby', 'Elfsborg', 'Hacken', 'Sirius',
-        'Heidenheim', 'St Gallen', 'Lugano', 'Basel', 'Zurich',
-        'Borac', 'Zrinjski', 'Jagiellonia', 'Legia Warsaw',
-        'Rapid Vienna', 'LASK', 'Austria Vienna', 'Sturm Graz',
-        'Pafos', 'Omonia', 'APOEL', 'AEL',
-        'Maccabi Haifa', 'Beitar Jerusalem',
-        'Dinamo Tbilisi', 'Torpedo Kutaisi', 'Sabah', 'Zira',
-        'Ararat-Armenia', 'Pyunik', 'Alashkert', 'Noah',
-        'Ballkani', 'Drita', 'Llapi', 'Prishtina',
-        'Partizan', 'Red Star', 'Cukaricki', 'Vojvodina',
-        'Dinamo Zagreb', 'Rijeka', 'Hajduk Split', 'Osijek',
-        'Maribor', 'Olimpija', 'Mura', 'Domzale',
-        'CSKA Sofia', 'Ludogorets', 'Arda',
-        'FCSB', 'CFR Cluj', 'Rapid Bucharest', 'Universitatea Craiova',
-        'Slovan Bratislava', 'Spartak Trnava', 'Zilina', 'Dunajska Streda',
-        'Sparta Prague', 'Slavia Prague', 'Viktoria Plzen', 'Jablonec',
-        'Ferencvaros', 'Puskas Academy', 'Debrecen', 'Ujpest',
-        'Lechia Gdansk', 'Cracovia', 'Pogon Szczecin', 'Warta Poznan',
-        'HJK Helsinki', 'KuPS', 'FC Inter Turku', 'Honka',
-        'Flora Tallinn', 'Levadia', 'Kalju', 'Paide',
-        'Riga FC', 'Valmiera', 'Liepaja', 'Jelgava'
-    ],
-    # ליגת העל הישראלית עונת 2025-2026
-    'Israeli Premier League': [
-        'Maccabi Tel Aviv', 'Maccabi Haifa', 'Hapoel Beer Sheva', 'Beitar Jerusalem',
-        'Hapoel Tel Aviv', 'Maccabi Netanya', 'Hapoel Haifa', 'Ashdod',
-        'Hapoel Jerusalem', 'Bnei Sakhnin', 'Maccabi Bnei Raina', 'Ironi Kiryat Shmona',
-        'Hapoel Katamon', 'Hapoel Petah Tikva', 'Hapoel Hadera', 'Maccabi Petah Tikva'
-    ]
-}
-
-# נתוני ביצועים של קבוצות אירופיות (מעודכן לעונת 2025-2026)
-EUROPEAN_TEAM_STATS = {
-    # Champions League - טיר עליון
-    'Real Madrid': {'home_goals': 2.9, 'away_goals': 2.3, 'home_conceded': 0.8, 'away_conceded': 1.0, 'strength': 96},
-    'Barcelona': {'home_goals': 2.7, 'away_goals': 2.1, 'home_conceded': 0.9, 'away_conceded': 1.2, 'strength': 91},
-    'Bayern Munich': {'home_goals': 3.0, 'away_goals': 2.4, 'home_conceded': 0.7, 'away_conceded': 0.9, 'strength': 94},
-    'Man City': {'home_goals': 2.8, 'away_goals': 2.2, 'home_conceded': 0.8, 'away_conceded': 1.1, 'strength': 93},
-    'Paris SG': {'home_goals': 2.6, 'away_goals': 2.0, 'home_conceded': 0.9, 'away_conceded': 1.2, 'strength': 89},
-    'Liverpool': {'home_goals': 2.5, 'away_goals': 1.9, 'home_conceded': 1.0, 'away_conceded': 1.3, 'strength': 88},
-    'Inter': {'home_goals': 2.4, 'away_goals': 1.8, 'home_conceded': 0.9, 'away_conceded': 1.1, 'strength': 86},
-    'Arsenal': {'home_goals': 2.4, 'away_goals': 1.8, 'home_conceded': 1.0, 'away_conceded': 1.3, 'strength': 85},
-    'Dortmund': {'home_goals': 2.5, 'away_goals': 1.9, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 84},
-    'Chelsea': {'home_goals': 2.3, 'away_goals': 1.7, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 83},
-    'Ath Madrid': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 0.7, 'away_conceded': 1.0, 'strength': 82},
-    'Milan': {'home_goals': 2.2, 'away_goals': 1.6, 'home_conceded': 1.1, 'away_conceded': 1.3, 'strength': 81},
-    'Napoli': {'home_goals': 2.3, 'away_goals': 1.7, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 80},
-    'Juventus': {'home_goals': 2.1, 'away_goals': 1.5, 'home_conceded': 1.0, 'away_conceded': 1.2, 'strength': 79},
-    'Atalanta': {'home_goals': 2.3, 'away_goals': 1.7, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 78},
-    'Bologna': {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 74},
-    'Aston Villa': {'home_goals': 2.1, 'away_goals': 1.5, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 76},
-    'Monaco': {'home_goals': 2.2, 'away_goals': 1.6, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 77},
-    'Lille': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.0, 'away_conceded': 1.3, 'strength': 73},
-    'Brest': {'home_goals': 1.7, 'away_goals': 1.1, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 69},
-    'Newcastle': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 74},
-    'Stuttgart': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 75},
-    'Lyon': {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 72},
-    'Athletic Bilbao': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 73},
-    'AC Fiorentina': {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 73},
-    'Maccabi Tel Aviv': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 68},
-    
-    # קבוצות מהמוקדמות
-    'Celtic': {'home_goals': 2.3, 'away_goals': 1.5, 'home_conceded': 1.0, 'away_conceded': 1.4, 'strength': 72},
-    'Rangers': {'home_goals': 2.1, 'away_goals': 1.3, 'home_conceded': 1.1, 'away_conceded': 1.5, 'strength': 70},
-    'PSV': {'home_goals': 2.2, 'away_goals': 1.6, 'home_conceded': 0.9, 'away_conceded': 1.2, 'strength': 75},
-    'Feyenoord': {'home_goals': 2.1, 'away_goals': 1.5, 'home_conceded': 1.0, 'away_conceded': 1.3, 'strength': 74},
-    'Ajax': {'home_goals': 2.1, 'away_goals': 1.5, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 74},
-    'Benfica': {'home_goals': 2.4, 'away_goals': 1.8, 'home_conceded': 0.9, 'away_conceded': 1.2, 'strength': 77},
-    'Porto': {'home_goals': 2.3, 'away_goals': 1.7, 'home_conceded': 1.0, 'away_conceded': 1.3, 'strength': 76},
-    'Sporting': {'home_goals': 2.5, 'away_goals': 1.9, 'home_conceded': 0.9, 'away_conceded': 1.2, 'strength': 78},
-    'Braga': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 73},
-    'Shakhtar': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 71},
-    'RB Leipzig': {'home_goals': 2.1, 'away_goals': 1.5, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 77},
-    'Leverkusen': {'home_goals': 2.4, 'away_goals': 1.8, 'home_conceded': 1.0, 'away_conceded': 1.3, 'strength': 80},
-    'Galatasaray': {'home_goals': 2.1, 'away_goals': 1.5, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 74},
-    'Fenerbahce': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 73},
-    'Bodo/Glimt': {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 71},
-    
-    # Europa League - טיר בינוני
-    'Man United': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 75},
-    'Tottenham': {'home_goals': 2.2, 'away_goals': 1.6, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 76},
-    'West Ham': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 71},
-    'Roma': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 74},
-    'Lazio': {'home_goals': 2.1, 'away_goals': 1.5, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 75},
-    'Fiorentina': {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 73},
-    'Ein Frankfurt': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 74},
-    'Hoffenheim': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 70},
-    'Union Berlin': {'home_goals': 1.7, 'away_goals': 1.1, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 69},
-    'Nice': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 71},
-    'Marseille': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 73},
-    'Villarreal': {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 72},
-    'Betis': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 71},
-    'Sociedad': {'home_goals': 1.7, 'away_goals': 1.1, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 70},
-    'Sevilla': {'home_goals': 1.6, 'away_goals': 1.0, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 68},
-    'AZ Alkmaar': {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 72},
-    'Twente': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 70},
-    'Hapoel Beer Sheva': {'home_goals': 1.7, 'away_goals': 1.1, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 67},
-    
-    # Conference League - טיר נמוך יותר
-    'Brighton': {'home_goals': 1.7, 'away_goals': 1.1, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 68},
-    'Fulham': {'home_goals': 1.6, 'away_goals': 1.0, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 67},
-    'Crystal Palace': {'home_goals': 1.5, 'away_goals': 0.9, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 66},
-    'Hearts': {'home_goals': 1.5, 'away_goals': 0.9, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 64},
-    'Aberdeen': {'home_goals': 1.4, 'away_goals': 0.8, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 63},
-    'PAOK': {'home_goals': 1.6, 'away_goals': 1.0, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 66},
-    'Olympiacos': {'home_goals': 1.7, 'away_goals': 1.1, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 68},
-    'AEK Athens': {'home_goals': 1.5, 'away_goals': 0.9, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 65},
-    'Panathinaikos': {'home_goals': 1.4, 'away_goals': 0.8, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 64},
-    'Molde': {'home_goals': 1.6, 'away_goals': 1.0, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 66},
-    'Djurgarden': {'home_goals': 1.5, 'away_goals': 0.9, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 65},
-    'Hammarby': {'home_goals': 1.4, 'away_goals': 0.8, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 63},
-    'Elfsborg': {'home_goals': 1.3, 'away_goals': 0.7, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 62},
-    'Heidenheim': {'home_goals': 1.2, 'away_goals': 0.6, 'home_conceded': 1.5, 'away_conceded': 1.8, 'strength': 60},
-    'St Gallen': {'home_goals': 1.3, 'away_goals': 0.7, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 61},
-    'Lugano': {'home_goals': 1.2, 'away_goals': 0.6, 'home_conceded': 1.5, 'away_conceded': 1.8, 'strength': 59},
-    'Genoa': {'home_goals': 1.4, 'away_goals': 0.8, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 63},
-    'Empoli': {'home_goals': 1.3, 'away_goals': 0.7, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 62},
-    'Maccabi Haifa': {'home_goals': 1.6, 'away_goals': 1.0, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 65},
-    'Beitar Jerusalem': {'home_goals': 1.4, 'away_goals': 0.8, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 62}
-}
-
-# הוספת נתונים בסיסיים לקבוצות אחרות
-def get_team_stats(team, league_type):
-    if team in EUROPEAN_TEAM_STATS:
-        return EUROPEAN_TEAM_STATS[team]
-    
-    # נתונים בסיסיים לפי רמת הליגה
-    if league_type == 'Champions League':
-        return {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 76}
-    elif league_type == 'Europa League':
-        return {'home_goals': 1.7, 'away_goals': 1.1, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 71}
-    else:  # Conference League
-        return {'home_goals': 1.5, 'away_goals': 0.9, 'home_conceded': 1.5, 'away_conceded': 1.8, 'strength': 66}
-
-# ----------------------------
-# טעינת נתונים אוטומטית מ-GitHub
+# אבחון ביצועים (אופציונלי) - מדידת זמנים לכל שלב בהרצה הנוכחית
 # ----------------------------
-def load_github_data(github_raw_url):
-    try:
-        response = requests.get(github_raw_url)
-        response.raise_for_status()
-        return pd.read_csv(StringIO(response.text))
-    except Exception as e:
-        st.error(f"שגיאה בטעינת נתונים: {str(e)}")
-        return None
-
-@st.cache_data(ttl=3600)  # רענון נתונים כל שעה
-def load_league_data():
-    data_sources = {
-        "Premier League": [
-            "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/epl.csv",
-            "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/premier_league_csv.csv"
-        ],
-        "La Liga": [
-            "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/laliga.csv",
-            "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/laliga_csv.csv"
-        ],
-        "Serie A": [
-            "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/seriea.csv",
-            "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/serie_a_csv.csv"
-        ],
-        "Bundesliga": [
-            "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/bundesliga.csv",
-            "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/bundesliga_csv.csv"
-        ],
-        "Ligue 1": [
-            "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/ligue1.csv",
-            "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/ligue1_csv.csv"
-        ],
-        "Israeli Premier League": [
-            "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/israeli_premier_league_csv.csv"
-        ],
-        "Champions League": [
-            "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/champions_league_csv.csv"
-        ],
-        "Europa League": [
-            "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/europa_league_csv.csv"
-        ],
-        "Conference League": [
-            "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/conference_league_csv.csv"
-        ]
-    }
-    
-    league_data = {}
-    for league, urls in data_sources.items():
-        combined_df = None
-        
-        for url in urls:
-            df = load_github_data(url)
-            if df is not None:
-                if combined_df is None:
-                    combined_df = df
-                else:
-                    # שילוב של שני DataFrames
-                    combined_df = pd.concat([combined_df, df], ignore_index=True)
-        
-        if combined_df is not None:
-            league_data[league] = combined_df
-    
-    return league_data
-
-# ----------------------------
-# פונקציות חיזוי - ליגות רגילות
-# ----------------------------
-def predict_match_regular(home_team, away_team, df):
-    # חישוב ממוצעי שערים
-    home_goals = df[df['HomeTeam'] == home_team]['FTHG'].mean()
-    away_goals = df[df['AwayTeam'] == away_team]['FTAG'].mean()
-    
-    # חישוב הסתברויות פואסון
-    max_goals = 5
-    home_win = draw = away_win = 0.0
-    
-    for i in range(max_goals+1):
-        for j in range(max_goals+1):
-            p = poisson.pmf(i, home_goals) * poisson.pmf(j, away_goals)
-            if i > j: home_win += p
-            elif i == j: draw += p
-            else: away_win += p
-    
-    return {
-        "home_win": round(home_win, 3),
-        "draw": round(draw, 3),
-        "away_win": round(away_win, 3),
-        "total_goals": round(home_goals + away_goals, 1),
-        "total_corners": get_corners_prediction(home_team, away_team, df)
-    }
+# האיסוף מוגבל ל-thread של ההרצה הזו - לא מדליק מדידה לשאר המשתמשים ולא מציג spans של טעינות ברקע
+show_diagnostics = st.sidebar.checkbox("🩺 אבחון ביצועים", value=False)
+instrument.end_trace()  # הרצה קודמת שנעצרה באמצע (st.stop) לא משאירה איסוף פתוח
+run_trace = instrument.begin_trace() if show_diagnostics else None
 
 # ----------------------------
-# פונקציות חיזוי - ליגות אירופיות
+# טעינת נתונים אוטומטית מ-GitHub - רק הליגה שנבחרה, והשאר ברקע
+# (הנתונים והחיזויים נשמרים בליבת השירות, כך שהרצה מחדש של הדף כמעט לא עולה כלום)
 # ----------------------------
-def predict_match_european(home_team, away_team, league_type):
-    home_stats = get_team_stats(home_team, league_type)
-    away_stats = get_team_stats(away_team, league_type)
-    
-    # חישוב שערים צפויים עם התחשבות בחוזק היחסי
-    strength_factor = home_stats['strength'] / away_stats['strength']
-    
-    # התאמת יתרון הבית לליגות אירופיות (יותר מאוזן)
-    home_advantage = 0.25 if league_type == 'Champions League' else 0.3
-    away_disadvantage = 0.15 if league_type == 'Champions League' else 0.2
-    
-    # התאמת יתרון הבית לליגות אירופיות (יותר מאוזן)
-    home_goals_expected = home_stats['home_goals'] * (1 + (strength_factor - 1) * 0.3)
-    away_goals_expected = away_stats['away_goals'] * (1 + (1/strength_factor - 1) * 0.2)
-    
-    # חישוב הסתברויות פואסון
-    max_goals = 5
-    home_win = draw = away_win = 0.0
-    
-    for i in range(max_goals+1):
-        for j in range(max_goals+1):
-            p = poisson.pmf(i, home_goals_expected) * poisson.pmf(j, away_goals_expected)
-            if i > j: home_win += p
-            elif i == j: draw += p
-            else: away_win += p
-    
-    # חישוב קרנות משוער (בהתבסס על סגנון משחק)
-    corners_home = 5.5 + (home_stats['strength'] - 75) * 0.05
-    corners_away = 4.5 + (away_stats['strength'] - 75) * 0.03
-    
-    return {
-        "home_win": round(home_win, 3),
-        "draw": round(draw, 3),
-        "away_win": round(away_win, 3),
-        "total_goals": round(home_goals_expected + away_goals_expected, 1),
-        "total_corners": round(corners_home + corners_away, 1)
-    }
+def load_league(league):
+    # ללא רשת - נטען מהמטמון בדיסק או מקבצי ה-CSV שבריפו
+    league_df, messages = service.league_data(league)
+    for level, message in messages:
+        if level == "error":
+            st.error(message)
+        else:
+            st.warning(message)
+    return league_df
 
-def get_corners_prediction(home_team, away_team, df):
-    if 'HC' in df.columns and 'AC' in df.columns:
-        home_corners = df[df['HomeTeam'] == home_team]['HC'].mean()
-        away_corners = df[df['AwayTeam'] == away_team]['AC'].mean()
-        return round(home_corners + away_corners, 1)
-    return None
+@st.cache_resource
+def prefetch_other_leagues(_selected_league):
+    # רץ פעם אחת לכל תהליך; ליגות אירופיות לא משתמשות בנתונים ולא נטענות
+    data_loader.prefetch_leagues(
+        league for league in data_loader.DATA_SOURCES
+        if league not in EUROPEAN_LEAGUES and league != _selected_league
+    )
+    return True
 
-# ----------------------------
-# פונקציה מאוחדת לחיזוי
-# ----------------------------
-def predict_match(home_team, away_team, league, df=None):
-    if league in ['Champions League', 'Europa League', 'Conference League']:
-        return predict_match_european(home_team, away_team, league)
-    else:
-        return predict_match_regular(home_team, away_team, df)
+# דירוג ה-Elo של כל המקורות נבנה ברקע (ומתרענן כל שעה) - החיזוי לא מחכה לו
+ratings.refresh_in_background()
 
 # ----------------------------
 # ממשק משתמש
 # ----------------------------
-data = load_league_data()
-
 # קיבוץ הליגות לתצוגה נוחה
 league_categories = {
     "🏆 ליגות אירופיות": ['Champions League', 'Europa League', 'Conference League'],
@@ -411,6 +67,11 @@ selected_category = st.selectbox("בחר קטגוריה", options=list(league_ca
 available_leagues = league_categories[selected_category]
 selected_league = st.selectbox("בחר ליגה", options=available_leagues)
 
+league_df = None
+if selected_league not in EUROPEAN_LEAGUES:
+    league_df = load_league(selected_league)
+    prefetch_other_leagues(selected_league)
+
 if selected_league in LEAGUE_TEAMS:
     teams = LEAGUE_TEAMS[selected_league]
     col1, col2 = st.columns(2)
@@ -421,72 +82,141 @@ if selected_league in LEAGUE_TEAMS:
     with col2:
         away_team = st.selectbox("קבוצה אורחת", options=[t for t in teams if t != home_team])
     
+    # בליגות מקומיות - בחירה בין ממוצעי קבוצות למודל התקפה/הגנה
+    method = 'means'
+    if selected_league not in EUROPEAN_LEAGUES:
+        method = st.radio(
+            "מודל חיזוי",
+            options=METHODS,
+            format_func=lambda m: "ממוצעי קבוצות" if m == 'means' else "Dixon-Coles (התקפה/הגנה עם דעיכה בזמן)",
+            horizontal=True
+        )
+    
     if st.button("חשב חיזוי ⚡", type="primary"):
         # בחירת פונקציית חיזוי מתאימה
-        if selected_league in ['Champions League', 'Europa League', 'Conference League']:
-            prediction = predict_match(home_team, away_team, selected_league)
+        if selected_league in EUROPEAN_LEAGUES:
+            prediction = service.predict(selected_league, home_team, away_team)
+            goals_markets = service.markets(selected_league, home_team, away_team)
             st.info("🌟 חיזוי מבוסס על ביצועים אירופיים ודירוגי קבוצות")
-        elif selected_league in data and not data[selected_league].empty:
-            prediction = predict_match(home_team, away_team, selected_league, data[selected_league])
+        elif league_df is not None and not league_df.empty:
+            prediction = service.predict(selected_league, home_team, away_team, method)
+            goals_markets = service.markets(selected_league, home_team, away_team, method)
             st.info("📊 חיזוי מבוסס על נתונים היסטוריים של הליגה")
         else:
             st.error("לא נמצאו נתונים עבור הליגה הנבחרת")
             st.stop()
         
         # הצגת תוצאות
-        st.subheader("🔮 תוצאות חיזוי:")
+        with instrument.span("render"):
+            st.subheader("🔮 תוצאות חיזוי:")
+        
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.metric(
+                    label=f"🏠 ניצחון ל־{home_team}", 
+                    value=f"{prediction['home_win']*100:.1f}%",
+                    delta=f"{prediction['home_win']*100 - 33.3:.1f}%" if prediction['home_win']*100 > 33.3 else None
+                )
+            with col2:
+                st.metric(
+                    label="🤝 תיקו", 
+                    value=f"{prediction['draw']*100:.1f}%",
+                    delta=f"{prediction['draw']*100 - 33.3:.1f}%" if prediction['draw']*100 > 33.3 else None
+                )
+            with col3:
+                st.metric(
+                    label=f"✈️ ניצחון ל־{away_team}", 
+                    value=f"{prediction['away_win']*100:.1f}%",
+                    delta=f"{prediction['away_win']*100 - 33.3:.1f}%" if prediction['away_win']*100 > 33.3 else None
+                )
         
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            st.metric(
-                label=f"🏠 ניצחון ל־{home_team}", 
-                value=f"{prediction['home_win']*100:.1f}%",
-                delta=f"{prediction['home_win']*100 - 33.3:.1f}%" if prediction['home_win']*100 > 33.3 else None
-            )
-        with col2:
-            st.metric(
-                label="🤝 תיקו", 
-                value=f"{prediction['draw']*100:.1f}%",
-                delta=f"{prediction['draw']*100 - 33.3:.1f}%" if prediction['draw']*100 > 33.3 else None
-            )
-        with col3:
-            st.metric(
-                label=f"✈️ ניצחון ל־{away_team}", 
-                value=f"{prediction['away_win']*100:.1f}%",
-                delta=f"{prediction['away_win']*100 - 33.3:.1f}%" if prediction['away_win']*100 > 33.3 else None
-            )
+            st.divider()
         
-        st.divider()
+            # סטטיסטיקות נוספות
+            st.subheader("📊 סטטיסטיקות נוספות")
+            col1, col2 = st.columns(2)
         
-        # סטטיסטיקות נוספות
-        st.subheader("📊 סטטיסטיקות נוספות")
-        col1, col2 = st.columns(2)
+            with col1:
+                st.metric("⚽ שערים צפויים", f"{prediction['total_goals']}")
         
-        with col1:
-            st.metric("⚽ שערים צפויים", f"{prediction['total_goals']}")
+            with col2:
+                if prediction['total_corners'] is not None:
+                    st.metric("🚩 קרנות צפויות", f"{prediction['total_corners']}")
+                else:
+                    st.metric("🚩 קרנות צפויות", "לא זמין")
+        
+            # המלצות הימור
+            st.subheader("💡 המלצות")
+            max_prob = max(prediction['home_win'], prediction['draw'], prediction['away_win'])
         
-        with col2:
-            if prediction['total_corners'] is not None:
-                st.metric("🚩 קרנות צפויות", f"{prediction['total_corners']}")
+            if max_prob == prediction['home_win']:
+                st.success(f"🏠 ההימור המומלץ: ניצחון ל־{home_team} ({prediction['home_win']*100:.1f}%)")
+            elif max_prob == prediction['draw']:
+                st.success(f"🤝 ההימור המומלץ: תיקו ({prediction['draw']*100:.1f}%)")
             else:
-                st.metric("🚩 קרנות צפויות", "לא זמין")
+                st.success(f"✈️ ההימור המומלץ: ניצחון ל־{away_team} ({prediction['away_win']*100:.1f}%)")
         
-        # המלצות הימור
-        st.subheader("💡 המלצות")
-        max_prob = max(prediction['home_win'], prediction['draw'], prediction['away_win'])
+            # המלצות נוספות - לפי ההסתברות מהמטריצה ולא לפי ממוצע השערים
+            if goals_markets['over_2.5'] > 0.5:
+                st.info(f"⚽ משחק עתיר שערים - המלצה: מעל 2.5 שערים ({goals_markets['over_2.5']*100:.1f}%)")
+            else:
+                st.info(f"🛡️ משחק דחוס - המלצה: מתחת ל-2.5 שערים ({goals_markets['under_2.5']*100:.1f}%)")
         
-        if max_prob == prediction['home_win']:
-            st.success(f"🏠 ההימור המומלץ: ניצחון ל־{home_team} ({prediction['home_win']*100:.1f}%)")
-        elif max_prob == prediction['draw']:
-            st.success(f"🤝 ההימור המומלץ: תיקו ({prediction['draw']*100:.1f}%)")
-        else:
-            st.success(f"✈️ ההימור המומלץ: ניצחון ל־{away_team} ({prediction['away_win']*100:.1f}%)")
+            with st.expander("📈 כל שווקי השערים"):
+                def percent(value):
+                    return f"{value*100:.1f}%"
         
-        # המלצות נוספות
-        if prediction['total_goals'] > 2.5:
-            st.info(f"⚽ משחק עתיר שערים - המלצה: מעל 2.5 שערים ({prediction['total_goals']} צפוי)")
-        else:
-            st.info(f"🛡️ משחק דחוס - המלצה: מתחת ל-2.5 שערים ({prediction['total_goals']} צפוי)")
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.markdown("**מעל / מתחת**")
+                    st.dataframe(pd.DataFrame({
+                        "קו": [f"{line:g}" for line in goal_markets.OVER_UNDER_LINES],
+                        "מעל": [percent(goals_markets[f"over_{line:g}"]) for line in goal_markets.OVER_UNDER_LINES],
+                        "מתחת": [percent(goals_markets[f"under_{line:g}"]) for line in goal_markets.OVER_UNDER_LINES],
+                    }), hide_index=True)
+                    st.markdown("**תוצאה מדויקת**")
+                    st.dataframe(pd.DataFrame({
+                        "תוצאה": [goals_markets[f"score_{rank}"] for rank in range(1, goal_markets.TOP_SCORES + 1)],
+                        "הסתברות": [percent(goals_markets[f"score_{rank}_prob"])
+                                     for rank in range(1, goal_markets.TOP_SCORES + 1)],
+                    }), hide_index=True)
+                with col2:
+                    st.markdown("**שונות**")
+                    st.dataframe(pd.DataFrame({
+                        "שוק": ["שתי הקבוצות יבקיעו", f"שער נקי ל־{home_team}", f"שער נקי ל־{away_team}",
+                                f"{home_team} או תיקו", f"{away_team} או תיקו", "ללא תיקו"],
+                        "הסתברות": [percent(goals_markets[name]) for name in
+                                     ["btts_yes", "home_clean_sheet", "away_clean_sheet",
+                                      "home_or_draw", "away_or_draw", "home_or_away"]],
+                    }), hide_index=True)
+                    st.markdown(f"**הנדיקפ אסייתי (הקו של {home_team})**")
+                    names = [goal_markets.line_name(line) for line in goal_markets.HANDICAP_LINES]
+                    st.dataframe(pd.DataFrame({
+                        "קו": names,
+                        "בית": [percent(goals_markets[f"ah_{name}_home"]) for name in names],
+                        "החזר": [percent(goals_markets[f"ah_{name}_push"]) for name in names],
+                        "חוץ": [percent(goals_markets[f"ah_{name}_away"]) for name in names],
+                    }), hide_index=True)
+        
+            # כושר אחרון - רק בליגות המקומיות (שם יש היסטוריית משחקים)
+            if prediction.get('form'):
+                with st.expander("🔥 כושר אחרון"):
+                    home_form, away_form = prediction['form']['home'], prediction['form']['away']
+                    stats = {"goals": "שערים", "corners": "קרנות", "shots": "בעיטות", "shots_on_target": "בעיטות למסגרת"}
+                    recent = f"last{form.FORM_MATCHES}"
+                    rows = []
+                    for stat, label in stats.items():
+                        for side, side_label in (("for", "זכות"), ("against", "חובה")):
+                            rows.append({
+                                "מדד": f"{label} ({side_label})",
+                                f"{home_team} - {form.FORM_MATCHES} אחרונים בבית": home_form.get(f"{stat}_{side}_{recent}"),
+                                f"{home_team} - ממוצע משוקלל": home_form.get(f"{stat}_{side}_ewm"),
+                                f"{away_team} - {form.FORM_MATCHES} אחרונים בחוץ": away_form.get(f"{stat}_{side}_{recent}"),
+                                f"{away_team} - ממוצע משוקלל": away_form.get(f"{stat}_{side}_ewm"),
+                            })
+                    st.dataframe(pd.DataFrame(rows), hide_index=True)
+                    st.caption(f"משחקי בית של {home_team}: {home_form['matches']} | "
+                               f"משחקי חוץ של {away_team}: {away_form['matches']}")
 
 else:
     st.error("שגיאה בטעינת נתוני הליגה")
@@ -495,6 +225,8 @@ else:
 with st.expander("ℹ️ מידע על השיטה"):
     st.markdown("""
     **ליגות מקומיות**: החיזוי מבוסס על נתונים היסטוריים אמיתיים של המשחקים באמצעות התפלגות פואסון.
+    במודל Dixon-Coles לכל קבוצה מותאמים כוח התקפה וכוח הגנה (עם משקל גבוה יותר למשחקים אחרונים),
+    יתרון בית ותיקון לתוצאות נמוכות (0-0, 1-0, 0-1, 1-1).
     
     **ליגות אירופיות**: החיזוי מבוסס על:
     - ביצועים היסטוריים של הקבוצות בתחרויות אירופיות
@@ -505,5 +237,17 @@ with st.expander("ℹ️ מידע על השיטה"):
     **שיטת החישוב**: התפלגות פואסון למשחקי כדורגל עם התאמות לפי סוג הליגה.
     """)
 
+if run_trace is not None:
+    instrument.end_trace()
+    with st.expander("🩺 אבחון ביצועים - ההרצה הנוכחית", expanded=True):
+        run_spans = run_trace.spans
+        if run_spans:
+            table = pd.DataFrame(run_spans).drop(columns=["id", "ts"])
+            table["span"] = ["  " * depth + name for depth, name in zip(table["depth"], table["span"])]
+            st.dataframe(table.drop(columns=["depth"]), hide_index=True)
+        else:
+            st.caption("לא נמדדו שלבים בהרצה הזו (הנתונים והחיזוי הגיעו מהמטמון)")
+        st.json(run_trace.counters)
+
 st.markdown("---")
 st.markdown("*נבנה עם ❤️ לחובבי כדורגל*")
\ No newline at end of file
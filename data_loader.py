@@ -0,0 +1,318 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import disk_cache
+import fetch
+import instrument
+import match_store
+import team_index
+from match_store import parse_dates
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# ----------------------------
+# מקורות הנתונים ב-GitHub
+# ----------------------------
+DATA_SOURCES = {
+    "Premier League": [
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/epl.csv",
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/premier_league_csv.csv"
+    ],
+    "La Liga": [
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/laliga.csv",
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/laliga_csv.csv"
+    ],
+    "Serie A": [
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/seriea.csv",
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/serie_a_csv.csv"
+    ],
+    "Bundesliga": [
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/bundesliga.csv",
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/bundesliga_csv.csv"
+    ],
+    "Ligue 1": [
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/ligue1.csv",
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/ligue1_csv.csv"
+    ],
+    "Israeli Premier League": [
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/israeli_premier_league_csv.csv"
+    ],
+    # CL/EL/ECL: תוצאות העונה הקודמת בשמות המלאים - מתחברים לשאר המקורות דרך team_names
+    "Champions League": [
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/champions_league_csv.csv",
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/CL.csv"
+    ],
+    "Europa League": [
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/europa_league_csv.csv",
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/EL.csv"
+    ],
+    "Conference League": [
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/conference_league_csv.csv",
+        "https://raw.githubusercontent.com/Sh1503/football-match-predictor/main/ECL.csv"
+    ]
+}
+
+
+def bundled_path(url):
+    # עותק מקומי של המקור שמגיע עם הריפו (חלק מהקבצים נשמרו עם סיומת .txt נוספת)
+    name = os.path.basename(url)
+    for candidate in (name, name + ".txt"):
+        path = os.path.join(BASE_DIR, candidate)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def parse_csv(text):
+    return match_store.read_matches(text)
+
+
+def season_of(dates):
+    # עונה לפי שנת הפתיחה (יולי עד יוני)
+    return dates.dt.year - (dates.dt.month < 7).astype(int)
+
+
+def _high_water_mark(text, df):
+    # סימן המים של המקור: כמה תווים ושורות כבר נקלטו, ותאריך המשחק האחרון
+    last_date = None
+    if "Date" in df.columns and df["Date"].notna().any():
+        last_date = str(df["Date"].max().date())
+    return {"length": len(text), "rows": len(df), "last_date": last_date, "appendable": text.endswith("\n")}
+
+
+def _append_tail(url, text, entry):
+    # אם התוכן הקודם הוא רישא של התוכן החדש - מפענחים רק את השורות שנוספו
+    if not entry or not entry.get("appendable") or len(text) <= entry.get("length", 0):
+        return None
+    length = entry["length"]
+    if disk_cache.content_hash(text[:length]) != entry["hash"]:
+        return None
+    base = disk_cache.load(url)
+    if base is None or len(base) != entry.get("rows"):
+        return None
+
+    header = text[:text.index("\n") + 1]
+    tail = parse_csv(header + text[length:])
+    if list(tail.columns) != list(base.columns):
+        return None
+    # הקטגוריות של הזנב שונות משל הבסיס - compact מאחד אותן
+    df = match_store.compact(pd.concat([base, tail], ignore_index=True))
+    df.attrs["appended_from"] = entry["hash"]
+    df.attrs["appended_rows"] = len(tail)
+    return df
+
+
+def _seed_validators():
+    # אחרי הפעלה מחדש - GET מותנה לפי ה-ETag שנשמר בדיסק, כך שמקור שלא השתנה לא יורד ולא מפוענח
+    for url, entry in disk_cache.entries().items():
+        if not fetch.has_validators(url):
+            fetch.set_validators(url, entry.get("etag"), entry.get("last_modified"))
+
+
+def _offline_source(url):
+    df = disk_cache.load(url)
+    if df is not None:
+        return df, ("warning", f"אין חיבור למקור {os.path.basename(url)} - נטען עותק שמור")
+
+    path = bundled_path(url)
+    if path is not None:
+        try:
+            with open(path, encoding="utf-8-sig") as f:
+                text = f.read()
+            df = parse_csv(text)
+            df.attrs["version"] = disk_cache.content_hash(text)
+            return df, ("warning", f"אין חיבור למקור {os.path.basename(url)} - נטען הקובץ המקומי")
+        except Exception as e:
+            logger.warning("שגיאה בקריאת הקובץ המקומי %s: %s", path, e)
+
+    return None, ("error", f"שגיאה בטעינת נתונים: {os.path.basename(url)}")
+
+
+def load_source(result):
+    url = result.url
+    # זמן הרשת כבר נמדד בשכבת ההורדה - נרשם כשדה של השלב
+    with instrument.span("load_source", source=os.path.basename(url), status=result.status,
+                         network_ms=round(result.elapsed * 1000, 3)) as stage:
+        if result.error is not None:
+            logger.warning("שגיאה בהורדת %s: %s", url, result.error)
+            instrument.count("source.offline")
+            stage.set(path="offline")
+            return _offline_source(url)
+
+        if result.not_modified:
+            instrument.count("http.not_modified")
+            with instrument.span("disk_cache.load"):
+                df = disk_cache.load(url)
+            if df is not None:
+                instrument.count("disk_cache.hit")
+                stage.set(path="not_modified", rows=len(df))
+                return df, None
+            if result.text is None:
+                stage.set(path="offline")
+                return _offline_source(url)
+
+        digest = disk_cache.content_hash(result.text)
+        with instrument.span("disk_cache.load"):
+            df = disk_cache.load(url, digest)
+        if df is not None:
+            instrument.count("disk_cache.hit")
+            stage.set(path="disk_cache", rows=len(df))
+            return df, None
+        instrument.count("disk_cache.miss")
+
+        try:
+            with instrument.span("parse") as parse:
+                df = _append_tail(url, result.text, disk_cache.entry(url))
+                if df is None:
+                    df = parse_csv(result.text)
+                    parse.set(mode="full", rows=len(df))
+                else:
+                    instrument.count("source.appended")
+                    parse.set(mode="append", rows=df.attrs["appended_rows"])
+        except Exception as e:
+            logger.warning("שגיאה בפענוח %s: %s", url, e)
+            stage.set(path="offline")
+            return _offline_source(url)
+        with instrument.span("disk_cache.store"):
+            disk_cache.store(url, digest, df, result.etag, result.last_modified,
+                             **_high_water_mark(result.text, df))
+        df.attrs["version"] = digest
+        stage.set(path="parsed", rows=len(df))
+        return df, None
+
+
+def load_github_data(github_raw_url):
+    with instrument.span("load_github_data", source=os.path.basename(github_raw_url)):
+        _seed_validators()
+        with instrument.span("fetch"):
+            result = fetch.fetch_text(github_raw_url)
+        df, message = load_source(result)
+    if message is not None:
+        logger.warning(message[1])
+    return df
+
+
+# גרסאות המקורות בטעינה הקודמת של כל ליגה - כדי לזהות שהנתונים רק גדלו
+_previous_versions = {}
+_previous_league_versions = {}
+
+
+def _appended_rows(league, frames):
+    # מסכה של השורות החדשות בטבלה המשולבת, או None אם מקור כלשהו השתנה שלא בהוספה בלבד
+    previous = _previous_versions.get(league)
+    if previous is None or previous.keys() != frames.keys():
+        return None
+    masks = []
+    for url, df in frames.items():
+        mask = np.zeros(len(df), dtype=bool)
+        if df.attrs.get("version") != previous[url]:
+            if df.attrs.get("appended_from") != previous[url]:
+                return None
+            mask[len(df) - df.attrs["appended_rows"]:] = True
+        masks.append(mask)
+    mask = np.concatenate(masks)
+    return mask if mask.any() else None
+
+
+def combine_frames(frames):
+    # כל המקורות של ליגה בטבלה אחת, עם קטגוריות משותפות; מחזיר גם מסכת שורות ייחודיות
+    frames = list(frames)
+    df = match_store.compact(pd.concat(frames, ignore_index=True)) if len(frames) > 1 else frames[0]
+    return df, ~match_store.duplicated(df)
+
+
+def load_league_data(sources=None):
+    # מחזיר (נתוני ליגות, הודעות) - ההודעות הן זוגות (רמה, טקסט) להצגה בממשק
+    sources = DATA_SOURCES if sources is None else sources
+    with instrument.span("load_league_data", leagues=len(sources)):
+        _seed_validators()
+        with instrument.span("fetch", sources=sum(len(urls) for urls in sources.values())):
+            results = fetch.fetch_all(url for urls in sources.values() for url in urls)
+
+        league_data = {}
+        messages = []
+        for league, urls in sources.items():
+            with instrument.span("league", league=league):
+                frames = {}
+                for url in urls:
+                    df, message = load_source(results[url])
+                    if message is not None:
+                        messages.append(message)
+                    if df is not None:
+                        frames[url] = df
+
+                if frames:
+                    # שילוב של כל ה-DataFrames של הליגה
+                    with instrument.span("combine") as stage:
+                        versions = {url: df.attrs.get("version", "") for url, df in frames.items()}
+                        appended = _appended_rows(league, frames)
+                        combined_df, unique = combine_frames(frames.values())
+                        new_rows = None
+                        if appended is not None:
+                            new_rows = combined_df[appended & unique]
+                        if not unique.all():
+                            # משחק שמופיע בשני מקורות נספר פעם אחת
+                            combined_df = combined_df[unique].reset_index(drop=True)
+                        combined_df.attrs = {"version": disk_cache.content_hash("|".join(versions.values()))}
+                        team_index.stamp(combined_df)
+                        stage.set(rows=len(combined_df), duplicates=int((~unique).sum()))
+                    league_data[league] = combined_df
+                    # האינדקס של הקבוצות נבנה יחד עם הנתונים ונשמר לפי הגרסה שלהם;
+                    # אם נוספו רק שורות (ואף שורה ישנה לא נפלה ככפילות) - מעדכנים את האינדקס הקודם במקום לבנות מחדש
+                    with instrument.span("team_index"):
+                        previous = _previous_league_versions.get(league)
+                        if (new_rows is not None and previous is not None
+                                and len(combined_df) - len(new_rows) == previous[1]):
+                            team_index.extend_team_index(previous[0], combined_df.attrs["version"], new_rows)
+                        team_index.get_team_index(combined_df)
+                    _previous_versions[league] = versions
+                    _previous_league_versions[league] = (combined_df.attrs["version"], len(combined_df))
+
+    return league_data, messages
+
+
+# ----------------------------
+# טעינה לפי ליגה, עם טעינה מוקדמת ברקע של שאר הליגות
+# ----------------------------
+PREFETCH_WORKERS = 4
+PREFETCH_MAX_AGE = 300  # תוצאה שנטענה ברקע לפני יותר מזה כבר לא נחשבת עדכנית (שניות)
+
+_prefetch_executor = None
+_prefetched = {}
+_prefetch_lock = threading.Lock()
+
+
+def _load_one(league):
+    league_data, messages = load_league_data({league: DATA_SOURCES[league]})
+    return league_data.get(league), messages
+
+
+def load_league(league):
+    # מחזיר (נתוני הליגה או None, הודעות); אם הליגה כבר נטענה ברקע - משתמשים בתוצאה
+    with _prefetch_lock:
+        started, future = _prefetched.pop(league, (None, None))
+    if future is not None and time.monotonic() - started < PREFETCH_MAX_AGE:
+        try:
+            return future.result()
+        except Exception as e:
+            logger.warning("הטעינה ברקע של %s נכשלה: %s", league, e)
+    return _load_one(league)
+
+
+def prefetch_leagues(leagues):
+    # טעינה ברקע - ההורדה, הפענוח והאינדקס מוכנים כשהמשתמש יבחר את הליגה
+    global _prefetch_executor
+    with _prefetch_lock:
+        if _prefetch_executor is None:
+            _prefetch_executor = ThreadPoolExecutor(PREFETCH_WORKERS, thread_name_prefix="prefetch")
+        for league in leagues:
+            if league in DATA_SOURCES and league not in _prefetched:
+                _prefetched[league] = (time.monotonic(), _prefetch_executor.submit(_load_one, league))
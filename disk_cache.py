@@ -0,0 +1,122 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import pyarrow.feather as feather
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# מטמון דיסק של DataFrames מפוענחים (Arrow/Feather ללא דחיסה), לפי URL + hash של התוכן
+# ----------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("CHAMP_CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+MANIFEST_NAME = "manifest.json"
+# גרסת הפורמט של הקבצים השמורים; רשומות בפורמט אחר נזרקות
+# (3 = מאגר המשחקים המצומצם עם היחסים, 4 = שמות קבוצות קנוניים לפי team_names,
+# 5 = תיקון קידוד ושמות קטועים מהמקור)
+FORMAT_VERSION = 5
+
+_lock = threading.Lock()
+_manifest = None
+
+
+def content_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def _manifest_path():
+    return os.path.join(CACHE_DIR, MANIFEST_NAME)
+
+
+def _cache_file(url, digest):
+    url_key = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+    return f"{url_key}-{digest[:16]}.arrow"
+
+
+def _load_manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(_manifest_path(), encoding="utf-8") as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+        for url, entry in list(_manifest.items()):
+            if entry.get("format") != FORMAT_VERSION:
+                del _manifest[url]
+                try:
+                    os.remove(os.path.join(CACHE_DIR, entry["file"]))
+                except (OSError, KeyError):
+                    pass
+    return _manifest
+
+
+def _save_manifest():
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = _manifest_path() + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(_manifest, f, indent=1)
+    os.replace(tmp_path, _manifest_path())
+
+
+def entries():
+    with _lock:
+        manifest = _load_manifest()
+        return {
+            url: dict(entry) for url, entry in manifest.items()
+            if os.path.isfile(os.path.join(CACHE_DIR, entry["file"]))
+        }
+
+
+def entry(url):
+    with _lock:
+        found = _load_manifest().get(url)
+    return None if found is None else dict(found)
+
+
+def load(url, digest=None):
+    # digest=None מחזיר את העותק האחרון שנשמר עבור ה-URL
+    with _lock:
+        entry = _load_manifest().get(url)
+    if entry is None or (digest is not None and entry["hash"] != digest):
+        return None
+    path = os.path.join(CACHE_DIR, entry["file"])
+    if not os.path.isfile(path):
+        return None
+    try:
+        df = feather.read_table(path, memory_map=True).to_pandas()
+    except Exception as e:
+        logger.warning("קובץ מטמון פגום עבור %s: %s", url, e)
+        return None
+    df.attrs["version"] = entry["hash"]
+    return df
+
+
+def store(url, digest, df, etag=None, last_modified=None, **meta):
+    # meta: שדות נוספים למניפסט (למשל סימן המים של הטעינה המצטברת)
+    file_name = _cache_file(url, digest)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = os.path.join(CACHE_DIR, file_name + ".tmp")
+        feather.write_feather(df.reset_index(drop=True), tmp_path, compression="uncompressed")
+        os.replace(tmp_path, os.path.join(CACHE_DIR, file_name))
+    except Exception as e:
+        logger.warning("לא ניתן לשמור מטמון עבור %s: %s", url, e)
+        return
+
+    with _lock:
+        manifest = _load_manifest()
+        old = manifest.get(url)
+        manifest[url] = dict(meta, hash=digest, file=file_name, etag=etag, last_modified=last_modified,
+                             format=FORMAT_VERSION)
+        _save_manifest()
+
+    # מחיקת הגרסה הקודמת של אותו מקור
+    if old is not None and old["file"] != file_name:
+        try:
+            os.remove(os.path.join(CACHE_DIR, old["file"]))
+        except OSError:
+            pass
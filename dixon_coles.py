@@ -0,0 +1,258 @@
+import json
+import logging
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import disk_cache
+import instrument
+import score_matrix
+import team_index
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# מודל התקפה/הגנה (Dixon-Coles) עם דעיכה בזמן
+# ----------------------------
+DEFAULT_XI = 0.0019       # דעיכה ליום - זמן מחצית של כשנה
+RHO_BOUNDS = (-0.2, 0.2)  # תיקון התוצאות הנמוכות
+# τ00 = 1 - λμρ שלילי כש-ρ > 0 ו-λμ > 1/ρ (שתי קבוצות חזקות) - בכל מקרה τ לא יורד מתחת לזה,
+# גם בנראות וגם במטריצה (ההגבלה המקורית של Dixon-Coles היא ρ ≤ 1/(λμ) לכל משחק)
+TAU_MIN = 1e-6
+RIDGE = 0.01              # רגולריזציה קלה לקבוצות עם מעט משחקים
+MODELS_DIR = os.path.join(disk_cache.CACHE_DIR, "models")
+MAX_CACHED_MODELS = 64
+
+_models = {}
+_models_by_version = {}
+_models_lock = threading.Lock()
+
+
+def _match_arrays(df, as_of=None):
+    df = df.dropna(subset=["HomeTeam", "AwayTeam", "FTHG", "FTAG"])
+    dates = data_loader.parse_dates(df["Date"])
+    valid = dates.notna().to_numpy(copy=True)
+    if as_of is not None:
+        as_of = pd.Timestamp(as_of)
+        valid &= (dates <= as_of).to_numpy()
+    df, dates = df[valid], dates[valid]
+    as_of = dates.max() if as_of is None else as_of
+    age_days = (as_of - dates).dt.days.to_numpy(dtype=float)
+    return df, age_days, as_of
+
+
+def _unpack(params, n_teams):
+    return params[:n_teams], params[n_teams:2 * n_teams], params[-2], params[-1]
+
+
+def _neg_log_likelihood(params, home, away, home_goals, away_goals, weights, n_teams):
+    attack, defence, home_adv, rho = _unpack(params, n_teams)
+    log_lam = home_adv + attack[home] + defence[away]
+    log_mu = attack[away] + defence[home]
+    lam, mu = np.exp(log_lam), np.exp(log_mu)
+
+    # חלק הפואסון (בלי הפקטוריאלים - לא תלויים בפרמטרים)
+    loglik = home_goals * log_lam - lam + away_goals * log_mu - mu
+
+    # τ של Dixon-Coles עבור 0-0, 0-1, 1-0, 1-1, והנגזרות שלו לפי log λ, log μ ו-ρ
+    tau = np.ones_like(lam)
+    tau_lam = np.zeros_like(lam)
+    tau_mu = np.zeros_like(lam)
+    tau_rho = np.zeros_like(lam)
+    m00 = (home_goals == 0) & (away_goals == 0)
+    m01 = (home_goals == 0) & (away_goals == 1)
+    m10 = (home_goals == 1) & (away_goals == 0)
+    m11 = (home_goals == 1) & (away_goals == 1)
+    tau[m00] = 1 - lam[m00] * mu[m00] * rho
+    tau_lam[m00] = tau_mu[m00] = -lam[m00] * mu[m00] * rho
+    tau_rho[m00] = -lam[m00] * mu[m00]
+    tau[m01] = 1 + lam[m01] * rho
+    tau_lam[m01] = lam[m01] * rho
+    tau_rho[m01] = lam[m01]
+    tau[m10] = 1 + mu[m10] * rho
+    tau_mu[m10] = mu[m10] * rho
+    tau_rho[m10] = mu[m10]
+    tau[m11] = 1 - rho
+    tau_rho[m11] = -1
+
+    # τ חסום מלמטה - היכן שנחסם הוא קבוע ואין לו נגזרת
+    clipped = tau < TAU_MIN
+    tau[clipped] = TAU_MIN
+    tau_lam[clipped] = tau_mu[clipped] = tau_rho[clipped] = 0
+    loglik = loglik + np.log(tau)
+    grad_lam = home_goals - lam + tau_lam / tau
+    grad_mu = away_goals - mu + tau_mu / tau
+    grad_rho = tau_rho / tau
+
+    grad_lam *= weights
+    grad_mu *= weights
+    grad_attack = np.bincount(home, grad_lam, n_teams) + np.bincount(away, grad_mu, n_teams)
+    grad_defence = np.bincount(away, grad_lam, n_teams) + np.bincount(home, grad_mu, n_teams)
+
+    # ridge + אילוץ רך של סכום התקפה = 0 (זיהוי הפרמטרים)
+    value = -(weights * loglik).sum() + RIDGE * (attack @ attack + defence @ defence) + attack.sum() ** 2
+    gradient = np.concatenate([
+        -grad_attack + 2 * RIDGE * attack + 2 * attack.sum(),
+        -grad_defence + 2 * RIDGE * defence,
+        [-grad_lam.sum(), -(weights * grad_rho).sum()],
+    ])
+    return value, gradient
+
+
+def fit(df, xi=DEFAULT_XI, as_of=None, init=None):
+    # init: מודל קודם - הפרמטרים שלו הם נקודת ההתחלה (warm start)
+    # scipy.optimize נטען רק כשבאמת מתאימים מודל - הייבוא שלו איטי ורוב הקריאות מגיעות מהמטמון
+    from scipy.optimize import minimize
+
+    df, age_days, as_of = _match_arrays(df, as_of)
+    teams = sorted(set(df["HomeTeam"]) | set(df["AwayTeam"]))
+    position = {team: i for i, team in enumerate(teams)}
+    n_teams = len(teams)
+
+    home = df["HomeTeam"].map(position).to_numpy(dtype=int)
+    away = df["AwayTeam"].map(position).to_numpy(dtype=int)
+    home_goals = df["FTHG"].to_numpy(dtype=float)
+    away_goals = df["FTAG"].to_numpy(dtype=float)
+    weights = np.exp(-xi * age_days)
+
+    params = np.zeros(2 * n_teams + 2)
+    params[-2] = 0.25
+    if init is not None:
+        previous = {team: i for i, team in enumerate(init["teams"])}
+        for team, i in position.items():
+            j = previous.get(team)
+            if j is not None:
+                params[i] = init["attack"][j]
+                params[n_teams + i] = init["defence"][j]
+        params[-2], params[-1] = init["home"], init["rho"]
+
+    bounds = [(None, None)] * (2 * n_teams + 1) + [RHO_BOUNDS]
+    result = minimize(_neg_log_likelihood, params, jac=True, method="L-BFGS-B", bounds=bounds,
+                      args=(home, away, home_goals, away_goals, weights, n_teams))
+    attack, defence, home_adv, rho = _unpack(result.x, n_teams)
+    return {
+        "teams": teams,
+        "attack": attack,
+        "defence": defence,
+        "home": float(home_adv),
+        "rho": float(rho),
+        "xi": xi,
+        "as_of": str(as_of.date()),
+        "n_matches": int(len(df)),
+        "iterations": int(result.nit),
+        "converged": bool(result.success),
+    }
+
+
+def rates(model, home_teams, away_teams):
+    # קבוצה שלא במודל מקבלת פרמטרים 0 = ממוצע הליגה
+    position = {team: i for i, team in enumerate(model["teams"])}
+    attack = np.append(model["attack"], 0.0)
+    defence = np.append(model["defence"], 0.0)
+    missing = len(model["teams"])
+    home = np.array([position.get(team, missing) for team in np.atleast_1d(home_teams)], dtype=int)
+    away = np.array([position.get(team, missing) for team in np.atleast_1d(away_teams)], dtype=int)
+    home_rates = np.exp(model["home"] + attack[home] + defence[away])
+    away_rates = np.exp(attack[away] + defence[home])
+    return home_rates, away_rates
+
+
+def corrected_score_matrix(home_rates, away_rates, rho, max_goals=None):
+    # מטריצת פואסון רגילה + תיקון τ בארבע התוצאות הנמוכות, ונרמול מחדש
+    matrix = score_matrix.score_matrix(home_rates, away_rates, max_goals=max_goals)
+    scalar = matrix.ndim == 2
+    matrix = np.array(matrix[None] if scalar else matrix)
+    lam = np.atleast_1d(home_rates)
+    mu = np.atleast_1d(away_rates)
+    # אותה חסימה של τ כמו בהתאמה - אף תא לא יוצא שלילי
+    matrix[:, 0, 0] *= np.maximum(1 - lam * mu * rho, TAU_MIN)
+    matrix[:, 0, 1] *= np.maximum(1 + lam * rho, TAU_MIN)
+    matrix[:, 1, 0] *= np.maximum(1 + mu * rho, TAU_MIN)
+    matrix[:, 1, 1] *= max(1 - rho, TAU_MIN)
+    matrix /= matrix.sum(axis=(1, 2), keepdims=True)
+    return matrix[0] if scalar else matrix
+
+
+def outcome_probabilities(model, home_teams, away_teams):
+    home_rates, away_rates = rates(model, home_teams, away_teams)
+    matrix = corrected_score_matrix(home_rates, away_rates, model["rho"])
+    home_win, draw, away_win = score_matrix.matrix_outcomes(matrix)
+    return home_win, draw, away_win, home_rates, away_rates
+
+
+# ----------------------------
+# מטמון מודלים לפי ליגה ועונה, עם התאמה מחדש מתוך המודל הקודם
+# ----------------------------
+def _model_path(league, season):
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", league).strip("_").lower()
+    return os.path.join(MODELS_DIR, f"dc-{slug}-{season}.json")
+
+
+def _load_saved(league, season):
+    try:
+        with open(_model_path(league, season), encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    saved["attack"] = np.asarray(saved["attack"])
+    saved["defence"] = np.asarray(saved["defence"])
+    return saved
+
+
+def _save(league, season, model):
+    try:
+        os.makedirs(MODELS_DIR, exist_ok=True)
+        data = dict(model, attack=model["attack"].tolist(), defence=model["defence"].tolist())
+        tmp_path = _model_path(league, season) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, _model_path(league, season))
+    except OSError as e:
+        logger.warning("לא ניתן לשמור את המודל של %s: %s", league, e)
+
+
+def get_model(league, df, xi=DEFAULT_XI):
+    # מתאים מחדש רק כשגרסת הנתונים השתנתה; נקודת ההתחלה היא המודל האחרון של אותה ליגה ועונה.
+    # בלי אף משחק עם תאריך ותוצאה (למשל תאריכים בפורמט לא מוכר) אין מה להתאים - מחזיר None
+    version = team_index.data_version(df)
+    with _models_lock:
+        model = _models_by_version.get((league, version, xi))
+    if model is not None:
+        instrument.count("dixon_coles.hit")
+        return model
+
+    seasons = data_loader.season_of(data_loader.parse_dates(df["Date"]))
+    played = df[["HomeTeam", "AwayTeam", "FTHG", "FTAG"]].notna().all(axis=1).to_numpy()
+    if not (seasons.notna().to_numpy() & played).any():
+        return None
+    season = int(seasons.max())
+    key = (league, season)
+
+    with _models_lock:
+        cached = _models.get(key)
+    if cached is None:
+        cached = _load_saved(league, season)
+    if cached is not None and cached.get("version") == version and cached["xi"] == xi:
+        instrument.count("dixon_coles.hit")
+        with _models_lock:
+            _models[key] = cached
+            _models_by_version[(league, version, xi)] = cached
+        return cached
+
+    instrument.count("dixon_coles.miss")
+    with instrument.span("dixon_coles.fit", league=league, warm_start=cached is not None) as stage:
+        model = fit(df, xi=xi, init=cached)
+        stage.set(iterations=model["iterations"], matches=model["n_matches"])
+    model["version"] = version
+    model["season"] = season
+    with _models_lock:
+        _models[key] = model
+        _models_by_version[(league, version, xi)] = model
+        while len(_models_by_version) > MAX_CACHED_MODELS:
+            _models_by_version.pop(next(iter(_models_by_version)))
+    _save(league, season, model)
+    return model
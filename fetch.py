@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ----------------------------
+# שכבת הורדה: סשן משותף, הורדה מקבילית ו-GET מותנה
+# ----------------------------
+DEFAULT_TIMEOUT = (3.05, 15)  # (התחברות, קריאה) בשניות
+DEFAULT_RETRIES = 2
+MAX_WORKERS = 16
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+FetchResult = namedtuple(
+    "FetchResult", ["url", "text", "status", "not_modified", "error", "elapsed", "etag", "last_modified"]
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+# url -> {'etag', 'last_modified', 'text'} - לשימוש חוזר כשהשרת מחזיר 304
+_validators = {}
+_validators_lock = threading.Lock()
+
+
+def get_session():
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            # מאגר חיבורים אחד בגודל מספר ה-workers כדי שכל ההורדות ישתמשו באותם חיבורים
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=MAX_WORKERS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def reset_session():
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+    with _validators_lock:
+        _validators.clear()
+
+
+def set_validators(url, etag, last_modified, text=None):
+    if not etag and not last_modified:
+        return
+    with _validators_lock:
+        _validators[url] = {"etag": etag, "last_modified": last_modified, "text": text}
+
+
+def has_validators(url):
+    with _validators_lock:
+        return url in _validators
+
+
+def _per_source(value, url, default):
+    if isinstance(value, dict):
+        return value.get(url, default)
+    return default if value is None else value
+
+
+def fetch_text(url, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+    session = get_session()
+    with _validators_lock:
+        cached = _validators.get(url)
+
+    headers = {}
+    if cached is not None:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    start = time.perf_counter()
+    error = None
+    for attempt in range(retries + 1):
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+            if response.status_code == 304 and cached is not None:
+                # text יכול להיות None אם הוולידטורים נטענו מהדיסק - הקורא משתמש בעותק השמור שלו
+                return FetchResult(url, cached.get("text"), 304, True, None, time.perf_counter() - start,
+                                   cached.get("etag"), cached.get("last_modified"))
+            if response.status_code in RETRY_STATUSES and attempt < retries:
+                error = f"HTTP {response.status_code}"
+            else:
+                response.raise_for_status()
+                # ברירת המחדל של requests ל-text/plain היא ISO-8859-1, הקבצים שלנו ב-UTF-8
+                response.encoding = "utf-8-sig"
+                text = response.text
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                set_validators(url, etag, last_modified, text)
+                return FetchResult(url, text, response.status_code, False, None, time.perf_counter() - start,
+                                   etag, last_modified)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = str(e)
+        except requests.RequestException as e:
+            return FetchResult(url, None, getattr(e.response, "status_code", None), False, str(e),
+                               time.perf_counter() - start, None, None)
+        if attempt < retries:
+            time.sleep(0.25 * (2 ** attempt))
+
+    return FetchResult(url, None, None, False, error, time.perf_counter() - start, None, None)
+
+
+def fetch_all(urls, timeout=None, retries=None, max_workers=MAX_WORKERS):
+    # timeout / retries יכולים להיות ערך אחד או מילון לפי url
+    urls = list(dict.fromkeys(urls))
+    if not urls:
+        return {}
+
+    def _fetch(url):
+        return fetch_text(
+            url,
+            timeout=_per_source(timeout, url, DEFAULT_TIMEOUT),
+            retries=_per_source(retries, url, DEFAULT_RETRIES),
+        )
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as pool:
+        results = list(pool.map(_fetch, urls))
+    return {result.url: result for result in results}
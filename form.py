@@ -0,0 +1,182 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+import instrument
+import team_names
+from match_store import parse_dates
+from team_index import data_version
+
+# ----------------------------
+# כושר אחרון לכל קבוצה ולכל תאריך - בית וחוץ בנפרד, במעבר מקובץ אחד על כל הליגה
+# ----------------------------
+FORM_MATCHES = 5            # ממוצע N המשחקים האחרונים
+FORM_HALFLIFE = 3           # ממוצע נע מעריכי: משקל המשחק יורד בחצי כל כך הרבה משחקים
+MAX_CACHED_FORMS = 64
+VENUES = ("home", "away")
+
+# (עמודת הבית, עמודת החוץ, שם) - "for" הוא של הקבוצה עצמה ו-"against" של היריבה
+_FORM_COLUMNS = [
+    ("FTHG", "FTAG", "goals"),
+    ("HC", "AC", "corners"),
+    ("HS", "AS", "shots"),
+    ("HST", "AST", "shots_on_target"),
+]
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _long(df):
+    # שורה לכל קבוצה בכל משחק ששוחק: (צד, קבוצה, תאריך, שורה בטבלה המקורית, ערכי for/against)
+    dates = df["Date"] if pd.api.types.is_datetime64_any_dtype(df["Date"]) else parse_dates(df["Date"])
+    played = pd.to_numeric(df["FTHG"], errors="coerce").notna().to_numpy() & dates.notna().to_numpy()
+    rows = np.flatnonzero(played)
+    stats = [(home, away, name) for home, away, name in _FORM_COLUMNS if home in df.columns and away in df.columns]
+    values = {column: pd.to_numeric(df[column], errors="coerce").to_numpy(dtype=float)[rows]
+              for home, away, _ in stats for column in (home, away)}
+
+    frames = []
+    for venue, team_column in zip(VENUES, ("HomeTeam", "AwayTeam")):
+        frame = pd.DataFrame({
+            "venue": venue,
+            "team": df[team_column].to_numpy(dtype=object)[rows],
+            "date": dates.to_numpy()[rows],
+            "row": rows,
+        })
+        for home, away, name in stats:
+            own, other = (home, away) if venue == "home" else (away, home)
+            frame[f"{name}_for"] = values[own]
+            frame[f"{name}_against"] = values[other]
+        frames.append(frame)
+    long = pd.concat(frames, ignore_index=True)
+    long = long[long["team"].notna()]
+    return long.sort_values(["venue", "team", "date", "row"], kind="stable").reset_index(drop=True)
+
+
+def build_form(df, matches=FORM_MATCHES, halflife=FORM_HALFLIFE):
+    # rolling ו-ewm מקובצים (מעבר אחד לכל הקבוצות) - הערך בכל שורה הוא הכושר אחרי המשחק הזה
+    long = _long(df)
+    stat_columns = [column for column in long.columns if column.endswith(("_for", "_against"))]
+    codes = long.groupby(["venue", "team"], sort=False).ngroup().to_numpy()
+    grouped = long[stat_columns].groupby(codes)
+    recent = grouped.rolling(matches, min_periods=1).mean().droplevel(0).sort_index()
+    smoothed = grouped.ewm(halflife=halflife, ignore_na=True).mean().droplevel(0).sort_index()
+
+    after = long[["venue", "team", "date", "row"]].copy()
+    for column in stat_columns:
+        after[f"{column}_ewm"] = smoothed[column].to_numpy()
+        after[f"{column}_last{matches}"] = recent[column].to_numpy()
+    features = [column for column in after.columns if column.endswith(("_ewm", f"_last{matches}"))]
+
+    # גבולות הקבוצות ו"בלוקים" של אותו תאריך: הכושר לפני משחק = אחרי המשחק האחרון בתאריך מוקדם יותר
+    # (שני משחקים באותו יום לא רואים זה את זה)
+    positions = np.arange(len(long))
+    dates = long["date"].to_numpy()
+    new_group = np.ones(len(long), dtype=bool)
+    new_group[1:] = codes[1:] != codes[:-1]
+    new_block = new_group.copy()
+    new_block[1:] |= dates[1:] != dates[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, positions, 0))
+    block_start = np.maximum.accumulate(np.where(new_block, positions, 0))
+    after["matches"] = positions - group_start + 1
+
+    known = block_start > group_start
+    values = after[features].to_numpy(dtype=float)
+    before = np.full(values.shape, np.nan)
+    before[known] = values[block_start[known] - 1]
+
+    # לכל שורה בטבלה המקורית: כושר הבית של המארחת וכושר החוץ של האורחת לפני המשחק
+    pre = {}
+    rows = long["row"].to_numpy()
+    for venue in VENUES:
+        side = (long["venue"] == venue).to_numpy()
+        counts = np.zeros(len(df), dtype=int)
+        counts[rows[side]] = (block_start - group_start)[side]
+        pre[f"{venue}_matches"] = counts
+        for k, column in enumerate(features):
+            column_values = np.full(len(df), np.nan)
+            column_values[rows[side]] = before[side, k]
+            pre[f"{venue}_{column}"] = column_values
+    pre = pd.DataFrame(pre, index=df.index)
+
+    # טווח השורות של כל (צד, קבוצה): הכושר העדכני הוא השורה האחרונה, ולפי תאריך - חיפוש בינארי בטווח
+    starts = np.flatnonzero(new_group)
+    ends = np.r_[starts[1:], len(long)].astype(int)
+    keys = list(zip(long["venue"].to_numpy()[starts], long["team"].to_numpy()[starts]))
+    counts = after["matches"].to_numpy()
+    current = {}
+    for venue in VENUES:
+        last = ends[long["venue"].to_numpy()[starts] == venue] - 1
+        current[venue] = pd.DataFrame(values[last], columns=features,
+                                      index=pd.Index(long["team"].to_numpy()[last], dtype=object))
+        current[venue].insert(0, "matches", counts[last])
+    return {
+        "features": features,
+        "matches": matches,
+        "halflife": halflife,
+        "dates": dates,
+        "counts": counts,
+        "values": values,
+        "current": current,
+        "history": {key: (start, end) for key, start, end in zip(keys, starts, ends)},
+        "pre": pre,
+    }
+
+
+def _form_row(index, position):
+    form = dict(zip(index["features"], index["values"][position].tolist()))
+    form["matches"] = int(index["counts"][position])
+    return form
+
+
+def get_form(df, matches=FORM_MATCHES, halflife=FORM_HALFLIFE):
+    key = (data_version(df), matches, halflife)
+    with _cache_lock:
+        index = _cache.get(key)
+    if index is not None:
+        instrument.count("form.hit")
+        return index
+
+    instrument.count("form.miss")
+    with instrument.span("form.build", rows=len(df)):
+        index = build_form(df, matches, halflife)
+    with _cache_lock:
+        _cache[key] = index
+        while len(_cache) > MAX_CACHED_FORMS:
+            _cache.pop(next(iter(_cache)))
+    return index
+
+
+def team_form(index, team, venue, date=None):
+    # כושר הקבוצה בצד הנתון: העדכני (date=None) או לפני התאריך - רק משחקים שלפניו נספרים
+    found = index["history"].get((venue, team))
+    if found is not None:
+        start, end = found
+        if date is None:
+            return _form_row(index, end - 1)
+        position = start + np.searchsorted(index["dates"][start:end], np.datetime64(pd.Timestamp(date)), side="left")
+        if position > start:
+            return _form_row(index, position - 1)
+    return dict.fromkeys(index["features"], np.nan) | {"matches": 0}
+
+
+def match_form(index, home_team, away_team, date=None):
+    # כושר הבית של המארחת וכושר החוץ של האורחת
+    return {"home": team_form(index, home_team, "home", date), "away": team_form(index, away_team, "away", date)}
+
+
+def fixture_form(index, home_teams, away_teams):
+    # הכושר העדכני לרשימת משחקים עתידיים - שורה לכל משחק, עמודות home_* ו-away_* כמו ב-pre_match
+    columns = {}
+    for venue, teams in zip(VENUES, (home_teams, away_teams)):
+        table = index["current"][venue].reindex(team_names.canonical_array(np.asarray(teams, dtype=object)))
+        table["matches"] = table["matches"].fillna(0).astype(int)
+        columns.update({f"{venue}_{column}": table[column].to_numpy() for column in table.columns})
+    return pd.DataFrame(columns)
+
+
+def pre_match(index):
+    # טבלה מיושרת לשורות הטבלה שממנה נבנה הכושר: לכל משחק, הכושר של שתי הקבוצות ערב המשחק
+    return index["pre"]
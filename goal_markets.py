@@ -0,0 +1,196 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import dixon_coles
+import instrument
+import score_matrix
+from predictor import match_rates, resolve_teams, uses_dixon_coles
+
+# ----------------------------
+# כל שווקי השערים ממטריצת תוצאות אחת למשחק
+# ----------------------------
+RATE_STEP = 0.001           # λ מעוגל לצעד הזה - זוגות כמעט זהים חולקים מטריצה (השגיאה בהסתברויות ~1e-4)
+RHO_DIGITS = 6
+MATRIX_CACHE_SIZE = 10000   # מטריצות במטמון (כ-1KB כל אחת)
+OVER_UNDER_LINES = (0.5, 1.5, 2.5, 3.5, 4.5)
+HANDICAP_LINES = (-2.5, -1.5, -1.0, -0.5, -0.25, 0.0, 0.25, 0.5, 1.0, 1.5, 2.5)
+TOP_SCORES = 5
+
+_matrices = OrderedDict()
+_matrices_lock = threading.Lock()
+
+
+def _build(keys, rho):
+    # מטריצות לכל המפתחות החסרים; הגודל נקבע לפי הזוג עצמו, כך שאותו מפתח תמיד נותן אותה מטריצה
+    home_rates = keys[:, 0] * RATE_STEP
+    away_rates = keys[:, 1] * RATE_STEP
+    sizes = score_matrix.max_goals_each(np.maximum(home_rates, away_rates))
+    built = [None] * len(keys)
+    for size in np.unique(sizes):
+        rows = np.flatnonzero(sizes == size)
+        if rho is None:
+            matrices = score_matrix.score_matrix(home_rates[rows], away_rates[rows], max_goals=int(size))
+        else:
+            matrices = dixon_coles.corrected_score_matrix(home_rates[rows], away_rates[rows], rho, max_goals=int(size))
+        for row, matrix in zip(rows, matrices):
+            built[row] = matrix
+    return built
+
+
+def _unique_matrices(home_rates, away_rates, rho=None):
+    # מטריצה אחת לכל זוג λ מעוגל שונה, מתוך מטמון LRU; מחזיר (מטריצות, מיפוי שורה->זוג, שורות תקינות)
+    home_rates, away_rates = np.broadcast_arrays(np.atleast_1d(np.asarray(home_rates, dtype=float)),
+                                                 np.atleast_1d(np.asarray(away_rates, dtype=float)))
+    valid = np.isfinite(home_rates) & np.isfinite(away_rates) & (home_rates >= 0) & (away_rates >= 0)
+    keys = np.column_stack([np.round(home_rates[valid] / RATE_STEP), np.round(away_rates[valid] / RATE_STEP)])
+    keys, inverse = np.unique(keys.astype(np.int64), axis=0, return_inverse=True)
+    rho_key = None if rho is None else round(float(rho), RHO_DIGITS)
+
+    matrices = [None] * len(keys)
+    with _matrices_lock:
+        for i, (home_key, away_key) in enumerate(keys):
+            matrix = _matrices.get((int(home_key), int(away_key), rho_key))
+            if matrix is not None:
+                _matrices.move_to_end((int(home_key), int(away_key), rho_key))
+                matrices[i] = matrix
+    missing = [i for i, matrix in enumerate(matrices) if matrix is None]
+    instrument.count("goal_markets.hit", len(keys) - len(missing))
+    instrument.count("goal_markets.miss", len(missing))
+    if missing:
+        built = _build(keys[missing], rho_key)
+        with _matrices_lock:
+            for i, matrix in zip(missing, built):
+                matrices[i] = matrix
+                _matrices[(int(keys[i, 0]), int(keys[i, 1]), rho_key)] = matrix
+            while len(_matrices) > MATRIX_CACHE_SIZE:
+                _matrices.popitem(last=False)
+
+    # ריפוד באפסים לגודל המשותף - תאים מעבר לחיתוך לא משנים אף שוק
+    size = max((matrix.shape[0] for matrix in matrices), default=score_matrix.DEFAULT_MAX_GOALS + 1)
+    unique = np.zeros((len(matrices), size, size))
+    for i, matrix in enumerate(matrices):
+        unique[i, :matrix.shape[0], :matrix.shape[1]] = matrix
+    return unique, inverse.ravel(), valid
+
+
+def _expand(values, inverse, valid):
+    # מהזוגות הייחודיים חזרה לשורות; שורות לא תקינות מקבלות NaN (או None בעמודות טקסט)
+    result = np.full((len(valid),) + values.shape[1:], np.nan if values.dtype != object else None, dtype=values.dtype)
+    result[valid] = values[inverse]
+    return result
+
+
+def score_matrices(home_rates, away_rates, rho=None):
+    # (משחקים, n, n) - מטריצה לכל משחק; שורות בלי λ תקין הן NaN
+    return _expand(*_unique_matrices(home_rates, away_rates, rho))
+
+
+def cache_stats():
+    with _matrices_lock:
+        return {"size": len(_matrices), "capacity": MATRIX_CACHE_SIZE}
+
+
+def line_name(line):
+    return f"{line:+g}" if line else "0"
+
+
+def asian_lines(lines):
+    # קו רבעי מתחלק לשני חצאי הימור על הקווים הסמוכים (למשל -0.25 = חצי על 0 וחצי על -0.5);
+    # קו רגיל הוא פעמיים אותו קו. עובד על קו בודד או על מערך קווים
+    lines = np.asarray(lines, dtype=float)
+    quarter = np.isclose(np.abs(lines * 2 - np.round(lines * 2)), 0.5)
+    return np.where(quarter, lines - 0.25, lines), np.where(quarter, lines + 0.25, lines)
+
+
+def derive_markets(matrices, over_under_lines=OVER_UNDER_LINES, handicap_lines=HANDICAP_LINES, top_scores=TOP_SCORES):
+    # מעבר אחד על המטריצות: שוליים, סך שערים והפרש שערים, ומהם כל השווקים - עמודה לכל שוק
+    matrices = np.asarray(matrices, dtype=float)
+    if matrices.ndim == 2:
+        matrices = matrices[None]
+    n = matrices.shape[-1]
+    goals = np.arange(n)
+    home_goals = matrices.sum(axis=2)
+    away_goals = matrices.sum(axis=1)
+    totals = score_matrix.total_goals(matrices)
+    differences = score_matrix.goal_difference(matrices)
+    home_win, draw, away_win = score_matrix.matrix_outcomes(matrices)
+
+    markets = {
+        "home_win": home_win,
+        "draw": draw,
+        "away_win": away_win,
+        "home_or_draw": home_win + draw,
+        "away_or_draw": away_win + draw,
+        "home_or_away": home_win + away_win,
+        "home_goals": home_goals @ goals,
+        "away_goals": away_goals @ goals,
+        "btts_yes": 1 - home_goals[:, 0] - away_goals[:, 0] + matrices[:, 0, 0],
+        "home_clean_sheet": away_goals[:, 0],
+        "away_clean_sheet": home_goals[:, 0],
+    }
+    markets["btts_no"] = 1 - markets["btts_yes"]
+
+    total_goals = np.arange(totals.shape[1])
+    for line in over_under_lines:
+        markets[f"over_{line:g}"] = totals[:, total_goals > line].sum(axis=1)
+        markets[f"under_{line:g}"] = totals[:, total_goals < line].sum(axis=1)
+
+    # הנדיקפ מנקודת המבט של הבית; בקו רבעי - ממוצע שני החצאים (החזר חלקי נספר כחצי)
+    difference = np.arange(differences.shape[1]) - (n - 1)
+    for line in handicap_lines:
+        win = push = 0
+        for half in asian_lines(line):
+            win = win + 0.5 * differences[:, difference + half > 0].sum(axis=1)
+            push = push + 0.5 * differences[:, difference + half == 0].sum(axis=1)
+        name = line_name(line)
+        markets[f"ah_{name}_home"] = win
+        markets[f"ah_{name}_push"] = push
+        markets[f"ah_{name}_away"] = 1 - win - push
+
+    # התוצאות המדויקות הסבירות ביותר
+    if top_scores:
+        flat = matrices.reshape(len(matrices), n * n)
+        top_scores = min(top_scores, n * n)
+        order = np.argpartition(-flat, top_scores - 1, axis=1)[:, :top_scores]
+        probabilities = np.take_along_axis(flat, order, axis=1)
+        ranked = np.argsort(-probabilities, axis=1, kind="stable")
+        order = np.take_along_axis(order, ranked, axis=1)
+        probabilities = np.take_along_axis(probabilities, ranked, axis=1)
+        labels = np.array([f"{home}-{away}" for home in range(n) for away in range(n)], dtype=object)
+        for rank in range(top_scores):
+            markets[f"score_{rank + 1}"] = labels[order[:, rank]]
+            markets[f"score_{rank + 1}_prob"] = probabilities[:, rank]
+    return markets
+
+
+def match_markets(home_teams, away_teams, league, df=None, method="means", **options):
+    # כל השווקים לכל המשחקים: λ מהמודל, מטריצות מהמטמון, ומעבר גזירה אחד על הזוגות הייחודיים בלבד
+    home_teams = np.asarray(home_teams, dtype=object)
+    away_teams = np.asarray(away_teams, dtype=object)
+    with instrument.span("goal_markets", league=league, method=method, matches=len(home_teams)):
+        home_rates, away_rates, _ = match_rates(home_teams, away_teams, league, df, method)
+        rho = None
+        if uses_dixon_coles(league, df, method):
+            rho = dixon_coles.get_model(league, df)["rho"]
+        matrices, inverse, valid = _unique_matrices(home_rates, away_rates, rho)
+        markets = {name: _expand(np.asarray(values), inverse, valid)
+                   for name, values in derive_markets(matrices, **options).items()}
+    return pd.DataFrame({"home_team": home_teams, "away_team": away_teams, **markets})
+
+
+def predict_markets(home_team, away_team, league, df=None, method="means", **options):
+    # משחק בודד - מילון של ערכים פשוטים (להצגה ול-JSON); קבוצה לא מוכרת או שוק בלי ערך הם ValueError
+    home_team, away_team = resolve_teams(home_team, away_team, league, df)
+    row = match_markets([home_team], [away_team], league, df, method, **options).iloc[0]
+    markets = {}
+    for name, value in row.items():
+        if isinstance(value, str):
+            markets[name] = value
+        elif value is None or not np.isfinite(value):
+            raise ValueError(f"אין ערך לשוק {name} במשחק {home_team} - {away_team}")
+        else:
+            markets[name] = float(value)
+    return markets
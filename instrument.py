@@ -0,0 +1,175 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# מדידת זמנים לפי שלב (spans) ומוני פגיעות/החטאות במטמונים
+# כבוי כברירת מחדל: span מחזיר אובייקט קבוע שלא עושה כלום, ו-count חוזר מיד
+# (אלא אם ה-thread הנוכחי בתוך begin_trace - אז נאסף רק אצלו)
+# ----------------------------
+MAX_SPANS = 2000  # רק ה-spans האחרונים נשמרים בזיכרון
+
+_enabled = os.environ.get("CHAMP_TRACE", "") not in ("", "0")
+_log_path = os.environ.get("CHAMP_TRACE_FILE")
+
+_spans = deque(maxlen=MAX_SPANS)
+_counters = {}
+_lock = threading.Lock()
+_local = threading.local()
+_sequence = itertools.count(1)
+
+
+def enabled():
+    return _enabled
+
+
+def enable(log_path=None):
+    global _enabled, _log_path
+    _enabled = True
+    if log_path is not None:
+        _log_path = log_path
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+class Trace:
+    # איסוף מקומי ל-thread אחד (למשל הרצה אחת של הדף) - לא תלוי במצב הכללי ולא רואה threads אחרים
+    def __init__(self):
+        self.spans = []
+        self.counters = {}
+
+
+def begin_trace():
+    # מעתה ה-spans והמונים של ה-thread הנוכחי נאספים גם ל-Trace שמוחזר, גם כשהמדידה הכללית כבויה
+    trace = _local.trace = Trace()
+    return trace
+
+
+def end_trace():
+    trace = getattr(_local, "trace", None)
+    _local.trace = None
+    return trace
+
+
+def _current_trace():
+    return getattr(_local, "trace", None)
+
+
+class _NoSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    __slots__ = ("name", "fields", "start", "parent", "trace")
+
+    def __init__(self, name, fields, trace):
+        self.name = name
+        self.fields = fields
+        self.trace = trace
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        stack = _local.stack
+        stack.pop()
+        record = {
+            "id": next(_sequence),
+            "span": self.name,
+            "ms": round(elapsed * 1000, 3),
+            "parent": self.parent,
+            "depth": len(stack),
+            "thread": threading.current_thread().name,
+            "ts": time.time(),
+        }
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+        record.update(self.fields)
+        if self.trace is not None:
+            self.trace.spans.append(record)
+        if _enabled:
+            _emit(record)
+        return False
+
+    def set(self, **fields):
+        # שדות שמתבררים רק בתוך השלב (מספר שורות, מקור הנתונים וכו')
+        self.fields.update(fields)
+
+
+def span(name, **fields):
+    trace = _current_trace()
+    if not _enabled and trace is None:
+        return _NO_SPAN
+    return _Span(name, fields, trace)
+
+
+def count(name, n=1):
+    trace = _current_trace()
+    if trace is not None:
+        trace.counters[name] = trace.counters.get(name, 0) + n
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def _emit(record):
+    # לוג JSON מובנה: שורה לכל span, ללוגר ו/או לקובץ JSON Lines
+    with _lock:
+        _spans.append(record)
+    if logger.isEnabledFor(logging.INFO) or _log_path:
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        logger.info(line)
+        if _log_path:
+            try:
+                with _lock, open(_log_path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                logger.warning("לא ניתן לכתוב את לוג המדידות: %s", e)
+
+
+def last_id():
+    with _lock:
+        return _spans[-1]["id"] if _spans else 0
+
+
+def spans(since=0):
+    with _lock:
+        return [record for record in _spans if record["id"] > since]
+
+
+def counters():
+    with _lock:
+        return dict(_counters)
+
+
+def reset():
+    with _lock:
+        _spans.clear()
+        _counters.clear()
@@ -0,0 +1,313 @@
+import argparse
+import logging
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+import backtest
+import data_loader
+import dixon_coles
+import score_matrix
+from goal_markets import asian_lines
+from predictor import EUROPEAN_LEAGUES, METHODS, match_rates, uses_dixon_coles
+
+# ----------------------------
+# שכבת השווקים: יחסי הימורים -> הסתברויות בלי עמלה, מול הסתברויות המודל
+# ----------------------------
+BOOKMAKERS = ["B365", "PS", "Max", "Avg"]
+DEMARGIN_METHODS = ["proportional", "power"]
+CHUNK_SIZE = 20000  # משחקים למטריצת תוצאות אחת - שומר על הזיכרון חסום
+POWER_ITERATIONS = 30
+
+# עמודות היחסים לפי סוכנות (Pinnacle מופיע כ-PS ב-1X2 וכ-P בשאר השווקים)
+_1X2 = {book: (f"{book}H", f"{book}D", f"{book}A") for book in BOOKMAKERS}
+_OVER_UNDER = {book: (f"{prefix}>2.5", f"{prefix}<2.5")
+               for book, prefix in zip(BOOKMAKERS, ["B365", "P", "Max", "Avg"])}
+_ASIAN = {book: (f"{prefix}AHH", f"{prefix}AHA") for book, prefix in zip(BOOKMAKERS, ["B365", "P", "Max", "Avg"])}
+OVER_UNDER_LINE = 2.5
+
+
+def demargin(odds, method="proportional"):
+    # odds: מערך (משחקים, תוצאות). מחזיר (הסתברויות שסכומן 1, עמלת הסוכנות)
+    odds = np.asarray(odds, dtype=float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        implied = 1 / odds
+    total = implied.sum(axis=1)
+    if method == "proportional":
+        with np.errstate(invalid="ignore", divide="ignore"):
+            probabilities = implied / total[:, None]
+    elif method == "power":
+        # p_i = implied_i ** k, עם k שסכום ההסתברויות בו הוא 1 (ניוטון, וקטורי לכל השורות)
+        k = np.ones(len(odds))
+        log_implied = np.log(implied)
+        for _ in range(POWER_ITERATIONS):
+            powered = implied ** k[:, None]
+            value = powered.sum(axis=1) - 1
+            slope = (powered * log_implied).sum(axis=1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                k = k - np.where(slope != 0, value / slope, 0)
+        probabilities = implied ** k[:, None]
+    else:
+        raise ValueError(f"שיטה לא מוכרת להסרת העמלה: {method}")
+    return probabilities, total - 1
+
+
+def _odds(df, columns):
+    if not all(column in df.columns for column in columns):
+        return None
+    return df[list(columns)].to_numpy(dtype=float)
+
+
+def implied_probabilities(df, bookmakers=BOOKMAKERS, method="proportional"):
+    # לכל שורה ולכל סוכנות: הסתברויות 1X2, מעל/מתחת 2.5 והנדיקפ אסייתי בלי העמלה, והעמלה עצמה
+    result = pd.DataFrame(index=df.index)
+    for book in bookmakers:
+        markets = (("1x2", _1X2[book], ["home", "draw", "away"]),
+                   ("ou", _OVER_UNDER[book], ["over", "under"]),
+                   ("ah", _ASIAN[book], ["ah_home", "ah_away"]))
+        for market, columns, names in markets:
+            odds = _odds(df, columns)
+            if odds is None:
+                continue
+            probabilities, margin = demargin(odds, method)
+            for i, name in enumerate(names):
+                result[f"{book}_{name}"] = probabilities[:, i]
+            result[f"{book}_margin_{market}"] = margin
+    return result
+
+
+# ----------------------------
+# הסתברויות המודל לאותם שווקים, מתוך מטריצת התוצאות
+# ----------------------------
+def _asian_payoff(margin, odds):
+    # תשלום ליחידת הימור לפי הפרש אחרי הקו: ניצחון, החזר (0) או הפסד
+    return np.where(margin > 0, odds - 1, np.where(margin == 0, 0.0, -1.0))
+
+
+def asian_expected_value(difference, offset, lines, odds):
+    # difference: התפלגות הפרש השערים (משחקים, 2n-1); offset: ההפרש של העמודה הראשונה
+    diffs = np.arange(difference.shape[1]) + offset
+    value = np.zeros(len(lines))
+    for line in asian_lines(lines):
+        value += 0.5 * (difference * _asian_payoff(diffs[None, :] + line[:, None], odds[:, None])).sum(axis=1)
+    return value
+
+
+def asian_settle(goal_difference, lines, odds):
+    # רווח בפועל ליחידת הימור, לפי ההפרש שהיה במשחק
+    profit = np.zeros(len(lines))
+    for line in asian_lines(lines):
+        profit += 0.5 * _asian_payoff(goal_difference + line, odds)
+    return profit
+
+
+def model_markets(home_rates, away_rates, rho=None, line=OVER_UNDER_LINE):
+    # מטריצה אחת לכל קבוצת משחקים -> 1X2, מעל/מתחת והתפלגות הפרש השערים
+    if rho is None:
+        matrix = score_matrix.score_matrix(home_rates, away_rates)
+    else:
+        matrix = dixon_coles.corrected_score_matrix(home_rates, away_rates, rho)
+    if matrix.ndim == 2:
+        matrix = matrix[None]
+    home_win, draw, away_win = score_matrix.matrix_outcomes(matrix)
+    totals = score_matrix.total_goals(matrix)
+    over = totals[:, np.arange(totals.shape[1]) > line].sum(axis=1)
+    offset = -(matrix.shape[-1] - 1)
+    return np.column_stack([home_win, draw, away_win]), over, score_matrix.goal_difference(matrix), offset
+
+
+def _model_rates(df, league, method, history):
+    # תחזית המודל הנוכחי (כמו predict_match) - λ לכל שורה
+    home = df["HomeTeam"].to_numpy(dtype=object)
+    away = df["AwayTeam"].to_numpy(dtype=object)
+    home_rates, away_rates, _ = match_rates(home, away, league, history, method)
+    rho = None
+    if uses_dixon_coles(league, history, method):
+        rho = dixon_coles.get_model(league, history)["rho"]
+    return home_rates, away_rates, rho
+
+
+def _walk_forward_rates(df, mask=None):
+    # λ מתוך המשחקים הקודמים בלבד - לבדיקת ערך היסטורית בלי דליפה.
+    # ההיסטוריה היא תמיד כל הליגה; mask בוחר רק אילו משחקים נסרקים
+    scanned = np.ones(len(df), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+    df = backtest._prepare(df.assign(_scanned=scanned))
+    _, home_rates, away_rates, _, valid = backtest.walk_forward_means(df)
+    valid &= df.pop("_scanned").to_numpy(dtype=bool)
+    return df[valid].reset_index(drop=True), home_rates[valid], away_rates[valid]
+
+
+# ----------------------------
+# סריקת ערך: כל הבחירות של כל המשחקים, מדורגות לפי תוחלת
+# ----------------------------
+def scan_value(df, league, method="means", price="Max", reference="PS", demargin_method="proportional",
+               history=None, walk_forward=False, min_ev=None, mask=None, chunk_size=CHUNK_SIZE):
+    # price: הסוכנות שמחיריה נבדקים; reference: הסוכנות שההסתברויות שלה (בלי עמלה) הן "השוק"
+    # mask: המשחקים לסריקה (תאריך/עונה) - המודל עדיין רואה את כל df (או history)
+    if walk_forward:
+        if method != "means":
+            raise ValueError("בדיקה היסטורית בלי דליפה זמינה רק לשיטת הממוצעים")
+        df, home_rates, away_rates = _walk_forward_rates(df, mask)
+        rho = None
+    else:
+        history = df if history is None else history
+        if mask is not None:
+            df = df[np.asarray(mask, dtype=bool)]
+        df = df.dropna(subset=["HomeTeam", "AwayTeam"]).reset_index(drop=True)
+        home_rates, away_rates, rho = _model_rates(df, league, method, history)
+
+    n = len(df)
+    outcomes = np.full((n, 3), np.nan)
+    over = np.full(n, np.nan)
+    ah_home = np.full(n, np.nan)
+    ah_away = np.full(n, np.nan)
+    lines = df["AHh"].to_numpy(dtype=float) if "AHh" in df.columns else np.full(n, np.nan)
+    ah_odds = _odds(df, _ASIAN[price])
+    known = np.flatnonzero(~(np.isnan(home_rates) | np.isnan(away_rates)))
+    for start in range(0, len(known), chunk_size):
+        rows = known[start:start + chunk_size]
+        probabilities, over_probability, difference, offset = model_markets(home_rates[rows], away_rates[rows], rho)
+        outcomes[rows], over[rows] = probabilities, over_probability
+        if ah_odds is not None:
+            # הקו של קבוצת החוץ הוא הקו של הבית בסימן הפוך, על ההפרש ההפוך
+            has_line = ~np.isnan(lines[rows])
+            line, odds = np.nan_to_num(lines[rows]), ah_odds[rows]
+            ah_home[rows] = np.where(has_line, asian_expected_value(difference, offset, line, odds[:, 0]), np.nan)
+            ah_away[rows] = np.where(has_line, asian_expected_value(difference[:, ::-1], offset, -line, odds[:, 1]),
+                                     np.nan)
+
+    market = implied_probabilities(df, [reference], demargin_method)
+    home_goals = df["FTHG"].to_numpy(dtype=float)
+    away_goals = df["FTAG"].to_numpy(dtype=float)
+    result = backtest.outcome_index(home_goals, away_goals)
+    played = ~(np.isnan(home_goals) | np.isnan(away_goals))
+    total = home_goals + away_goals
+
+    selections = []
+
+    def _add(market_name, selection, odds, model_probability, market_probability, won, line=np.nan, ev=None):
+        if odds is None:
+            return
+        if ev is None:
+            ev = model_probability * odds - 1
+        else:
+            model_probability = (ev + 1) / odds
+        profit = np.where(won, odds - 1, -1.0) if won.dtype == bool else won
+        selections.append(pd.DataFrame({
+            "market": market_name,
+            "selection": selection,
+            "line": line,
+            "odds": odds,
+            "model_prob": model_probability,
+            "market_prob": market_probability,
+            "edge": model_probability - market_probability,
+            "ev": ev,
+            "profit": np.where(played, profit, np.nan),
+            "row": np.arange(n),
+        }))
+
+    def _column(name):
+        return market[name].to_numpy() if name in market.columns else np.full(n, np.nan)
+
+    odds_1x2 = _odds(df, _1X2[price])
+    for i, name in enumerate(["home", "draw", "away"]):
+        _add("1X2", name, None if odds_1x2 is None else odds_1x2[:, i], outcomes[:, i],
+             _column(f"{reference}_{name}"), result == i)
+    odds_ou = _odds(df, _OVER_UNDER[price])
+    if odds_ou is not None:
+        _add("OU", "over", odds_ou[:, 0], over, _column(f"{reference}_over"), total > OVER_UNDER_LINE,
+             OVER_UNDER_LINE)
+        _add("OU", "under", odds_ou[:, 1], 1 - over, _column(f"{reference}_under"), total < OVER_UNDER_LINE,
+             OVER_UNDER_LINE)
+    if ah_odds is not None:
+        difference = home_goals - away_goals
+        _add("AH", "home", ah_odds[:, 0], None, _column(f"{reference}_ah_home"),
+             asian_settle(difference, lines, ah_odds[:, 0]), lines, ah_home)
+        _add("AH", "away", ah_odds[:, 1], None, _column(f"{reference}_ah_away"),
+             asian_settle(-difference, -lines, ah_odds[:, 1]), -lines, ah_away)
+    if not selections:
+        return pd.DataFrame()
+
+    bets = pd.concat(selections, ignore_index=True)
+    bets = bets[bets["ev"].notna() & bets["odds"].notna()]
+    if min_ev is not None:
+        bets = bets[bets["ev"] >= min_ev]
+    info = pd.DataFrame({
+        "league": league,
+        "date": data_loader.parse_dates(df["Date"]).dt.date if "Date" in df.columns else None,
+        "home_team": df["HomeTeam"].to_numpy(dtype=object),
+        "away_team": df["AwayTeam"].to_numpy(dtype=object),
+    })
+    bets = info.iloc[bets["row"].to_numpy()].reset_index(drop=True).join(bets.drop(columns="row").reset_index(drop=True))
+    return bets.sort_values("ev", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def summarise(bets):
+    # לכל שוק: מספר הימורים, תוחלת ממוצעת, ותשואה בפועל על המשחקים ששוחקו
+    if bets.empty:
+        return pd.DataFrame()
+    settled = bets[bets["profit"].notna()]
+    summary = bets.groupby(["market", "selection"], sort=False).agg(bets=("ev", "size"), mean_ev=("ev", "mean"))
+    realised = settled.groupby(["market", "selection"], sort=False).agg(settled=("profit", "size"),
+                                                                         roi=("profit", "mean"))
+    return summary.join(realised).reset_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="סריקת ערך: יחסי הימורים מול הסתברויות המודל")
+    parser.add_argument("--league", action="append",
+                        choices=sorted(league for league in data_loader.DATA_SOURCES if league not in EUROPEAN_LEAGUES),
+                        help="ליגה לסריקה (אפשר לחזור על הדגל; ברירת מחדל: כל הליגות המקומיות)")
+    parser.add_argument("--method", choices=METHODS, default="means", help="שיטת החיזוי")
+    parser.add_argument("--price", choices=BOOKMAKERS, default="Max", help="הסוכנות שהמחירים שלה נבדקים")
+    parser.add_argument("--reference", choices=BOOKMAKERS, default="PS", help="הסוכנות שמשמשת כהסתברות השוק")
+    parser.add_argument("--demargin", choices=DEMARGIN_METHODS, default="proportional", help="שיטת הסרת העמלה")
+    parser.add_argument("--min-ev", type=float, default=0.0, help="תוחלת מינימלית ליחידת הימור (0.05 = 5%%)")
+    parser.add_argument("--date", help="רק משחקים מתאריך מסוים (מחזור), YYYY-MM-DD")
+    parser.add_argument("--season", type=int, help="רק עונה מסוימת (שנת הפתיחה)")
+    parser.add_argument("--walk-forward", action="store_true",
+                        help="הסתברויות מהמשחקים הקודמים בלבד - לבדיקת תשואה היסטורית בלי דליפה")
+    parser.add_argument("--top", type=int, default=20, help="כמה הימורים להציג")
+    parser.add_argument("--output", "-o", help="שמירת כל ההימורים המדורגים ל-CSV")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    leagues = args.league or [league for league in data_loader.DATA_SOURCES if league not in EUROPEAN_LEAGUES]
+    league_data, messages = data_loader.load_league_data({league: data_loader.DATA_SOURCES[league] for league in leagues})
+    for level, message in messages:
+        print(f"{level}: {message}", file=sys.stderr)
+
+    start = time.perf_counter()
+    scans = []
+    for league in leagues:
+        df = league_data.get(league)
+        if df is None:
+            continue
+        dates = data_loader.parse_dates(df["Date"])
+        mask = np.ones(len(df), dtype=bool)
+        if args.date:
+            mask &= (dates.dt.date == pd.Timestamp(args.date).date()).to_numpy()
+        if args.season is not None:
+            mask &= (data_loader.season_of(dates) == args.season).to_numpy()
+        try:
+            scans.append(scan_value(df, league, args.method, args.price, args.reference, args.demargin,
+                                    walk_forward=args.walk_forward, min_ev=args.min_ev, mask=mask))
+        except ValueError as e:
+            parser.error(str(e))
+    bets = pd.concat(scans, ignore_index=True).sort_values("ev", ascending=False, kind="stable")
+    elapsed = time.perf_counter() - start
+
+    with pd.option_context("display.width", 220, "display.max_columns", None, "display.precision", 3):
+        print(bets.head(args.top).to_string(index=False))
+        print()
+        print(summarise(bets).to_string(index=False))
+    print(f"{len(bets):,} הימורים עם תוחלת ≥ {args.min_ev} ב-{elapsed:.3f}s", file=sys.stderr)
+    if args.output:
+        bets.to_csv(args.output, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+from io import StringIO
+
+import numpy as np
+import pandas as pd
+
+import team_names
+
+# ----------------------------
+# מאגר משחקים מצומצם: רק העמודות שהחיזוי קורא, בטיפוסים קטנים, בלי כפילויות
+# ----------------------------
+TEAM_COLUMNS = ["HomeTeam", "AwayTeam"]
+KEY_COLUMNS = ["Div", "Date", "HomeTeam", "AwayTeam"]
+# שערים, בעיטות וקרנות - מספרים שלמים קטנים (עם ערך חסר למשחקים שעוד לא שוחקו)
+COUNT_COLUMNS = ["FTHG", "FTAG", "HS", "AS", "HST", "AST", "HC", "AC"]
+# יחסי פתיחה: 1X2, מעל/מתחת 2.5 והנדיקפ אסייתי (AHh = הקו של קבוצת הבית) - float32
+ODDS_COLUMNS = [
+    "B365H", "B365D", "B365A", "PSH", "PSD", "PSA", "MaxH", "MaxD", "MaxA", "AvgH", "AvgD", "AvgA",
+    "B365>2.5", "B365<2.5", "P>2.5", "P<2.5", "Max>2.5", "Max<2.5", "Avg>2.5", "Avg<2.5",
+    "AHh", "B365AHH", "B365AHA", "PAHH", "PAHA", "MaxAHH", "MaxAHA", "AvgAHH", "AvgAHA",
+]
+MATCH_COLUMNS = ["Div", "Date"] + TEAM_COLUMNS + COUNT_COLUMNS + ODDS_COLUMNS
+
+_PARSE_DTYPES = {"Div": "category", "Date": "str", "HomeTeam": "str", "AwayTeam": "str"}
+
+
+def parse_dates(dates):
+    # התאריכים מגיעים גם כ-DD/MM/YYYY וגם כ-YYYY-MM-DD
+    return pd.to_datetime(dates, dayfirst=True, format="mixed", errors="coerce")
+
+
+def read_matches(text):
+    # ההטלה נעשית כבר בפענוח - רק יחסי הפתיחה נקראים, שאר עמודות ההימורים לא נקראות בכלל
+    df = pd.read_csv(StringIO(text), usecols=lambda column: column in MATCH_COLUMNS, dtype=_PARSE_DTYPES)
+    return compact(df)
+
+
+def _small_ints(values):
+    values = pd.to_numeric(values, errors="coerce")
+    try:
+        return values.astype("UInt8")
+    except (TypeError, ValueError):
+        # ערך שלא נכנס ל-uint8 (שבר או מספר גדול) - נשארים ב-float32
+        return values.astype("float32")
+
+
+def compact(df):
+    # מחזיר עותק חדש בסדר ובטיפוסים הקבועים - הטבלה של הקורא (למשל מהמטמון) לא משתנה לעולם
+    columns = [column for column in MATCH_COLUMNS if column in df.columns]
+    df = df[columns].copy()
+    if "Div" in df.columns and not isinstance(df["Div"].dtype, pd.CategoricalDtype):
+        df["Div"] = df["Div"].astype("category")
+    if "Date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["Date"]):
+        df["Date"] = parse_dates(df["Date"])
+    for column in COUNT_COLUMNS:
+        if column in df.columns and df[column].dtype not in ("UInt8", "float32"):
+            df[column] = _small_ints(df[column])
+    for column in ODDS_COLUMNS:
+        if column in df.columns and df[column].dtype != "float32":
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype("float32")
+
+    # קטגוריות משותפות לבית ולחוץ - אותו קוד לאותה קבוצה בשתי העמודות, בשמות הקנוניים
+    # (ההמרה נעשית פעם אחת לכל שם ייחודי; טבלה שכבר מצומצמת כבר עברה אותה)
+    teams = [column for column in TEAM_COLUMNS if column in df.columns]
+    dtypes = [df[column].dtype for column in teams]
+    shared = len(teams) == 2 and isinstance(dtypes[0], pd.CategoricalDtype) and dtypes[0] == dtypes[1]
+    if teams and not shared:
+        columns = {column: team_names.canonical_array(df[column].astype(object)) for column in teams}
+        names = pd.unique(np.concatenate(list(columns.values())))
+        categories = pd.CategoricalDtype(np.sort(names[pd.notna(names)].astype(str)))
+        for column, values in columns.items():
+            df[column] = pd.Series(values, index=df.index, dtype=object).astype(categories)
+    return df
+
+
+def duplicated(df):
+    # אותו משחק (ליגה, תאריך, בית, חוץ) שמופיע ביותר ממקור אחד - נשמרת ההופעה האחרונה
+    key = [column for column in KEY_COLUMNS if column in df.columns]
+    mask = df.duplicated(key, keep="last").to_numpy(copy=True)
+    if "Date" in df.columns:
+        # בלי תאריך אי אפשר לדעת שזה אותו משחק
+        mask &= df["Date"].notna().to_numpy()
+    return mask
+
+
+def memory_usage(df):
+    return int(df.memory_usage(deep=True).sum())
@@ -0,0 +1,469 @@
+import numpy as np
+import pandas as pd
+
+import dixon_coles
+import form
+import instrument
+import ratings
+import team_names
+from score_matrix import matrix_outcomes, outcome_probabilities
+from team_index import get_team_index, team_stat
+
+# ----------------------------
+# קבוצות לפי ליגה (עונת 2025-2026)
+# ----------------------------
+LEAGUE_TEAMS = {
+    'Bundesliga': [
+        'Augsburg', 'Bayern Munich', 'Bochum', 'Dortmund', 'Ein Frankfurt',
+        'Freiburg', 'Heidenheim', 'Hoffenheim', 'Holstein Kiel', 'Leverkusen',
+        "M'gladbach", 'Mainz', 'RB Leipzig', 'St Pauli', 'Stuttgart',
+        'Union Berlin', 'Werder Bremen', 'Wolfsburg'
+    ],
+    'Premier League': [
+        'Arsenal', 'Aston Villa', 'Bournemouth', 'Brentford', 'Brighton',
+        'Burnley', 'Chelsea', 'Crystal Palace', 'Everton', 'Fulham',
+        'Leeds United', 'Liverpool', 'Man City', 'Man United', 'Newcastle',
+        "Nott'm Forest", 'Sunderland', 'Tottenham', 'West Ham', 'Wolves'
+    ],
+    'La Liga': [
+        'Alaves', 'Almeria', 'Ath Bilbao', 'Ath Madrid', 'Barcelona', 'Betis',
+        'Cadiz', 'Celta', 'Getafe', 'Girona', 'Las Palmas', 'Leganes',
+        'Mallorca', 'Osasuna', 'Real Madrid', 'Sevilla', 'Sociedad',
+        'Valencia', 'Valladolid', 'Villarreal'
+    ],
+    'Ligue 1': [
+        'Angers', 'Auxerre', 'Brest', 'Le Havre', 'Lens', 'Lille', 'Lyon',
+        'Marseille', 'Monaco', 'Montpellier', 'Nantes', 'Nice', 'Paris SG',
+        'Reims', 'Rennes', 'St Etienne', 'Strasbourg', 'Toulouse'
+    ],
+    'Serie A': [
+        'Atalanta', 'Bologna', 'Cagliari', 'Como', 'Empoli', 'Fiorentina',
+        'Genoa', 'Inter', 'Juventus', 'Lazio', 'Lecce', 'Milan', 'Monza',
+        'Napoli', 'Parma', 'Roma', 'Torino', 'Udinese', 'Venezia', 'Verona'
+    ],
+    # ליגת האלופות עונת 2025-2026 (מורחבת)
+    'Champions League': [
+        'Real Madrid', 'Barcelona', 'Ath Madrid', 'Athletic Bilbao',
+        'Bayern Munich', 'Dortmund', 'RB Leipzig', 'Leverkusen', 'Stuttgart',
+        'Inter', 'Milan', 'Juventus', 'Atalanta', 'Bologna', 'AC Fiorentina',
+        'Man City', 'Arsenal', 'Liverpool', 'Chelsea', 'Aston Villa', 'Newcastle',
+        'Paris SG', 'Monaco', 'Lille', 'Brest', 'Lyon',
+        'Celtic', 'Rangers', 'PSV', 'Feyenoord', 'Ajax',
+        'Benfica', 'Porto', 'Sporting', 'Braga',
+        'Shakhtar', 'Dynamo Kyiv',
+        'Young Boys', 'Red Star Belgrade', 'Sparta Prague', 'Slavia Prague',
+        'Club Brugge', 'Anderlecht', 'Salzburg', 'Sturm Graz',
+        'Galatasaray', 'Fenerbahce', 'Besiktas',
+        'Bodo/Glimt', 'Molde', 'Copenhagen',
+        'Maccabi Tel Aviv'
+    ],
+    # ליגת אירופה עונת 2025-2026 (מעודכנת)
+    'Europa League': [
+        'Man United', 'Tottenham', 'West Ham', 'Brighton', 'Fulham',
+        'Roma', 'Lazio', 'Fiorentina', 'Napoli', 'Torino',
+        'Ein Frankfurt', 'Hoffenheim', 'Union Berlin', 'Mainz',
+        'Lyon', 'Nice', 'Marseille', 'Rennes', 'Strasbourg', 'Lens',
+        'Villarreal', 'Betis', 'Sociedad', 'Sevilla', 'Valencia', 'Celta',
+        'Ajax', 'AZ Alkmaar', 'Twente', 'Utrecht', 'Vitesse',
+        'Braga', 'Vitoria Guimaraes', 'Rio Ave',
+        'Fenerbahce', 'Galatasaray', 'Besiktas', 'Trabzonspor',
+        'Olympiacos', 'PAOK', 'AEK Athens', 'Panathinaikos',
+        'Qarabag', 'Ludogorets', 'FCSB', 'CFR Cluj',
+        'Slavia Prague', 'Viktoria Plzen', 'Sparta Prague',
+        'Anderlecht', 'Union SG', 'Gent', 'Club Brugge',
+        'Midtjylland', 'Copenhagen', 'Bodo/Glimt', 'Molde',
+        'Elfsborg', 'Malmo', 'Hammarby', 'AIK', 'Hacken',
+        'Sheriff Tiraspol', 'Petrocub', 'Pyunik', 'Ararat-Armenia',
+        'Riga FC', 'RFS', 'Flora', 'Levadia',
+        'Zalgiris', 'Suduva', 'Dinamo Minsk', 'BATE',
+        'Partizan Belgrade', 'Red Star', 'Vojvodina',
+        'Dinamo Zagreb', 'Rijeka', 'Hajduk Split',
+        'Maribor', 'Olimpija', 'Mura', 'Celje',
+        'Shamrock Rovers', 'Derry City', 'St Patricks',
+        'Hapoel Beer Sheva', 'Maccabi Tel Aviv', 'Maccabi Haifa',
+        'Levski Sofia', 'CSKA Sofia', 'Arda Kardzhali',
+        'Legia Warsaw', 'Cracovia', 'Pogon Szczecin',
+        'Paksi FC', 'Ferencvaros', 'Debrecen',
+        'AEK Larnaca', 'Omonia', 'APOEL',
+        'Sabah Baku', 'Zira', 'Qarabag',
+        'Spartak Trnava', 'Zilina', 'Slovan Bratislava',
+        'Aktobe', 'Astana', 'Ordabasy',
+        'Ilves Tampere', 'HJK Helsinki', 'KuPS',
+        'Prishtina', 'Ballkani', 'Drita'
+    ],
+    # ליגת הקונפרנס עונת 2025-2026 (מעודכנת)
+    'Conference League': [
+        'Chelsea', 'Brighton', 'Fulham', 'Crystal Palace', 'Brentford',
+        'Fiorentina', 'Atalanta', 'Roma', 'Lazio', 'Genoa', 'Empoli',
+        'Nice', 'Marseille', 'Rennes', 'Lyon', 'Toulouse', 'Montpellier',
+        'Villarreal', 'Betis', 'Valencia', 'Getafe', 'Osasuna',
+        'Ein Frankfurt', 'Union Berlin', 'Hoffenheim', 'Freiburg', 'Augsburg',
+        'Ajax', 'AZ Alkmaar', 'Twente', 'Utrecht', 'Vitesse', 'Go Ahead Eagles',
+        'Celtic', 'Rangers', 'Hearts', 'Aberdeen', 'Hibernian',
+        'PAOK', 'Olympiacos', 'AEK Athens', 'Panathinaikos', 'Aris',
+        'Astana', 'Petrocub', 'Vikingur', 'TNS',
+        'Shamrock Rovers', 'Derry City', 'Celje', 'Olimpija',
+        'Cercle Brugge', 'Gent', 'Anderlecht', 'Standard Liege', 'Mechelen',
+        'Molde', 'Bodo/Glimt', 'Rosenborg', 'Viking', 'Stromsgodset',
+        'Djurgarden', 'Hammarby', 'Elfsborg', 'Hacken', 'Sirius',
+        'Heidenheim', 'St Gallen', 'Lugano', 'Basel', 'Zurich',
+        'Borac', 'Zrinjski', 'Jagiellonia', 'Legia Warsaw',
+        'Rapid Vienna', 'LASK', 'Austria Vienna', 'Sturm Graz',
+        'Pafos', 'Omonia', 'APOEL', 'AEL',
+        'Maccabi Haifa', 'Beitar Jerusalem',
+        'Dinamo Tbilisi', 'Torpedo Kutaisi', 'Sabah', 'Zira',
+        'Ararat-Armenia', 'Pyunik', 'Alashkert', 'Noah',
+        'Ballkani', 'Drita', 'Llapi', 'Prishtina',
+        'Partizan', 'Red Star', 'Cukaricki', 'Vojvodina',
+        'Dinamo Zagreb', 'Rijeka', 'Hajduk Split', 'Osijek',
+        'Maribor', 'Olimpija', 'Mura', 'Domzale',
+        'CSKA Sofia', 'Ludogorets', 'Arda',
+        'FCSB', 'CFR Cluj', 'Rapid Bucharest', 'Universitatea Craiova',
+        'Slovan Bratislava', 'Spartak Trnava', 'Zilina', 'Dunajska Streda',
+        'Sparta Prague', 'Slavia Prague', 'Viktoria Plzen', 'Jablonec',
+        'Ferencvaros', 'Puskas Academy', 'Debrecen', 'Ujpest',
+        'Lechia Gdansk', 'Cracovia', 'Pogon Szczecin', 'Warta Poznan',
+        'HJK Helsinki', 'KuPS', 'FC Inter Turku', 'Honka',
+        'Flora Tallinn', 'Levadia', 'Kalju', 'Paide',
+        'Riga FC', 'Valmiera', 'Liepaja', 'Jelgava'
+    ],
+    # ליגת העל הישראלית עונת 2025-2026
+    'Israeli Premier League': [
+        'Maccabi Tel Aviv', 'Maccabi Haifa', 'Hapoel Beer Sheva', 'Beitar Jerusalem',
+        'Hapoel Tel Aviv', 'Maccabi Netanya', 'Hapoel Haifa', 'Ashdod',
+        'Hapoel Jerusalem', 'Bnei Sakhnin', 'Maccabi Bnei Raina', 'Ironi Kiryat Shmona',
+        'Hapoel Katamon', 'Hapoel Petah Tikva', 'Hapoel Hadera', 'Maccabi Petah Tikva'
+    ]
+}
+
+EUROPEAN_LEAGUES = ['Champions League', 'Europa League', 'Conference League']
+
+# שיטות חיזוי: ממוצעי קבוצות או מודל התקפה/הגנה מותאם
+METHODS = ['means', 'dixon_coles']
+
+# נתוני ביצועים של קבוצות אירופיות (מעודכן לעונת 2025-2026)
+EUROPEAN_TEAM_STATS = {
+    # Champions League - טיר עליון
+    'Real Madrid': {'home_goals': 2.9, 'away_goals': 2.3, 'home_conceded': 0.8, 'away_conceded': 1.0, 'strength': 96},
+    'Barcelona': {'home_goals': 2.7, 'away_goals': 2.1, 'home_conceded': 0.9, 'away_conceded': 1.2, 'strength': 91},
+    'Bayern Munich': {'home_goals': 3.0, 'away_goals': 2.4, 'home_conceded': 0.7, 'away_conceded': 0.9, 'strength': 94},
+    'Man City': {'home_goals': 2.8, 'away_goals': 2.2, 'home_conceded': 0.8, 'away_conceded': 1.1, 'strength': 93},
+    'Paris SG': {'home_goals': 2.6, 'away_goals': 2.0, 'home_conceded': 0.9, 'away_conceded': 1.2, 'strength': 89},
+    'Liverpool': {'home_goals': 2.5, 'away_goals': 1.9, 'home_conceded': 1.0, 'away_conceded': 1.3, 'strength': 88},
+    'Inter': {'home_goals': 2.4, 'away_goals': 1.8, 'home_conceded': 0.9, 'away_conceded': 1.1, 'strength': 86},
+    'Arsenal': {'home_goals': 2.4, 'away_goals': 1.8, 'home_conceded': 1.0, 'away_conceded': 1.3, 'strength': 85},
+    'Dortmund': {'home_goals': 2.5, 'away_goals': 1.9, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 84},
+    'Chelsea': {'home_goals': 2.3, 'away_goals': 1.7, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 83},
+    'Ath Madrid': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 0.7, 'away_conceded': 1.0, 'strength': 82},
+    'Milan': {'home_goals': 2.2, 'away_goals': 1.6, 'home_conceded': 1.1, 'away_conceded': 1.3, 'strength': 81},
+    'Napoli': {'home_goals': 2.3, 'away_goals': 1.7, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 80},
+    'Juventus': {'home_goals': 2.1, 'away_goals': 1.5, 'home_conceded': 1.0, 'away_conceded': 1.2, 'strength': 79},
+    'Atalanta': {'home_goals': 2.3, 'away_goals': 1.7, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 78},
+    'Bologna': {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 74},
+    'Aston Villa': {'home_goals': 2.1, 'away_goals': 1.5, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 76},
+    'Monaco': {'home_goals': 2.2, 'away_goals': 1.6, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 77},
+    'Lille': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.0, 'away_conceded': 1.3, 'strength': 73},
+    'Brest': {'home_goals': 1.7, 'away_goals': 1.1, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 69},
+    'Newcastle': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 74},
+    'Stuttgart': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 75},
+    'Lyon': {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 72},
+    'Athletic Bilbao': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 73},
+    'AC Fiorentina': {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 73},
+    'Maccabi Tel Aviv': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 68},
+    
+    # קבוצות מהמוקדמות
+    'Celtic': {'home_goals': 2.3, 'away_goals': 1.5, 'home_conceded': 1.0, 'away_conceded': 1.4, 'strength': 72},
+    'Rangers': {'home_goals': 2.1, 'away_goals': 1.3, 'home_conceded': 1.1, 'away_conceded': 1.5, 'strength': 70},
+    'PSV': {'home_goals': 2.2, 'away_goals': 1.6, 'home_conceded': 0.9, 'away_conceded': 1.2, 'strength': 75},
+    'Feyenoord': {'home_goals': 2.1, 'away_goals': 1.5, 'home_conceded': 1.0, 'away_conceded': 1.3, 'strength': 74},
+    'Ajax': {'home_goals': 2.1, 'away_goals': 1.5, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 74},
+    'Benfica': {'home_goals': 2.4, 'away_goals': 1.8, 'home_conceded': 0.9, 'away_conceded': 1.2, 'strength': 77},
+    'Porto': {'home_goals': 2.3, 'away_goals': 1.7, 'home_conceded': 1.0, 'away_conceded': 1.3, 'strength': 76},
+    'Sporting': {'home_goals': 2.5, 'away_goals': 1.9, 'home_conceded': 0.9, 'away_conceded': 1.2, 'strength': 78},
+    'Braga': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 73},
+    'Shakhtar': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 71},
+    'RB Leipzig': {'home_goals': 2.1, 'away_goals': 1.5, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 77},
+    'Leverkusen': {'home_goals': 2.4, 'away_goals': 1.8, 'home_conceded': 1.0, 'away_conceded': 1.3, 'strength': 80},
+    'Galatasaray': {'home_goals': 2.1, 'away_goals': 1.5, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 74},
+    'Fenerbahce': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 73},
+    'Bodo/Glimt': {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 71},
+    
+    # Europa League - טיר בינוני
+    'Man United': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 75},
+    'Tottenham': {'home_goals': 2.2, 'away_goals': 1.6, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 76},
+    'West Ham': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 71},
+    'Roma': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 74},
+    'Lazio': {'home_goals': 2.1, 'away_goals': 1.5, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 75},
+    'Fiorentina': {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 73},
+    'Ein Frankfurt': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 74},
+    'Hoffenheim': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 70},
+    'Union Berlin': {'home_goals': 1.7, 'away_goals': 1.1, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 69},
+    'Nice': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 71},
+    'Marseille': {'home_goals': 2.0, 'away_goals': 1.4, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 73},
+    'Villarreal': {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 72},
+    'Betis': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 71},
+    'Sociedad': {'home_goals': 1.7, 'away_goals': 1.1, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 70},
+    'Sevilla': {'home_goals': 1.6, 'away_goals': 1.0, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 68},
+    'AZ Alkmaar': {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 72},
+    'Twente': {'home_goals': 1.8, 'away_goals': 1.2, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 70},
+    'Hapoel Beer Sheva': {'home_goals': 1.7, 'away_goals': 1.1, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 67},
+    
+    # Conference League - טיר נמוך יותר
+    'Brighton': {'home_goals': 1.7, 'away_goals': 1.1, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 68},
+    'Fulham': {'home_goals': 1.6, 'away_goals': 1.0, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 67},
+    'Crystal Palace': {'home_goals': 1.5, 'away_goals': 0.9, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 66},
+    'Hearts': {'home_goals': 1.5, 'away_goals': 0.9, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 64},
+    'Aberdeen': {'home_goals': 1.4, 'away_goals': 0.8, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 63},
+    'PAOK': {'home_goals': 1.6, 'away_goals': 1.0, 'home_conceded': 1.2, 'away_conceded': 1.5, 'strength': 66},
+    'Olympiacos': {'home_goals': 1.7, 'away_goals': 1.1, 'home_conceded': 1.1, 'away_conceded': 1.4, 'strength': 68},
+    'AEK Athens': {'home_goals': 1.5, 'away_goals': 0.9, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 65},
+    'Panathinaikos': {'home_goals': 1.4, 'away_goals': 0.8, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 64},
+    'Molde': {'home_goals': 1.6, 'away_goals': 1.0, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 66},
+    'Djurgarden': {'home_goals': 1.5, 'away_goals': 0.9, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 65},
+    'Hammarby': {'home_goals': 1.4, 'away_goals': 0.8, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 63},
+    'Elfsborg': {'home_goals': 1.3, 'away_goals': 0.7, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 62},
+    'Heidenheim': {'home_goals': 1.2, 'away_goals': 0.6, 'home_conceded': 1.5, 'away_conceded': 1.8, 'strength': 60},
+    'St Gallen': {'home_goals': 1.3, 'away_goals': 0.7, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 61},
+    'Lugano': {'home_goals': 1.2, 'away_goals': 0.6, 'home_conceded': 1.5, 'away_conceded': 1.8, 'strength': 59},
+    'Genoa': {'home_goals': 1.4, 'away_goals': 0.8, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 63},
+    'Empoli': {'home_goals': 1.3, 'away_goals': 0.7, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 62},
+    'Maccabi Haifa': {'home_goals': 1.6, 'away_goals': 1.0, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 65},
+    'Beitar Jerusalem': {'home_goals': 1.4, 'away_goals': 0.8, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 62}
+}
+
+# אותה טבלה לפי השם הקנוני - כדי שגם שמות חלופיים מהמקורות (למשל 'Bayern München') ימצאו אותה
+_EUROPEAN_STATS = {team_names.canonical(team): stats for team, stats in EUROPEAN_TEAM_STATS.items()}
+
+# הוספת נתונים בסיסיים לקבוצות אחרות
+# (ה-strength כאן הוא רק ברירת מחדל - החיזוי קורא את החוזק מדירוג ה-Elo, ראו team_strength)
+def get_team_stats(team, league_type):
+    stats = _EUROPEAN_STATS.get(team_names.canonical(team))
+    if stats is not None:
+        return stats
+    
+    # נתונים בסיסיים לפי רמת הליגה
+    if league_type == 'Champions League':
+        return {'home_goals': 1.9, 'away_goals': 1.3, 'home_conceded': 1.3, 'away_conceded': 1.6, 'strength': 76}
+    elif league_type == 'Europa League':
+        return {'home_goals': 1.7, 'away_goals': 1.1, 'home_conceded': 1.4, 'away_conceded': 1.7, 'strength': 71}
+    else:  # Conference League
+        return {'home_goals': 1.5, 'away_goals': 0.9, 'home_conceded': 1.5, 'away_conceded': 1.8, 'strength': 66}
+
+# חוזק הקבוצה מהדירוג העדכני; קבוצה בלי מספיק משחקים מדורגים נשארת עם הערך הקבוע
+def team_strength(team, league_type):
+    return ratings.strength(team, default=get_team_stats(team, league_type)['strength'])
+
+# עיגול של ערך בודד - round המובנה, פי כמה מהיר מ-np.round על סקלר
+def _round(value, digits):
+    return round(float(value), digits)
+
+# ----------------------------
+# פונקציות חיזוי - ליגות רגילות
+# ----------------------------
+def predict_match_regular(home_team, away_team, df):
+    # חישוב ממוצעי שערים מתוך האינדקס של הקבוצות
+    with instrument.span('team_stats'):
+        index = get_team_index(df)
+        home_goals = team_stat(index, home_team, 'home_goals_for')
+        away_goals = team_stat(index, away_team, 'away_goals_for')
+    
+    # חישוב הסתברויות פואסון
+    with instrument.span('poisson'):
+        home_win, draw, away_win = outcome_probabilities(home_goals, away_goals)
+    
+    return {
+        "home_win": _round(home_win, 3),
+        "draw": _round(draw, 3),
+        "away_win": _round(away_win, 3),
+        "total_goals": _round(home_goals + away_goals, 1),
+        "total_corners": get_corners_prediction(home_team, away_team, df),
+        "form": get_form_prediction(home_team, away_team, df)
+    }
+
+# ----------------------------
+# פונקציות חיזוי - ליגות אירופיות
+# ----------------------------
+def predict_match_european(home_team, away_team, league_type):
+    home_stats = get_team_stats(home_team, league_type)
+    away_stats = get_team_stats(away_team, league_type)
+    with instrument.span('ratings'):
+        home_strength = team_strength(home_team, league_type)
+        away_strength = team_strength(away_team, league_type)
+    
+    # חישוב שערים צפויים עם התחשבות בחוזק היחסי
+    strength_factor = home_strength / away_strength
+    
+    # התאמת יתרון הבית לליגות אירופיות (יותר מאוזן)
+    home_advantage = 0.25 if league_type == 'Champions League' else 0.3
+    away_disadvantage = 0.15 if league_type == 'Champions League' else 0.2
+    
+    # התאמת יתרון הבית לליגות אירופיות (יותר מאוזן)
+    home_goals_expected = home_stats['home_goals'] * (1 + (strength_factor - 1) * 0.3)
+    away_goals_expected = away_stats['away_goals'] * (1 + (1/strength_factor - 1) * 0.2)
+    
+    # חישוב הסתברויות פואסון
+    with instrument.span('poisson'):
+        home_win, draw, away_win = outcome_probabilities(home_goals_expected, away_goals_expected)
+    
+    # חישוב קרנות משוער (בהתבסס על סגנון משחק)
+    corners_home = 5.5 + (home_strength - 75) * 0.05
+    corners_away = 4.5 + (away_strength - 75) * 0.03
+    
+    return {
+        "home_win": _round(home_win, 3),
+        "draw": _round(draw, 3),
+        "away_win": _round(away_win, 3),
+        "total_goals": _round(home_goals_expected + away_goals_expected, 1),
+        "total_corners": _round(corners_home + corners_away, 1)
+    }
+
+def get_corners_prediction(home_team, away_team, df):
+    with instrument.span('corners'):
+        index = get_team_index(df)
+        if index['has_corners']:
+            home_corners = team_stat(index, home_team, 'home_corners_for')
+            away_corners = team_stat(index, away_team, 'away_corners_for')
+            return _round(home_corners + away_corners, 1)
+        return None
+
+def get_form_prediction(home_team, away_team, df, date=None):
+    # כושר אחרון מהטבלה המחושבת מראש (בית של המארחת, חוץ של האורחת); ערך חסר הוא None כדי שיעבור ל-JSON
+    with instrument.span('form'):
+        found = form.match_form(form.get_form(df), home_team, away_team, date)
+    return {side: {name: value if name == 'matches' else None if np.isnan(value) else _round(value, 2)
+                   for name, value in values.items()}
+            for side, values in found.items()}
+
+# ----------------------------
+# פונקציות חיזוי - מודל Dixon-Coles
+# ----------------------------
+def predict_match_dixon_coles(home_team, away_team, league, df):
+    with instrument.span('dixon_coles.model'):
+        model = dixon_coles.get_model(league, df)
+    with instrument.span('dixon_coles.score_matrix'):
+        home_win, draw, away_win, home_goals, away_goals = dixon_coles.outcome_probabilities(
+            model, [home_team], [away_team])
+
+    return {
+        "home_win": _round(home_win[0], 3),
+        "draw": _round(draw[0], 3),
+        "away_win": _round(away_win[0], 3),
+        "total_goals": _round(home_goals[0] + away_goals[0], 1),
+        "total_corners": get_corners_prediction(home_team, away_team, df),
+        "form": get_form_prediction(home_team, away_team, df)
+    }
+
+# ----------------------------
+# בדיקת הקבוצות לפני חיזוי
+# ----------------------------
+def league_team_names(league, df=None):
+    # השמות הקנוניים שאפשר לחזות עבורם: בליגות אירופיות - הטבלה הקבועה, במקומיות - מי שיש לו נתונים
+    if league in EUROPEAN_LEAGUES:
+        return {team_names.canonical(team) for team in LEAGUE_TEAMS.get(league, [])}
+    if df is None:
+        return set()
+    return set(get_team_index(df)['teams'])
+
+def resolve_teams(home_team, away_team, league, df=None):
+    # שמות קנוניים לשתי הקבוצות; קבוצה לא מוכרת בליגה היא ValueError ולא חיזוי של NaN
+    home_team, away_team = team_names.canonical(home_team), team_names.canonical(away_team)
+    known = league_team_names(league, df)
+    unknown = [team for team in (home_team, away_team) if team not in known]
+    if unknown:
+        raise ValueError(f"קבוצה לא מוכרת ב-{league}: {', '.join(map(str, unknown))}")
+    if home_team == away_team:
+        raise ValueError("יש לבחור שתי קבוצות שונות")
+    return home_team, away_team
+
+# ----------------------------
+# פונקציה מאוחדת לחיזוי
+# ----------------------------
+def uses_dixon_coles(league, df, method):
+    # Dixon-Coles רק כשיש ממה להתאים מודל; אחרת - כמו בלי נתונים - חוזרים לממוצעי הקבוצות
+    return method == 'dixon_coles' and df is not None and dixon_coles.get_model(league, df) is not None
+
+def predict_match(home_team, away_team, league, df=None, method='means'):
+    home_team, away_team = team_names.canonical(home_team), team_names.canonical(away_team)
+    with instrument.span('predict_match', league=league, method=method):
+        if uses_dixon_coles(league, df, method):
+            return predict_match_dixon_coles(home_team, away_team, league, df)
+        if league in EUROPEAN_LEAGUES:
+            return predict_match_european(home_team, away_team, league)
+        else:
+            return predict_match_regular(home_team, away_team, df)
+
+# ----------------------------
+# חיזוי מרוכז - מערך משחקים בקריאה אחת
+# ----------------------------
+def match_rates_regular(home_teams, away_teams, df):
+    # שערים צפויים (λ) וקרנות צפויות לכל משחק, מתוך האינדקס של הקבוצות
+    index = get_team_index(df)
+    stats = index['frame']
+    home = stats.reindex(home_teams)
+    away = stats.reindex(away_teams)
+    home_goals = home['home_goals_for'].to_numpy(dtype=float)
+    away_goals = away['away_goals_for'].to_numpy(dtype=float)
+
+    if index['has_corners']:
+        corners = home['home_corners_for'].to_numpy(dtype=float) + away['away_corners_for'].to_numpy(dtype=float)
+    else:
+        corners = None
+    return home_goals, away_goals, corners
+
+def match_rates_european(home_teams, away_teams, league_type):
+    # טבלת נתונים אחת לכל קבוצה ייחודית, ואז יישור לפי סדר המשחקים
+    teams = pd.unique(np.concatenate([home_teams, away_teams]))
+    table = pd.DataFrame([get_team_stats(team, league_type) for team in teams], index=teams)
+    table['strength'] = [team_strength(team, league_type) for team in teams]
+    home = table.reindex(home_teams)
+    away = table.reindex(away_teams)
+
+    strength_factor = home['strength'].to_numpy(dtype=float) / away['strength'].to_numpy(dtype=float)
+    home_goals_expected = home['home_goals'].to_numpy(dtype=float) * (1 + (strength_factor - 1) * 0.3)
+    away_goals_expected = away['away_goals'].to_numpy(dtype=float) * (1 + (1/strength_factor - 1) * 0.2)
+
+    corners_home = 5.5 + (home['strength'].to_numpy(dtype=float) - 75) * 0.05
+    corners_away = 4.5 + (away['strength'].to_numpy(dtype=float) - 75) * 0.03
+    return home_goals_expected, away_goals_expected, corners_home + corners_away
+
+def match_rates_dixon_coles(home_teams, away_teams, league, df):
+    home_goals, away_goals = dixon_coles.rates(dixon_coles.get_model(league, df), home_teams, away_teams)
+    _, _, corners = match_rates_regular(home_teams, away_teams, df)
+    return home_goals, away_goals, corners
+
+def match_rates(home_teams, away_teams, league, df=None, method='means'):
+    # (λ בית, λ חוץ, קרנות) כמערכים - הבסיס לחיזוי המרוכז ולסימולציות
+    # שמות קנוניים, כמו בנתונים (match_store) - כל כתיב של הקבוצה מגיע לאותה שורה
+    home_teams = team_names.canonical_array(np.asarray(home_teams, dtype=object))
+    away_teams = team_names.canonical_array(np.asarray(away_teams, dtype=object))
+    if uses_dixon_coles(league, df, method):
+        return match_rates_dixon_coles(home_teams, away_teams, league, df)
+    if league in EUROPEAN_LEAGUES:
+        return match_rates_european(home_teams, away_teams, league)
+    else:
+        return match_rates_regular(home_teams, away_teams, df)
+
+def predict_matches(home_teams, away_teams, league, df=None, method='means'):
+    # אותן תוצאות כמו predict_match, לכל המשחקים בבת אחת
+    home_goals, away_goals, corners = match_rates(home_teams, away_teams, league, df, method)
+    if uses_dixon_coles(league, df, method):
+        rho = dixon_coles.get_model(league, df)["rho"]
+        home_win, draw, away_win = matrix_outcomes(dixon_coles.corrected_score_matrix(home_goals, away_goals, rho))
+    else:
+        home_win, draw, away_win = outcome_probabilities(home_goals, away_goals)
+    return pd.DataFrame({
+        "home_team": home_teams,
+        "away_team": away_teams,
+        "home_win": np.round(home_win, 3),
+        "draw": np.round(draw, 3),
+        "away_win": np.round(away_win, 3),
+        "total_goals": np.round(home_goals + away_goals, 1),
+        "total_corners": None if corners is None else np.round(corners, 1),
+    })
+
+def league_fixtures(league):
+    # כל הזוגות המסודרים (בית, חוץ) של קבוצות הליגה
+    teams = np.asarray(LEAGUE_TEAMS[league], dtype=object)
+    home, away = np.meshgrid(np.arange(len(teams)), np.arange(len(teams)), indexing="ij")
+    mask = home != away
+    return teams[home[mask]], teams[away[mask]]
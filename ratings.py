@@ -0,0 +1,298 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import disk_cache
+import instrument
+import team_names
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# דירוג Elo מצטבר לכל הקבוצות מכל המקורות (ליגות מקומיות ואירופיות)
+# ----------------------------
+INITIAL_RATING = 1500
+HOME_ADVANTAGE = 60       # נקודות Elo לקבוצה המארחת
+K_FACTOR = 20
+# דירוג פתיחה לפי רמת הליגה שבה הקבוצה הופיעה לראשונה - כדי שהליגות יהיו בני השוואה
+LEAGUE_RATINGS = {
+    "Premier League": 1600,
+    "La Liga": 1580,
+    "Serie A": 1560,
+    "Bundesliga": 1560,
+    "Ligue 1": 1520,
+    "Israeli Premier League": 1350,
+}
+EUROPEAN_RATING = 1450    # קבוצה שהופיעה לראשונה רק בתחרות אירופית
+# המרה לסולם ה-strength של הטבלה הקבועה: 1500 = 75, כל 10 נקודות Elo = נקודה אחת
+STRENGTH_BASE = 75
+ELO_PER_STRENGTH = 10
+MIN_RATED_MATCHES = 10    # מתחת לזה הדירוג עוד לא אמין - נשארים עם הטבלה הקבועה
+CHECKPOINT_EVERY = 2000   # נקודת שמירה כל כך הרבה משחקים
+MAX_CHECKPOINTS = 20
+RATINGS_TTL = 3600        # רענון הדירוג מהנתונים כל שעה (כמו שאר הנתונים)
+RATINGS_PATH = os.path.join(disk_cache.CACHE_DIR, "ratings", "elo.json")
+
+# שינוי באחד הפרמטרים פוסל את נקודות השמירה הקיימות
+_PARAMS = [INITIAL_RATING, HOME_ADVANTAGE, K_FACTOR, sorted(LEAGUE_RATINGS.items()), EUROPEAN_RATING]
+
+_state = None
+_refreshed = None
+_refreshing = False
+_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+
+def _goal_multiplier(margin):
+    # משקל לפי הפרש השערים (World Football Elo): 1, 1.5, ומעבר לזה (11+N)/8
+    if margin <= 1:
+        return 1.0
+    if margin == 2:
+        return 1.5
+    return (11 + margin) / 8
+
+
+def match_stream(league_data):
+    # כל המשחקים ששוחקו מכל הליגות, בסדר תאריכים יציב (ואותו סדר בכל הרצה), בלי כפילויות בין מקורות
+    frames = []
+    for league, df in league_data.items():
+        if df is None or df.empty:
+            continue
+        frame = pd.DataFrame({
+            "Date": data_loader.parse_dates(df["Date"]),
+            "HomeTeam": df["HomeTeam"].astype(object),
+            "AwayTeam": df["AwayTeam"].astype(object),
+            "FTHG": pd.to_numeric(df["FTHG"], errors="coerce"),
+            "FTAG": pd.to_numeric(df["FTAG"], errors="coerce"),
+            "League": league,
+        })
+        frames.append(frame.dropna())
+    columns = ["Date", "HomeTeam", "AwayTeam", "FTHG", "FTAG", "League"]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    rows = pd.concat(frames, ignore_index=True)
+    rows = rows.sort_values(["Date", "League", "HomeTeam", "AwayTeam"], kind="stable")
+    rows = rows.drop_duplicates(["Date", "HomeTeam", "AwayTeam"]).reset_index(drop=True)
+    rows["FTHG"] = rows["FTHG"].astype(int)
+    rows["FTAG"] = rows["FTAG"].astype(int)
+    return rows
+
+
+def _fingerprints(rows):
+    # טביעת אצבע מצטברת לכל תחילית של הזרם - נקודת שמירה תקפה רק אם התחילית שלה לא השתנתה
+    hashes = pd.util.hash_pandas_object(rows[["Date", "HomeTeam", "AwayTeam", "FTHG", "FTAG"]], index=False)
+    return np.cumsum(hashes.to_numpy(dtype=np.uint64))
+
+
+def _empty_state():
+    return {"ratings": {}, "matches": {}, "processed": 0, "fingerprint": "0", "last_date": None}
+
+
+def _snapshot(state):
+    return dict(state, ratings=dict(state["ratings"]), matches=dict(state["matches"]))
+
+
+def _load_checkpoints():
+    try:
+        with open(RATINGS_PATH, encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return []
+    if saved.get("params") != json.loads(json.dumps(_PARAMS)):
+        return []
+    return saved.get("checkpoints", [])
+
+
+def _save_checkpoints(checkpoints):
+    try:
+        os.makedirs(os.path.dirname(RATINGS_PATH), exist_ok=True)
+        tmp_path = RATINGS_PATH + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"params": _PARAMS, "checkpoints": checkpoints[-MAX_CHECKPOINTS:]}, f, ensure_ascii=False)
+        os.replace(tmp_path, RATINGS_PATH)
+    except OSError as e:
+        logger.warning("לא ניתן לשמור את נקודות השמירה של הדירוג: %s", e)
+
+
+def _resume_point(checkpoints, rows, fingerprints):
+    # נקודת השמירה האחרונה שהתחילית שלה זהה לזרם הנוכחי; משם ממשיכים במקום לעבור על כל ההיסטוריה
+    for index in range(len(checkpoints) - 1, -1, -1):
+        checkpoint = checkpoints[index]
+        processed = checkpoint["processed"]
+        if processed == 0:
+            return index
+        if processed <= len(rows) and str(fingerprints[processed - 1]) == checkpoint["fingerprint"]:
+            return index
+    return None
+
+
+def update(league_data, checkpoints=None):
+    # מעבד רק את המשחקים שאחרי נקודת השמירה התקפה האחרונה - O(1) לכל משחק
+    rows = match_stream(league_data)
+    fingerprints = _fingerprints(rows)
+    if checkpoints is None:
+        checkpoints = _load_checkpoints()
+    index = _resume_point(checkpoints, rows, fingerprints)
+    if index is None:
+        checkpoints, state = [], _empty_state()
+    else:
+        checkpoints = checkpoints[:index + 1]
+        state = _snapshot(checkpoints[index])
+
+    start = state["processed"]
+    ratings, matches = state["ratings"], state["matches"]
+    with instrument.span("ratings.update", resumed_from=start, matches=len(rows) - start):
+        new = rows.iloc[start:]
+        for i, (home, away, home_goals, away_goals, league) in enumerate(zip(
+                new["HomeTeam"].tolist(), new["AwayTeam"].tolist(), new["FTHG"].tolist(), new["FTAG"].tolist(),
+                new["League"].tolist()), start + 1):
+            initial = LEAGUE_RATINGS.get(league, EUROPEAN_RATING)
+            home_rating = ratings.get(home, initial)
+            away_rating = ratings.get(away, initial)
+            expected = 1 / (1 + 10 ** ((away_rating - home_rating - HOME_ADVANTAGE) / 400))
+            result = 1.0 if home_goals > away_goals else 0.5 if home_goals == away_goals else 0.0
+            change = K_FACTOR * _goal_multiplier(abs(home_goals - away_goals)) * (result - expected)
+            ratings[home] = home_rating + change
+            ratings[away] = away_rating - change
+            matches[home] = matches.get(home, 0) + 1
+            matches[away] = matches.get(away, 0) + 1
+            if i % CHECKPOINT_EVERY == 0:
+                state.update(processed=i, fingerprint=str(fingerprints[i - 1]),
+                             last_date=str(rows["Date"].iat[i - 1].date()))
+                checkpoints.append(_snapshot(state))
+
+    if len(rows) > start:
+        state.update(processed=len(rows), fingerprint=str(fingerprints[-1]),
+                     last_date=str(rows["Date"].iat[-1].date()))
+        if not checkpoints or checkpoints[-1]["processed"] != len(rows):
+            checkpoints.append(_snapshot(state))
+        _save_checkpoints(checkpoints)
+    instrument.count("ratings.resumed" if start else "ratings.replayed")
+    return state, checkpoints
+
+
+def refresh(league_data=None):
+    # טעינת כל המקורות (מהמטמון בדיסק כשאפשר) והמשך הדירוג מנקודת השמירה
+    global _state, _refreshed
+    if league_data is None:
+        league_data, _ = data_loader.load_league_data()
+    state, _ = update(league_data)
+    with _lock:
+        _state, _refreshed = state, time.monotonic()
+    return state
+
+
+def _background_refresh():
+    global _refreshing
+    try:
+        refresh()
+    except Exception as e:
+        logger.warning("רענון הדירוג ברקע נכשל: %s", e)
+    finally:
+        with _lock:
+            _refreshing = False
+
+
+def refresh_in_background():
+    # רענון ברקע כשהדירוג חסר או ישן משעה - נקרא בזמן הטעינה המוקדמת, לעולם לא מתוך החיזוי
+    global _refreshing
+    with _lock:
+        if _refreshing or (_state is not None and time.monotonic() - _refreshed <= RATINGS_TTL):
+            return False
+        _refreshing = True
+    threading.Thread(target=_background_refresh, name="ratings-refresh", daemon=True).start()
+    return True
+
+
+def current():
+    # הדירוג המוכן (גם אם ישן), או נקודת השמירה האחרונה מהדיסק; None אם אין עדיין דירוג.
+    # לא טוען נתונים אף פעם - הרענון קורה ב-refresh/refresh_in_background
+    global _state, _refreshed
+    with _lock:
+        if _state is not None:
+            return _state
+    with _refresh_lock:
+        with _lock:
+            if _state is not None:
+                return _state
+        checkpoints = _load_checkpoints()
+        if not checkpoints:
+            return None
+        with _lock:
+            if _state is None:
+                # נחשב ישן - הרענון הבא ברקע ימשיך ממנו
+                _state, _refreshed = _snapshot(checkpoints[-1]), time.monotonic() - RATINGS_TTL - 1
+            return _state
+
+
+def version():
+    # משתנה בכל פעם שמשחק חדש נכנס לדירוג - למפתחות של מטמוני החיזוי
+    state = current()
+    if state is None:
+        return "none"
+    return f"{state['processed']}-{state['fingerprint']}"
+
+
+def rating(team):
+    state = current()
+    team = team_names.canonical(team)
+    if state is None or state["matches"].get(team, 0) < MIN_RATED_MATCHES:
+        return None
+    return state["ratings"][team]
+
+
+def strength(team, default=None):
+    # הדירוג בסולם ה-strength (בערך 60-100); קבוצה בלי מספיק משחקים (או בלי דירוג מוכן) מקבלת את ברירת המחדל
+    value = rating(team)
+    if value is None:
+        return default
+    return STRENGTH_BASE + (value - INITIAL_RATING) / ELO_PER_STRENGTH
+
+
+def table():
+    state = current() or _empty_state()
+    ratings = pd.Series(state["ratings"], dtype=float)
+    matches = pd.Series(state["matches"], dtype=int)
+    result = pd.DataFrame({"rating": ratings.round(1), "matches": matches.reindex(ratings.index)})
+    result["strength"] = (STRENGTH_BASE + (result["rating"] - INITIAL_RATING) / ELO_PER_STRENGTH).round(1)
+    return result.sort_values("rating", ascending=False).rename_axis("team").reset_index()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="דירוג Elo של כל הקבוצות מכל המקורות")
+    parser.add_argument("--top", type=int, default=30, help="כמה קבוצות להציג")
+    parser.add_argument("--team", action="append", help="הצגת קבוצה מסוימת (אפשר לחזור על הדגל)")
+    parser.add_argument("--rebuild", action="store_true", help="מחיקת נקודות השמירה וחישוב מחדש מההתחלה")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.rebuild and os.path.exists(RATINGS_PATH):
+        os.remove(RATINGS_PATH)
+    league_data, messages = data_loader.load_league_data()
+    for level, message in messages:
+        print(f"{level}: {message}", file=sys.stderr)
+    start = time.perf_counter()
+    state = refresh(league_data)
+    elapsed = time.perf_counter() - start
+
+    result = table()
+    if args.team:
+        result = result[result["team"].isin(args.team)]
+    else:
+        result = result.head(args.top)
+    print(result.to_string(index=False))
+    print(f"{state['processed']:,} משחקים עד {state['last_date']} | {len(state['ratings'])} קבוצות | "
+          f"{elapsed:.3f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
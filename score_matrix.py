@@ -0,0 +1,111 @@
+import numpy as np
+from scipy.special import gammaln, pdtrc, xlogy
+
+# ----------------------------
+# מנוע מטריצת תוצאות פואסון - וקטורי, עם חיתוך לפי מסת הזנב
+# ----------------------------
+TAIL_TOLERANCE = 1e-6  # מסת ההסתברות המקסימלית שמותר לאבד מעבר לחיתוך
+MIN_GOALS = 5
+MAX_GOALS_CAP = 30
+DEFAULT_MAX_GOALS = 10  # כשאין אף λ תקין
+
+
+def _as_rates(rates):
+    return np.atleast_1d(np.asarray(rates, dtype=float))
+
+
+def max_goals_for(*rates, tol=TAIL_TOLERANCE):
+    # מספר השערים הקטן ביותר שמעליו מסת הזנב של ה-λ הגדול ביותר קטנה מ-tol
+    values = np.concatenate([_as_rates(r) for r in rates])
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return DEFAULT_MAX_GOALS
+    # P(X > k) לכל k עד התקרה; scipy.special במקום scipy.stats - ייבוא מהיר בהרבה
+    goals = np.arange(MAX_GOALS_CAP + 1)
+    below = pdtrc(goals, values.max()) <= tol
+    n = int(np.argmax(below)) if below.any() else MAX_GOALS_CAP
+    return min(max(n, MIN_GOALS), MAX_GOALS_CAP)
+
+
+def max_goals_each(rates, tol=TAIL_TOLERANCE):
+    # כמו max_goals_for, אבל לכל λ בנפרד (מערך גדלים)
+    rates = _as_rates(rates)
+    below = pdtrc(np.arange(MAX_GOALS_CAP + 1)[None, :], rates[:, None]) <= tol
+    sizes = np.where(below.any(axis=1), np.argmax(below, axis=1), MAX_GOALS_CAP)
+    return np.clip(sizes, MIN_GOALS, MAX_GOALS_CAP)
+
+
+def pmf_vectors(rates, max_goals):
+    # מטריצה בגודל (מספר משחקים, max_goals+1) - שורה לכל λ
+    goals = np.arange(max_goals + 1)[None, :]
+    rates = _as_rates(rates)[:, None]
+    return np.exp(xlogy(goals, rates) - rates - gammaln(goals + 1))
+
+
+def score_matrix(home_rates, away_rates, tol=TAIL_TOLERANCE, max_goals=None):
+    # התפלגות משותפת [משחק, שערי בית, שערי חוץ] כמכפלה חיצונית של וקטורי pmf
+    scalar = np.ndim(home_rates) == 0 and np.ndim(away_rates) == 0
+    home_rates, away_rates = np.broadcast_arrays(_as_rates(home_rates), _as_rates(away_rates))
+    if max_goals is None:
+        max_goals = max_goals_for(home_rates, away_rates, tol=tol)
+
+    home_pmf = pmf_vectors(home_rates, max_goals)
+    away_pmf = pmf_vectors(away_rates, max_goals)
+    matrix = home_pmf[:, :, None] * away_pmf[:, None, :]
+    # נרמול - המסה שנחתכה מחולקת באופן יחסי כך שהסכום הוא בדיוק 1
+    matrix /= matrix.sum(axis=(1, 2), keepdims=True)
+    return matrix[0] if scalar else matrix
+
+
+def matrix_outcomes(matrix):
+    # (ניצחון בית, תיקו, ניצחון חוץ) מתוך מטריצה מוכנה - דו או תלת ממדית
+    axes = (-2, -1)
+    home_win = np.tril(matrix, -1).sum(axis=axes)
+    draw = np.trace(matrix, axis1=-2, axis2=-1)
+    away_win = np.triu(matrix, 1).sum(axis=axes)
+    return home_win, draw, away_win
+
+
+def _distribution(matrix, values):
+    # סכימת המטריצה לפי ערך של כל תא (סכום או הפרש שערים) - כפל מטריצות אחד לכל המשחקים
+    n = matrix.shape[-1]
+    flat = values.ravel() - values.min()
+    onehot = np.zeros((n * n, flat.max() + 1))
+    onehot[np.arange(n * n), flat] = 1
+    return matrix.reshape(*matrix.shape[:-2], n * n) @ onehot
+
+
+def total_goals(matrix):
+    # התפלגות סך השערים: עמודה t = t שערים
+    goals = np.arange(matrix.shape[-1])
+    return _distribution(matrix, goals[:, None] + goals[None, :])
+
+
+def goal_difference(matrix):
+    # התפלגות הפרש השערים (בית פחות חוץ): עמודה d מתאימה להפרש d - max_goals
+    goals = np.arange(matrix.shape[-1])
+    return _distribution(matrix, goals[:, None] - goals[None, :])
+
+
+def outcome_probabilities(home_rates, away_rates, tol=TAIL_TOLERANCE):
+    # (ניצחון בית, תיקו, ניצחון חוץ) בלי לבנות את המטריצה המלאה: O(n) לכל משחק במקום O(n²)
+    scalar = np.ndim(home_rates) == 0 and np.ndim(away_rates) == 0
+    home_rates, away_rates = np.broadcast_arrays(_as_rates(home_rates), _as_rates(away_rates))
+    max_goals = max_goals_for(home_rates, away_rates, tol=tol)
+
+    home_pmf = pmf_vectors(home_rates, max_goals)
+    away_pmf = pmf_vectors(away_rates, max_goals)
+    home_total = home_pmf.sum(axis=1)
+    away_total = away_pmf.sum(axis=1)
+
+    draw = (home_pmf * away_pmf).sum(axis=1)
+    # P(בית > j) לכל j, מתוך הסכום המצטבר
+    home_above = home_total[:, None] - np.cumsum(home_pmf, axis=1)
+    home_win = (away_pmf * home_above).sum(axis=1)
+    total = home_total * away_total
+    away_win = total - home_win - draw
+
+    home_win, draw, away_win = home_win / total, draw / total, away_win / total
+    if scalar:
+        return float(home_win[0]), float(draw[0]), float(away_win[0])
+    return home_win, draw, away_win
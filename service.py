@@ -0,0 +1,218 @@
+import argparse
+import copy
+import json
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import data_loader
+import goal_markets
+import instrument
+import ratings
+import team_index
+from predictor import EUROPEAN_LEAGUES, LEAGUE_TEAMS, METHODS, predict_match, resolve_teams
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# ליבת החיזוי: נתוני ליגה לפי דרישה + מטמון LRU של חיזויים
+# ----------------------------
+DATA_TTL = 3600      # רענון נתוני ליגה כל שעה (כמו באפליקציה)
+CACHE_SIZE = 4096    # מספר החיזויים המקסימלי במטמון
+EUROPEAN_VERSION = "european"  # ליגות אירופיות תלויות רק בדירוג ה-Elo - הגרסה היא גרסת הדירוג
+
+_leagues = {}
+_league_locks = {}
+_leagues_lock = threading.Lock()
+
+_predictions = OrderedDict()
+_predictions_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def league_data(league):
+    # מחזיר (נתוני הליגה או None, הודעות); כל ליגה נטענת פעם אחת גם כשהרבה בקשות מגיעות יחד
+    if league in EUROPEAN_LEAGUES:
+        # ליגות אירופיות נשענות על דירוג ה-Elo - מרעננים אותו ברקע, והחיזוי משתמש במה שמוכן כרגע
+        ratings.refresh_in_background()
+        return None, []
+    with _leagues_lock:
+        lock = _league_locks.setdefault(league, threading.Lock())
+    with lock:
+        loaded = _leagues.get(league)
+        if loaded is None or time.monotonic() - loaded[0] > DATA_TTL:
+            df, messages = data_loader.load_league(league)
+            loaded = (time.monotonic(), df, messages)
+            _leagues[league] = loaded
+    return loaded[1], loaded[2]
+
+
+def _data_version(league, df):
+    if league in EUROPEAN_LEAGUES:
+        return f"{EUROPEAN_VERSION}-{ratings.version()}"
+    return None if df is None else team_index.data_version(df)
+
+
+def validate(league, home_team, away_team, method="means"):
+    if league not in LEAGUE_TEAMS:
+        raise ValueError(f"ליגה לא מוכרת: {league}")
+    if method not in METHODS:
+        raise ValueError(f"שיטה לא מוכרת: {method}")
+    if not isinstance(home_team, str) or not isinstance(away_team, str) or not home_team or not away_team:
+        raise ValueError("יש לבחור שתי קבוצות שונות")
+
+
+def predict(league, home_team, away_team, method="means"):
+    validate(league, home_team, away_team, method)
+    df, _ = league_data(league)
+    version = _data_version(league, df)
+    if version is None:
+        raise LookupError(f"לא נמצאו נתונים עבור {league}")
+    # שמות קנוניים - כל כתיב של אותה קבוצה מגיע לאותה רשומה במטמון
+    home_team, away_team = resolve_teams(home_team, away_team, league, df)
+
+    key = (league, home_team, away_team, method, version)
+    with _predictions_lock:
+        prediction = _predictions.get(key)
+        if prediction is not None:
+            _predictions.move_to_end(key)
+            _stats["hits"] += 1
+            instrument.count("predictions.hit")
+            return copy.deepcopy(prediction)
+        _stats["misses"] += 1
+    instrument.count("predictions.miss")
+
+    prediction = predict_match(home_team, away_team, league, df, method)
+    with _predictions_lock:
+        _predictions[key] = prediction
+        while len(_predictions) > CACHE_SIZE:
+            _predictions.popitem(last=False)
+    # עותק עמוק - גם המילון המקונן של הכושר לא משותף עם הרשומה במטמון
+    return copy.deepcopy(prediction)
+
+
+def markets(league, home_team, away_team, method="means"):
+    # כל שווקי השערים למשחק; המטריצה עצמה נשמרת במטמון של goal_markets
+    validate(league, home_team, away_team, method)
+    df, _ = league_data(league)
+    if _data_version(league, df) is None:
+        raise LookupError(f"לא נמצאו נתונים עבור {league}")
+    return goal_markets.predict_markets(home_team, away_team, league, df, method)
+
+
+def cache_stats():
+    with _predictions_lock:
+        stats = dict(_stats, size=len(_predictions), capacity=CACHE_SIZE)
+    stats["matrices"] = goal_markets.cache_stats()
+    return stats
+
+
+# ----------------------------
+# שירות HTTP/JSON מקומי
+# ----------------------------
+class _PredictionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, payload):
+        try:
+            body = json.dumps(payload, ensure_ascii=False, allow_nan=False).encode("utf-8")
+        except ValueError as e:
+            # NaN/Infinity אינם JSON תקין - עדיף שגיאה מפורשת על פני גוף שלקוחות לא יצליחו לקרוא
+            logger.error("חיזוי עם ערך לא סופי: %s", e)
+            status, body = 500, json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _predict_one(self, request, function):
+        league = request.get("league")
+        home_team = request.get("home")
+        away_team = request.get("away")
+        method = request.get("method", "means")
+        prediction = function(league, home_team, away_team, method)
+        return dict(league=league, home=home_team, away=away_team, method=method, **prediction)
+
+    def _handle(self, request, function):
+        try:
+            if "matches" in request:
+                return 200, {"predictions": [self._predict_one(match, function) for match in request["matches"]]}
+            return 200, self._predict_one(request, function)
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        except LookupError as e:
+            return 503, {"error": str(e)}
+        except Exception as e:
+            logger.exception("שגיאה בחיזוי")
+            return 500, {"error": str(e)}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path in _ENDPOINTS:
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            self._send_json(*self._handle(query, _ENDPOINTS[url.path]))
+        elif url.path == "/leagues":
+            self._send_json(200, LEAGUE_TEAMS)
+        elif url.path == "/stats":
+            self._send_json(200, cache_stats())
+        elif url.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        function = _ENDPOINTS.get(urlparse(self.path).path)
+        if function is None:
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._send_json(400, {"error": f"JSON לא תקין: {e}"})
+            return
+        if not isinstance(request, dict):
+            self._send_json(400, {"error": "גוף הבקשה צריך להיות אובייקט JSON"})
+            return
+        self._send_json(*self._handle(request, function))
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+_ENDPOINTS = {"/predict": predict, "/markets": markets}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="שירות חיזוי מקומי (HTTP/JSON)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--preload", action="store_true", help="טעינת כל הליגות לפני שמתחילים לקבל בקשות")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    if args.preload:
+        leagues = [league for league in data_loader.DATA_SOURCES if league not in EUROPEAN_LEAGUES]
+        data_loader.prefetch_leagues(leagues)
+        for league in leagues:
+            league_data(league)
+    ratings.refresh_in_background()
+    server = ThreadingHTTPServer((args.host, args.port), _PredictionHandler)
+    server.daemon_threads = True
+    print(f"מאזין ב-http://{args.host}:{args.port} (GET/POST /predict, /markets, /leagues, /stats)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
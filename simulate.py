@@ -0,0 +1,268 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import data_loader
+import team_names
+from predictor import EUROPEAN_LEAGUES, LEAGUE_TEAMS, METHODS, league_fixtures, match_rates
+
+# ----------------------------
+# סימולציית מונטה קרלו של שארית העונה
+# ----------------------------
+DEFAULT_SIMS = 100000
+CHUNK_SIMS = 5000
+TOP_N = 4
+RELEGATION = 3
+# ממוצעי ברירת מחדל לקבוצה בלי נתונים בכלל
+DEFAULT_HOME_RATE = 1.5
+DEFAULT_AWAY_RATE = 1.2
+
+
+def current_season(league, df, teams):
+    # טבלה נוכחית (נקודות, שערי זכות, שערי חובה, משחקים) וזוגות שכבר שוחקו העונה
+    points = np.zeros(len(teams))
+    goals_for = np.zeros(len(teams))
+    goals_against = np.zeros(len(teams))
+    played = np.zeros(len(teams), dtype=int)
+    if df is None or df.empty:
+        return points, goals_for, goals_against, played, set()
+
+    dates = data_loader.parse_dates(df['Date'])
+    seasons = data_loader.season_of(dates)
+    # אותם שמות קנוניים כמו בטבלה - כל כתיב של קבוצה בנתונים נספר לה
+    season = df.assign(HomeTeam=team_names.canonical_array(df['HomeTeam'].to_numpy(dtype=object)),
+                       AwayTeam=team_names.canonical_array(df['AwayTeam'].to_numpy(dtype=object)))
+    season = season[(seasons == seasons.max()).to_numpy() & season['HomeTeam'].isin(teams).to_numpy()
+                    & season['AwayTeam'].isin(teams).to_numpy()]
+    season = season.dropna(subset=['FTHG', 'FTAG'])
+
+    position = {team: i for i, team in enumerate(teams)}
+    home = season['HomeTeam'].map(position).to_numpy(dtype=int)
+    away = season['AwayTeam'].map(position).to_numpy(dtype=int)
+    home_goals = season['FTHG'].to_numpy(dtype=float)
+    away_goals = season['FTAG'].to_numpy(dtype=float)
+    home_points = np.where(home_goals > away_goals, 3, np.where(home_goals == away_goals, 1, 0))
+    away_points = np.where(away_goals > home_goals, 3, np.where(home_goals == away_goals, 1, 0))
+
+    n = len(teams)
+    points = np.bincount(home, home_points, n) + np.bincount(away, away_points, n)
+    goals_for = np.bincount(home, home_goals, n) + np.bincount(away, away_goals, n)
+    goals_against = np.bincount(home, away_goals, n) + np.bincount(away, home_goals, n)
+    played = np.bincount(home, minlength=n) + np.bincount(away, minlength=n)
+    return points, goals_for, goals_against, played, set(zip(season['HomeTeam'], season['AwayTeam']))
+
+
+def prepare_season(league, df=None, fixtures=None, method="means"):
+    # כל השמות (טבלה, לוח משחקים ונתונים) עוברים לשם הקנוני - כתיבים שונים של אותה קבוצה הם קבוצה אחת
+    teams = list(dict.fromkeys(team_names.canonical_array(np.asarray(LEAGUE_TEAMS.get(league, []), dtype=object))))
+    if fixtures is not None:
+        fixtures = fixtures.assign(HomeTeam=team_names.canonical_array(fixtures['HomeTeam'].to_numpy(dtype=object)),
+                                   AwayTeam=team_names.canonical_array(fixtures['AwayTeam'].to_numpy(dtype=object)))
+        for team in pd.unique(fixtures[['HomeTeam', 'AwayTeam']].to_numpy().ravel()):
+            if team not in teams:
+                teams.append(team)
+    elif league in EUROPEAN_LEAGUES:
+        raise ValueError("בשלב הליגה האירופי אין לוח משחקים קבוע - יש להעביר fixtures")
+
+    points, goals_for, goals_against, played, played_pairs = current_season(league, df, teams)
+
+    if fixtures is not None:
+        home_teams = fixtures['HomeTeam'].to_numpy(dtype=object)
+        away_teams = fixtures['AwayTeam'].to_numpy(dtype=object)
+    else:
+        # סיבוב כפול: כל זוג מסודר שעוד לא שוחק העונה
+        home_teams, away_teams = league_fixtures(league)
+        home_teams = team_names.canonical_array(home_teams)
+        away_teams = team_names.canonical_array(away_teams)
+        remaining = np.array([pair not in played_pairs for pair in zip(home_teams, away_teams)], dtype=bool)
+        home_teams, away_teams = home_teams[remaining], away_teams[remaining]
+
+    home_rates, away_rates, _ = match_rates(home_teams, away_teams, league, df, method)
+    # קבוצה בלי היסטוריה מקבלת את הממוצע של שאר המשחקים
+    home_fill = np.nanmean(home_rates) if np.isfinite(home_rates).any() else DEFAULT_HOME_RATE
+    away_fill = np.nanmean(away_rates) if np.isfinite(away_rates).any() else DEFAULT_AWAY_RATE
+    home_rates = np.where(np.isfinite(home_rates), home_rates, home_fill)
+    away_rates = np.where(np.isfinite(away_rates), away_rates, away_fill)
+
+    position = {team: i for i, team in enumerate(teams)}
+    return {
+        "teams": teams,
+        "home_index": np.array([position[t] for t in home_teams], dtype=int),
+        "away_index": np.array([position[t] for t in away_teams], dtype=int),
+        "home_rates": home_rates,
+        "away_rates": away_rates,
+        "points": points,
+        "goals_for": goals_for,
+        "goals_against": goals_against,
+        "played": played,
+    }
+
+
+def _simulate_chunk(seed, n_sims, setup):
+    rng = np.random.default_rng(seed)
+    n_teams = len(setup["teams"])
+    n_fixtures = len(setup["home_index"])
+
+    # מטריצות שיוך משחק->קבוצה, כדי לצבור נקודות לכל הסימולציות בכפל מטריצות אחד
+    home_matrix = np.zeros((n_fixtures, n_teams))
+    home_matrix[np.arange(n_fixtures), setup["home_index"]] = 1
+    away_matrix = np.zeros((n_fixtures, n_teams))
+    away_matrix[np.arange(n_fixtures), setup["away_index"]] = 1
+
+    home_goals = rng.poisson(setup["home_rates"], size=(n_sims, n_fixtures)).astype(float)
+    away_goals = rng.poisson(setup["away_rates"], size=(n_sims, n_fixtures)).astype(float)
+    home_points = np.where(home_goals > away_goals, 3.0, np.where(home_goals == away_goals, 1.0, 0.0))
+    away_points = np.where(away_goals > home_goals, 3.0, np.where(home_goals == away_goals, 1.0, 0.0))
+
+    points = setup["points"] + home_points @ home_matrix + away_points @ away_matrix
+    goals_for = setup["goals_for"] + home_goals @ home_matrix + away_goals @ away_matrix
+    goals_against = setup["goals_against"] + away_goals @ home_matrix + home_goals @ away_matrix
+
+    # דירוג: נקודות, הפרש שערים, שערי זכות, ואז הגרלה
+    order = np.lexsort((rng.random((n_sims, n_teams)), -goals_for, -(goals_for - goals_against), -points), axis=-1)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(n_teams)[None, :], axis=1)
+
+    team_offset = np.arange(n_teams)[None, :]
+    position_counts = np.bincount((team_offset * n_teams + positions).ravel(),
+                                  minlength=n_teams * n_teams).reshape(n_teams, n_teams)
+    max_points = int(setup["points"].max()) + 3 * n_fixtures
+    points_counts = np.bincount((team_offset * (max_points + 1) + points.astype(int)).ravel(),
+                                minlength=n_teams * (max_points + 1)).reshape(n_teams, max_points + 1)
+    return position_counts, points_counts, n_sims
+
+
+def _max_standard_error(position_counts, n_sims, top_n, relegation):
+    probabilities = position_counts / n_sims
+    checks = [probabilities[:, 0], probabilities[:, :top_n].sum(axis=1)]
+    if relegation:
+        checks.append(probabilities[:, -relegation:].sum(axis=1))
+    p = np.concatenate(checks)
+    return float(np.sqrt(p * (1 - p) / n_sims).max())
+
+
+def _summarise(setup, position_counts, points_counts, n_sims, top_n, relegation):
+    positions = position_counts / n_sims
+    points = points_counts / n_sims
+    cumulative = np.cumsum(points, axis=1)
+    points_range = np.arange(points.shape[1])
+
+    def percentile(q):
+        return (cumulative < q).sum(axis=1)
+
+    table = pd.DataFrame({
+        "team": setup["teams"],
+        "played": setup["played"],
+        "points": setup["points"].astype(int),
+        "expected_points": (points * points_range).sum(axis=1),
+        "points_p05": percentile(0.05),
+        "points_p50": percentile(0.5),
+        "points_p95": percentile(0.95),
+        "expected_position": (positions * (np.arange(len(setup["teams"])) + 1)).sum(axis=1),
+        "title": positions[:, 0],
+        f"top{top_n}": positions[:, :top_n].sum(axis=1),
+        "relegation": positions[:, -relegation:].sum(axis=1) if relegation else 0.0,
+    })
+    table = table.sort_values("expected_points", ascending=False, ignore_index=True)
+    return {
+        "table": table,
+        "positions": pd.DataFrame(positions, index=setup["teams"], columns=np.arange(1, len(setup["teams"]) + 1)),
+        "points": pd.DataFrame(points, index=setup["teams"]),
+        "sims": n_sims,
+    }
+
+
+def simulate_season(league, df=None, fixtures=None, n_sims=DEFAULT_SIMS, workers=None, seed=None,
+                    tol=None, progress=None, top_n=TOP_N, relegation=RELEGATION, chunk_size=CHUNK_SIMS,
+                    method="means"):
+    # tol: עצירה מוקדמת כשטעות התקן של כל הסתברויות האליפות/טופ/ירידה קטנה ממנו
+    # progress: פונקציה (סימולציות שהושלמו, סה"כ, טעות תקן מקסימלית)
+    setup = prepare_season(league, df, fixtures, method)
+    n_teams = len(setup["teams"])
+    sizes = [min(chunk_size, n_sims - start) for start in range(0, n_sims, chunk_size)]
+    # זרע נפרד לכל חבילה - התוצאה זהה בלי תלות במספר ה-workers
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    max_points = int(setup["points"].max()) + 3 * len(setup["home_index"])
+    position_counts = np.zeros((n_teams, n_teams), dtype=np.int64)
+    points_counts = np.zeros((n_teams, max_points + 1), dtype=np.int64)
+    done = 0
+
+    def _accumulate(result):
+        nonlocal position_counts, points_counts, done
+        chunk_positions, chunk_points, chunk_sims = result
+        position_counts += chunk_positions
+        points_counts += chunk_points
+        done += chunk_sims
+        error = _max_standard_error(position_counts, done, top_n, relegation)
+        if progress is not None:
+            progress(done, n_sims, error)
+        return tol is not None and error < tol
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(sizes) == 1:
+        for chunk_seed, size in zip(seeds, sizes):
+            if _accumulate(_simulate_chunk(chunk_seed, size, setup)):
+                break
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_simulate_chunk, chunk_seed, size, setup) for chunk_seed, size in zip(seeds, sizes)]
+            # איסוף לפי סדר השליחה, כך שעצירה מוקדמת דטרמיניסטית
+            for future in futures:
+                if _accumulate(future.result()):
+                    break
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    return _summarise(setup, position_counts, points_counts, done, top_n, relegation)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="סימולציית מונטה קרלו של שארית העונה")
+    parser.add_argument("--league", required=True, choices=sorted(LEAGUE_TEAMS))
+    parser.add_argument("--sims", type=int, default=DEFAULT_SIMS)
+    parser.add_argument("--workers", type=int, help="מספר תהליכים (ברירת מחדל: מספר הליבות)")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--tol", type=float, help="עצירה מוקדמת לפי טעות תקן, למשל 0.002")
+    parser.add_argument("--fixtures", help="קובץ CSV עם המשחקים שנותרו (HomeTeam, AwayTeam)")
+    parser.add_argument("--method", choices=METHODS, default="means", help="שיטת החיזוי")
+    parser.add_argument("--top", type=int, default=TOP_N)
+    parser.add_argument("--relegation", type=int, default=RELEGATION)
+    parser.add_argument("--output", "-o", help="שמירת הטבלה ל-CSV")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    fixtures = pd.read_csv(args.fixtures, encoding="utf-8-sig") if args.fixtures else None
+    df = None
+    if args.league not in EUROPEAN_LEAGUES or fixtures is not None:
+        league_data, _ = data_loader.load_league_data({args.league: data_loader.DATA_SOURCES[args.league]})
+        df = league_data.get(args.league)
+
+    def _progress(done, total, error):
+        print(f"\r{done:,}/{total:,} סימולציות | טעות תקן {error:.4f}", end="", file=sys.stderr)
+
+    start = time.perf_counter()
+    try:
+        result = simulate_season(args.league, df, fixtures, n_sims=args.sims, workers=args.workers,
+                                 seed=args.seed, tol=args.tol, progress=_progress,
+                                 top_n=args.top, relegation=args.relegation, method=args.method)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = time.perf_counter() - start
+    print(f"\n{result['sims']:,} סימולציות ב-{elapsed:.2f}s", file=sys.stderr)
+
+    if args.output:
+        result["table"].to_csv(args.output, index=False)
+    else:
+        with pd.option_context("display.max_rows", None, "display.width", 200, "display.precision", 3):
+            print(result["table"].to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
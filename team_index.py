@@ -0,0 +1,172 @@
+import hashlib
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+import instrument
+
+# ----------------------------
+# אינדקס סטטיסטיקות לכל קבוצה - נבנה פעם אחת לכל גרסת נתונים
+# ----------------------------
+MAX_CACHED_INDEXES = 64
+
+# (עמודה בטבלה, שם בצד הבית, שם בצד החוץ)
+_STAT_COLUMNS = [
+    ("FTHG", "home_goals_for", "away_goals_against"),
+    ("FTAG", "home_goals_against", "away_goals_for"),
+    ("HC", "home_corners_for", "away_corners_against"),
+    ("AC", "home_corners_against", "away_corners_for"),
+]
+
+_EMPTY_STATS = {}
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+# גרסה לכל אובייקט DataFrame (לפי id, עם weakref כדי שלא ייצא משימוש אחרי שהאובייקט נמחק).
+# לא נשמרת ב-attrs: pandas מעתיק את attrs לכל טבלה שנגזרת (סינון, מיון, reset_index)
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def _forget(key, ref):
+    with _versions_lock:
+        entry = _versions.get(key)
+        if entry is not None and entry[0] is ref:
+            del _versions[key]
+
+
+def _remember(df, version):
+    key = id(df)
+    with _versions_lock:
+        _versions[key] = (weakref.ref(df, lambda ref: _forget(key, ref)), version)
+
+
+def stamp(df):
+    # הטוען מצהיר שהאובייקט הזה בדיוק הוא הגרסה שב-attrs; טבלה שנגזרת ממנו לא יורשת את ההצהרה
+    _remember(df, df.attrs["version"])
+    return df
+
+
+def data_version(df):
+    with _versions_lock:
+        entry = _versions.get(id(df))
+    if entry is not None and entry[0]() is df:
+        return entry[1]
+    # כל טבלה אחרת (גם אם ירשה attrs) - גרסה לפי התוכן, הסדר והאינדקס, מחושבת פעם אחת לאובייקט
+    hashes = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    version = "h" + hashlib.sha1(hashes.tobytes()).hexdigest()[:20]
+    _remember(df, version)
+    return version
+
+
+def _side_stats(df, team_column, side):
+    columns = [c for c, _, _ in _STAT_COLUMNS if c in df.columns]
+    grouped = df.groupby(team_column, observed=True, sort=False)
+    # עמודות המאגר הן מספרים שלמים עם ערך חסר - האגרגציות חוזרות ל-float רגיל
+    aggregated = grouped[columns].agg(["mean", "var", "count"]).astype(float)
+
+    stats = pd.DataFrame(index=grouped.size().index)
+    stats[f"{side}_matches"] = grouped.size()
+    for column, home_name, away_name in _STAT_COLUMNS:
+        name = home_name if side == "home" else away_name
+        if column in columns:
+            stats[name] = aggregated[column]["mean"]
+            stats[f"{name}_var"] = aggregated[column]["var"]
+            stats[f"{name}_n"] = aggregated[column]["count"]
+        else:
+            stats[name] = np.nan
+            stats[f"{name}_var"] = np.nan
+            stats[f"{name}_n"] = 0
+    return stats
+
+
+def _stat_names():
+    return [name for _, home_name, away_name in _STAT_COLUMNS for name in (home_name, away_name)]
+
+
+def _finish(stats, has_corners):
+    count_columns = ["home_matches", "away_matches"] + [f"{name}_n" for name in _stat_names()]
+    stats[count_columns] = stats[count_columns].fillna(0).astype(int)
+    return {
+        "has_corners": has_corners,
+        "teams": stats.to_dict("index"),
+        "frame": stats,
+    }
+
+
+def build_team_index(df):
+    # groupby אחד לכל צד (בית/חוץ) במקום ארבע מסכות בוליאניות בכל חיזוי
+    home = _side_stats(df, "HomeTeam", "home")
+    away = _side_stats(df, "AwayTeam", "away")
+    return _finish(home.join(away, how="outer"), "HC" in df.columns and "AC" in df.columns)
+
+
+def merge_team_index(index, new_rows):
+    # עדכון האינדקס בשורות חדשות בלבד: מיזוג ממוצעים ושונויות לפי מספר התצפיות
+    added = build_team_index(new_rows)["frame"]
+    teams = index["frame"].index.union(added.index, sort=False)
+    old = index["frame"].reindex(teams)
+    new = added.reindex(teams)
+
+    merged = pd.DataFrame(index=teams)
+    for column in ("home_matches", "away_matches"):
+        merged[column] = old[column].fillna(0) + new[column].fillna(0)
+    for name in _stat_names():
+        n1 = old[f"{name}_n"].fillna(0).to_numpy(dtype=float)
+        n2 = new[f"{name}_n"].fillna(0).to_numpy(dtype=float)
+        m1 = np.nan_to_num(old[name].to_numpy(dtype=float))
+        m2 = np.nan_to_num(new[name].to_numpy(dtype=float))
+        # סכום ריבועי הסטיות (M2) של כל חלק; שונות של תצפית אחת היא NaN אצל pandas
+        s1 = np.nan_to_num(old[f"{name}_var"].to_numpy(dtype=float)) * np.maximum(n1 - 1, 0)
+        s2 = np.nan_to_num(new[f"{name}_var"].to_numpy(dtype=float)) * np.maximum(n2 - 1, 0)
+        n = n1 + n2
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = (n1 * m1 + n2 * m2) / n
+            m2_total = s1 + s2 + (m2 - m1) ** 2 * n1 * n2 / n
+            var = np.where(n > 1, m2_total / (n - 1), np.nan)
+        merged[name] = np.where(n > 0, mean, np.nan)
+        merged[f"{name}_var"] = var
+        merged[f"{name}_n"] = n
+    return _finish(merged[index["frame"].columns], index["has_corners"])
+
+
+def _store(version, index):
+    with _cache_lock:
+        _cache[version] = index
+        while len(_cache) > MAX_CACHED_INDEXES:
+            _cache.pop(next(iter(_cache)))
+
+
+def get_team_index(df):
+    version = data_version(df)
+    with _cache_lock:
+        index = _cache.get(version)
+    if index is not None:
+        instrument.count("team_index.hit")
+        return index
+
+    instrument.count("team_index.miss")
+    with instrument.span("team_index.build", rows=len(df)):
+        index = build_team_index(df)
+    _store(version, index)
+    return index
+
+
+def extend_team_index(old_version, new_version, new_rows):
+    # הנתונים רק גדלו - בונים את האינדקס החדש מהקודם במקום מאפס
+    with _cache_lock:
+        index = _cache.get(old_version)
+    if index is None:
+        return None
+    instrument.count("team_index.extend")
+    with instrument.span("team_index.merge", rows=len(new_rows)):
+        index = merge_team_index(index, new_rows)
+    _store(new_version, index)
+    return index
+
+
+def team_stat(index, team, name):
+    return index["teams"].get(team, _EMPTY_STATS).get(name, np.nan)
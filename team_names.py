@@ -0,0 +1,292 @@
+import argparse
+import logging
+import re
+import sys
+import threading
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# שמות קבוצות אחידים בין המקורות: טבלת כינויים שמקומפלת פעם אחת לאינדקס hash
+# השם הקנוני הוא השם הקצר של football-data (כמו בליגות המקומיות וב-LEAGUE_TEAMS).
+# כינוי שנבדל מהשם הקנוני רק בקידומת שעה, בניקוד, ברישיות או בתוספות כמו FC/AC/1909 לא צריך להופיע -
+# הנרמול מטפל בו. שינוי בטבלה מחייב העלאה של disk_cache.FORMAT_VERSION (השמות נשמרים אחרי ההמרה).
+# ----------------------------
+ALIASES = {
+    # אנגליה
+    "Arsenal": [],
+    "Aston Villa": [],
+    "Chelsea": [],
+    "Liverpool": [],
+    "Man City": ["Manchester City"],
+    "Man United": ["Manchester United", "Manchester Utd"],
+    "Newcastle": ["Newcastle United"],
+    "Nott'm Forest": ["Nottingham Forest"],
+    "Tottenham": ["Tottenham Hotspur", "Spurs"],
+    "West Ham": ["West Ham United"],
+    "Brighton": ["Brighton & Hove Albion", "Brighton and Hove Albion"],
+    "Wolves": ["Wolverhampton", "Wolverhampton Wanderers"],
+    # ספרד
+    "Ath Bilbao": ["Athletic Bilbao", "Athletic Club"],
+    "Ath Madrid": ["Atletico Madrid", "Atletico de Madrid", "Club Atletico de Madrid"],
+    "Barcelona": [],
+    "Real Madrid": [],
+    "Betis": ["Real Betis"],
+    "Sociedad": ["Real Sociedad"],
+    "Girona": [],
+    "Villarreal": [],
+    "Sevilla": [],
+    "Celta": ["Celta Vigo"],
+    "Espanol": ["Espanyol", "RCD Espanyol"],
+    "Vallecano": ["Rayo Vallecano"],
+    # איטליה
+    "Inter": ["Internazionale", "Internazionale Milano", "Inter Milan"],
+    "Milan": [],
+    "Juventus": [],
+    "Atalanta": [],
+    "Bologna": [],
+    "Fiorentina": [],
+    "Roma": [],
+    "Lazio": ["Lazio Roma", "SS Lazio"],
+    "Napoli": ["SSC Napoli"],
+    # גרמניה
+    "Bayern Munich": ["Bayern Munchen", "Bayern"],
+    "Dortmund": ["Borussia Dortmund"],
+    "Leverkusen": ["Bayer Leverkusen", "Bayer 04 Leverkusen"],
+    "RB Leipzig": ["Leipzig"],
+    "Stuttgart": [],
+    "Ein Frankfurt": ["Eintracht Frankfurt"],
+    "Heidenheim": [],
+    "Hoffenheim": ["TSG Hoffenheim"],
+    "Union Berlin": [],
+    # צרפת
+    "Paris SG": ["Paris Saint-Germain", "Paris Saint Germain", "PSG"],
+    "Monaco": [],
+    "Lille": [],
+    "Brest": ["Stade Brestois", "Stade Brestois 29"],
+    "Lyon": ["Olympique Lyonnais", "Olympique Lyon"],
+    "Marseille": ["Olympique de Marseille", "Olympique Marseille"],
+    "Nice": [],
+    # הולנד, פורטוגל, בלגיה
+    "PSV": ["PSV Eindhoven"],
+    "Feyenoord": ["Feyenoord Rotterdam"],
+    "Ajax": [],
+    "AZ Alkmaar": [],
+    "Twente": [],
+    "Porto": [],
+    "Benfica": ["Sport Lisboa e Benfica", "SL Benfica"],
+    "Sporting": ["Sporting Clube de Portugal", "Sporting CP", "Sporting Lisbon"],
+    "Braga": ["Sporting Braga", "SC Braga"],
+    "Club Brugge": [],
+    "Cercle Brugge": [],
+    "Gent": [],
+    "Anderlecht": [],
+    "Union SG": ["Union Saint-Gilloise", "Union St-Gilloise", "Royale Union Saint-Gilloise"],
+    # סקוטלנד וסקנדינביה
+    "Celtic": [],
+    "Rangers": [],
+    "Hearts": ["Heart of Midlothian"],
+    "Copenhagen": ["FC Kobenhavn", "Kobenhavn", "FC København"],
+    "Midtjylland": [],
+    "Molde": [],
+    "Bodo/Glimt": ["Bodo Glimt", "FK Bodo/Glimt"],
+    "Malmo": [],
+    "Elfsborg": [],
+    "Djurgarden": ["Djurgardens", "Djurgardens IF"],
+    # מרכז ומזרח אירופה
+    "Salzburg": ["Red Bull Salzburg", "RB Salzburg"],
+    "Sturm Graz": [],
+    "Rapid Vienna": ["Rapid Wien"],
+    "LASK": [],
+    "Young Boys": [],
+    "St Gallen": [],
+    "Lugano": [],
+    "Sparta Prague": ["Sparta Praha"],
+    "Slavia Prague": ["Slavia Praha"],
+    "Viktoria Plzen": [],
+    "Mlada Boleslav": ["Boleslav"],
+    "Slovan Bratislava": [],
+    "Dinamo Zagreb": [],
+    "Red Star": ["Red Star Belgrade", "Crvena Zvezda"],
+    "Partizan": ["Partizan Belgrade"],
+    "Backa Topola": ["TSC Backa Topola"],
+    "Celje": [],
+    "Olimpija": ["Olimpija Ljubljana"],
+    "Borac": ["Borac Banja Luka"],
+    "Ferencvaros": ["Ferencvarosi", "Ferencvarosi TC"],
+    "Legia Warsaw": ["Legia Warszawa"],
+    "Jagiellonia": ["Jagiellonia Bialystok", "Jagiellonia Białystok"],
+    "Shakhtar": ["Shakhtar Donetsk"],
+    "Dynamo Kyiv": ["Dinamo Kiev", "Dynamo Kiev", "Dinamo Kyiv"],
+    "Dinamo Minsk": [],
+    "Ludogorets": ["Ludogorets Razgrad"],
+    "FCSB": ["Steaua Bucuresti"],
+    # יוון, טורקיה, קפריסין
+    "Olympiacos": ["Olympiakos", "Olympiakos Piraeus", "Olympiacos Piraeus"],
+    "PAOK": ["PAOK Saloniki", "PAOK Thessaloniki"],
+    "Panathinaikos": [],
+    "Galatasaray": [],
+    "Fenerbahce": [],
+    "Besiktas": [],
+    "Basaksehir": ["Istanbul Basaksehir"],
+    "APOEL": ["APOEL Nikosia", "APOEL Nicosia"],
+    "Omonia": ["Omonia Nikosia", "Omonia Nicosia"],
+    "Pafos": ["Paphos"],
+    # שאר היבשת
+    "Qarabag": [],
+    "Astana": [],
+    "Noah": [],
+    "Petrocub": ["CS Petrocub"],
+    "RFS": ["Rigas FS", "Rigas Futbola Skola"],
+    "HJK Helsinki": ["HJK"],
+    "TNS": ["The New Saints"],
+    "Shamrock Rovers": [],
+    "Larne": [],
+    "Vikingur": ["Vikingur Reykjavik"],
+    "Maccabi Tel Aviv": [],
+}
+
+# תאים שהגיעו קטועים כבר בקבצי המקור (כל מה שעד התו האחרון שאינו ASCII נחתך, כך ש-"FC Bayern München"
+# נשמר כ-"nchen"). אלה לא כינויים: תא שזהה בדיוק לאחד מהם מוחלף בשם המלא לפני הנרמול
+TRUNCATED_NAMES = {
+    "nchen": "FC Bayern München",
+    "tico de Madrid": "Club Atlético de Madrid",
+    "benhavn": "FC København",
+    "rdens IF": "Djurgårdens IF",
+    "ka Topola": "FK TSC Bačka Topola",
+    "ystok": "Jagiellonia Białystok",
+    "ehir": "İstanbul Başakşehir",
+}
+
+# תוספות שלא משנות את זהות הקבוצה (אחרי נרמול לאותיות קטנות בלי ניקוד)
+_NOISE_TOKENS = {
+    "fc", "cf", "afc", "ac", "acf", "as", "sc", "bc", "sk", "fk", "kv", "kaa", "rsc", "osc", "ogc",
+    "if", "ff", "nk", "gnk", "pfc", "tc", "bsc", "vfb", "k",
+}
+_KICKOFF = re.compile(r"^\s*\d{1,2}[.:]\d{2}\s+")  # "18.45  BSC Young Boys" - שעת המשחק דבוקה לשם
+_MOJIBAKE = re.compile("[\xc2-\xdf][\x80-\xbf\u0152-\u2122]")  # UTF-8 שפוענח כ-cp1252/latin-1 ("MÃ¼nchen")
+_PUNCTUATION = re.compile(r"['’.]")
+_SEPARATORS = re.compile(r"[^0-9a-z/]+")
+
+MAX_RESOLVED = 100000  # זיכרון השמות שכבר הומרו (שם גולמי -> קנוני)
+
+_resolved = {}
+_unresolved = set()
+_lock = threading.Lock()
+
+
+def _decode(text):
+    # תיקון קידוד: בתים של UTF-8 שפוענחו כ-cp1252 או latin-1 מפוענחים מחדש, ואז צורת NFC אחידה
+    if _MOJIBAKE.search(text):
+        for encoding in ("cp1252", "latin-1"):
+            try:
+                text = text.encode(encoding).decode("utf-8")
+                break
+            except UnicodeError:
+                continue
+    return unicodedata.normalize("NFC", text)
+
+
+def clean(name):
+    # השם כפי שהוא, בקידוד תקין, בלי שעת משחק ורווחים מיותרים; תא קטוע מהמקור מוחלף בשם המלא
+    text = " ".join(_KICKOFF.sub("", _decode(str(name))).split())
+    return TRUNCATED_NAMES.get(text, text)
+
+
+def normalize(name):
+    # מפתח השוואה: בלי שעה, ניקוד, רישיות, פיסוק ותוספות כמו FC או שנת ייסוד
+    text = unicodedata.normalize("NFKD", clean(name))
+    text = "".join(char for char in text if not unicodedata.combining(char)).casefold()
+    tokens = _SEPARATORS.sub(" ", _PUNCTUATION.sub("", text)).split()
+    return " ".join(token for token in tokens if token not in _NOISE_TOKENS and not token.isdigit())
+
+
+def _compile(aliases):
+    index = {}
+    for canonical, variants in aliases.items():
+        for name in [canonical] + list(variants):
+            key = normalize(name)
+            if index.setdefault(key, canonical) != canonical:
+                raise ValueError(f"הכינוי {name} מופיע גם תחת {index[key]} וגם תחת {canonical}")
+    return index
+
+
+_INDEX = _compile(ALIASES)
+
+
+def canonical(name):
+    # שם בודד: חיפוש אחד באינדקס; שם שלא נמצא חוזר נקי (ונרשם כלא מזוהה)
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return name
+    result = _resolved.get(name)
+    if result is None:
+        result = _INDEX.get(normalize(name))
+        if result is None:
+            result = clean(name)
+            with _lock:
+                _unresolved.add(result)
+        if len(_resolved) >= MAX_RESOLVED:
+            _resolved.clear()
+        _resolved[name] = result
+    return result
+
+
+def canonical_array(names):
+    # עמודה שלמה: פענוח לשמות ייחודיים, המרה של כל שם ייחודי פעם אחת, והחזרה לפי הקודים
+    codes, uniques = pd.factorize(pd.Series(names, dtype=object), use_na_sentinel=True)
+    mapped = np.array([canonical(name) for name in uniques], dtype=object)
+    result = np.empty(len(codes), dtype=object)
+    present = codes >= 0
+    result[present] = mapped[codes[present]]
+    result[~present] = None
+    return result
+
+
+def unresolved(known=()):
+    # שמות שנקלטו ולא נמצאו בטבלת הכינויים, פחות שמות שידוע שהם תקינים (למשל מ-LEAGUE_TEAMS)
+    with _lock:
+        names = set(_unresolved)
+    return sorted(names - set(known))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="דוח שמות קבוצות שלא זוהו בטבלת הכינויים")
+    parser.add_argument("--all", action="store_true",
+                        help="גם שמות מהליגות המקומיות (ברירת מחדל: רק שמות שלא מופיעים באף ליגה מקומית)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.ERROR)
+
+    # ייבוא מאוחר: match_store (ודרכו data_loader) משתמש במודול הזה בזמן הקליטה
+    import data_loader
+    from predictor import EUROPEAN_LEAGUES, EUROPEAN_TEAM_STATS, LEAGUE_TEAMS
+
+    league_data, messages = data_loader.load_league_data()
+    for level, message in messages:
+        print(f"{level}: {message}", file=sys.stderr)
+
+    # שמות הליגות המקומיות הם האיות המחייב; ברירת המחדל מדווחת רק על מה שלא מתחבר אליהם
+    known = {canonical(name) for teams in LEAGUE_TEAMS.values() for name in teams}
+    known |= {canonical(name) for name in EUROPEAN_TEAM_STATS}
+    for league, df in league_data.items():
+        names = pd.unique(pd.concat([df["HomeTeam"].astype(object), df["AwayTeam"].astype(object)]).dropna())
+        # גם נתונים שנטענו מהמטמון בדיסק (ולא עברו עכשיו קליטה) נבדקים מול האינדקס
+        canonical_array(names)
+        if not args.all and league not in EUROPEAN_LEAGUES:
+            known |= set(names)
+    missing = set(unresolved(known))
+    rows = []
+    for league, df in league_data.items():
+        names = pd.unique(pd.concat([df["HomeTeam"].astype(object), df["AwayTeam"].astype(object)]).dropna())
+        rows.extend((league, name) for name in sorted(set(names) & missing))
+    if rows:
+        print(pd.DataFrame(rows, columns=["league", "team"]).to_string(index=False))
+    print(f"{len(rows)} שמות לא מזוהים | {len(_INDEX)} מפתחות באינדקס", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,38 @@
+import pandas as pd
+
+import team_index
+from predictor import predict_match
+
+
+def _league():
+    df = pd.DataFrame({
+        "Date": pd.to_datetime(["2024-08-10", "2024-08-17", "2024-08-24", "2024-08-31", "2024-09-07", "2024-09-14"]),
+        "HomeTeam": ["Arsenal", "Chelsea", "Arsenal", "Chelsea", "Arsenal", "Chelsea"],
+        "AwayTeam": ["Chelsea", "Arsenal", "Chelsea", "Arsenal", "Chelsea", "Arsenal"],
+        "FTHG": [3, 0, 4, 1, 0, 0],
+        "FTAG": [0, 2, 1, 1, 2, 3],
+    })
+    df.attrs["version"] = "loaded"
+    return team_index.stamp(df)
+
+
+def test_filtered_subset_gets_its_own_stats():
+    df = _league()
+    subset = df[df["Date"] < "2024-09-01"]
+    assert subset.attrs["version"] == "loaded"  # pandas copies attrs to derived frames
+    assert team_index.data_version(subset) != team_index.data_version(df)
+
+    full = team_index.get_team_index(df)
+    part = team_index.get_team_index(subset)
+    assert full["teams"]["Arsenal"]["home_goals_for"] == 7 / 3
+    assert part["teams"]["Arsenal"]["home_goals_for"] == 3.5
+    assert (predict_match("Arsenal", "Chelsea", "Premier League", subset)
+            != predict_match("Arsenal", "Chelsea", "Premier League", df))
+
+
+def test_data_version_does_not_touch_the_frame():
+    df = _league().reset_index(drop=True).sample(frac=1, random_state=0)
+    attrs = dict(df.attrs)
+    team_index.data_version(df)
+    assert df.attrs == attrs
+    assert team_index.data_version(df) != team_index.data_version(df.sort_index())